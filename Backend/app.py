@@ -5,12 +5,18 @@ import psycopg2
 from psycopg2 import sql
 from db_handler import get_pg_connection, create_users_table
 from auth import auth_bp
+from profiler import profiler_bp
+from voice_jobs import voice_jobs_bp
+from voice_streaming import voice_stream_bp
 import os
 from dotenv import load_dotenv
 import json
 import re
 import logging
-from voice_processor import process_text_response, get_openai_client
+import time
+from voice_processor import process_text_response, get_openai_client, warm_up_transcription
+from chatbot_budget import fit_file_content, fit_prompt
+from chatbot_threads import chat_threads
 from random import shuffle
 
 # Configure logging
@@ -74,6 +80,15 @@ CORS(app,
 # Register auth blueprint
 app.register_blueprint(auth_bp)
 
+# Register admin profiling endpoints (inactive unless PROFILER_TOKEN is set)
+app.register_blueprint(profiler_bp)
+
+# Register async voice job status endpoints
+app.register_blueprint(voice_jobs_bp)
+
+# Register streaming (chunked) voice transcription endpoints
+app.register_blueprint(voice_stream_bp)
+
 # Initialize users table on startup (non-blocking)
 def initialize_database():
     """Initialize database tables on startup - non-blocking"""
@@ -101,6 +116,10 @@ except Exception as e:
     logger.warning(f"⚠ Database initialization error: {e}")
     logger.info("App will continue - database will be initialized on first use")
 
+# Optionally load the Whisper model now instead of on the first voice request
+if os.getenv('WHISPER_PRELOAD', 'false').lower() == 'true':
+    warm_up_transcription()
+
 def get_questions_from_table(table_name):
     """Fetch questions from database table by table name"""
     # Check if table exists
@@ -253,6 +272,15 @@ def process_voice():
     """Process voice recording and return transcript"""
     try:
         from voice_processor import process_voice_response
+        from audio_utils import VOICE_MAX_UPLOAD_BYTES, UploadLimitError, check_upload_limits
+
+        # Reject oversize bodies from the header, before the upload is read
+        # (64 KB of slack for the multipart framing and form fields)
+        if request.content_length and request.content_length > VOICE_MAX_UPLOAD_BYTES + 64 * 1024:
+            return jsonify({
+                'success': False,
+                'message': f'Recording is too large (limit {VOICE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB)'
+            }), 413
         
         # Check if audio file is present
         if 'audio' not in request.files:
@@ -268,8 +296,47 @@ def process_voice():
                 'message': 'No audio file selected'
             }), 400
         
+        # Byte count and container-stated duration, before any decoding
+        data = audio_file.read()
+        try:
+            check_upload_limits(data)
+        except UploadLimitError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 413
+        audio_file.seek(0)
+
         # Get question from form data
         question = request.form.get('question', 'Practice question')
+
+        # Queue mode: hand the upload to the job pool and return immediately
+        if request.form.get('async', request.args.get('async', '')).lower() == 'true':
+            from voice_jobs import DEFAULT_PRIORITY, QueueFullError, submit_voice_job
+            from voice_processor import guess_audio_extension
+            try:
+                priority = int(request.form.get('priority', DEFAULT_PRIORITY))
+            except ValueError:
+                priority = DEFAULT_PRIORITY
+            try:
+                job = submit_voice_job(
+                    data,
+                    guess_audio_extension(audio_file.filename, audio_file.mimetype),
+                    question,
+                    priority=max(0, min(priority, 9)),
+                )
+            except QueueFullError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 503
+            return jsonify({
+                'success': True,
+                'job_id': job.job_id,
+                'status': job.status,
+                'status_url': f'/api/voice-jobs/{job.job_id}',
+                'events_url': f'/api/voice-jobs/{job.job_id}/events'
+            }), 202
         
         # Process the voice response
         result = process_voice_response(audio_file, question)
@@ -315,9 +382,9 @@ def build_context_info(context):
     return context_info
 
 def build_conversation_history(conversation_history):
-    """Build conversation history messages from history array."""
+    """Build conversation history messages from history array (compacted later by fit_prompt)."""
     history_messages = []
-    for msg in conversation_history[-10:]:
+    for msg in conversation_history:
         if not (msg.get('role') and msg.get('content')):
             continue
         
@@ -379,6 +446,8 @@ def process_text_file(file_data, user_message):
             "text": f"I received a file '{file_name}' of type '{file_type}'. However, I can only analyze text files and images. Please describe what you need help with regarding this file."
         }]
     
+    # Long files are chunk-summarized or truncated to the file token budget
+    file_content = fit_file_content(file_name, file_content)
     text_content = f"Here is the content of the file '{file_name}':\n\n{file_content}\n\n"
     if user_message:
         text_content += f"\n\n{user_message}"
@@ -442,6 +511,16 @@ def add_user_message(messages, user_content):
     logger.info(f"Added multi-modal message with {len(user_content)} parts")
     return True
 
+def thread_text(message):
+    """Text of a message as kept in a chat thread (attached images are not stored)."""
+    content = message.get('content') or ''
+    if isinstance(content, str):
+        return content
+    texts = [part.get('text', '') for part in content if part.get('type') == 'text']
+    if len(texts) < len(content):
+        texts.append('[Image attached]')
+    return '\n\n'.join(text for text in texts if text)
+
 @app.route('/api/chatbot', methods=['POST', 'OPTIONS'])
 def chatbot():
     """Chatbot endpoint for interview preparation assistance.
@@ -461,6 +540,7 @@ def chatbot():
         user_message = data.get('message', '').strip()
         context = data.get('context', {})
         conversation_history = data.get('conversationHistory', [])
+        thread_id = (data.get('threadId') or '').strip()
         file_data = data.get('file', None)
 
         # Log received data for debugging
@@ -512,7 +592,25 @@ When analyzing images, describe what you see in detail and provide actionable fe
         # Build messages
         context_info = build_context_info(context)
         messages = [{"role": "system", "content": system_prompt + context_info}]
-        messages.extend(build_conversation_history(conversation_history))
+        # History is kept on the server; conversationHistory is only read when
+        # the thread is new or has expired (or from clients that predate threads)
+        thread = chat_threads.load(thread_id) if thread_id else None
+        if thread_id and thread is None and not conversation_history:
+            # Evicted, expired or held by another worker's memory store: answering
+            # without history would silently lose the context, so ask for it
+            response = jsonify({
+                'success': False,
+                'error': 'thread_expired',
+                'message': 'Conversation thread not found; resend with conversationHistory'
+            })
+            response.headers.add('Access-Control-Allow-Origin', '*')
+            return response, 409
+        if thread is not None:
+            history, history_tokens = thread
+        else:
+            history, history_tokens = build_conversation_history(conversation_history), None
+            thread_id = chat_threads.create(history)
+        messages.extend(history)
 
         # Build user content
         user_content = build_user_content(file_data, user_message)
@@ -524,6 +622,9 @@ When analyzing images, describe what you see in detail and provide actionable fe
             response.headers.add('Access-Control-Allow-Origin', '*')
             return response, 400
 
+        # Keep the prompt under the token budget: recent history verbatim, older history summarized
+        messages = fit_prompt(messages[0], messages[1:-1], messages[-1], history_tokens=history_tokens)
+
         # Get OpenAI client and generate response
         try:
             client = get_openai_client()
@@ -546,10 +647,15 @@ When analyzing images, describe what you see in detail and provide actionable fe
             
             logger.info(f"OpenAI API response received successfully")
             assistant_response = completion.choices[0].message.content
+            chat_threads.append(thread_id, [
+                {"role": "user", "content": thread_text(messages[-1])},
+                {"role": "assistant", "content": assistant_response or ''},
+            ])
 
             response = jsonify({
                 'success': True,
-                'response': assistant_response
+                'response': assistant_response,
+                'threadId': thread_id
             })
             response.headers.add('Access-Control-Allow-Origin', '*')
             return response
@@ -669,12 +775,20 @@ def evaluate_answer():
 
 # Mock Interview endpoints
 try:
-    from mock_interview_session_manager import session_manager
+    from mock_interview_session_manager import SessionConflictError, session_manager
     from mock_interview_agents import (
         QuestionAgent, EvaluatorAgent, FollowUpAgent, 
         HintAgent, RecruiterAgent, IntentDetectorAgent, ImprovementAgent
     )
     from mock_interview_config import JOB_ROLE_SKILLS, INTERVIEW_TYPES
+    from interview_persistence import persist_completed_interview, persister as interview_persister
+    from mock_interview_improvements import (
+        IMPROVEMENT_DIGEST_ENABLED, IMPROVEMENT_DIGEST_WAIT_SECONDS, ImprovementDigester,
+    )
+    from mock_interview_summary import INTERVIEW_SUMMARY_DEADLINE_SECONDS, run_stages as run_summary_stages
+    from mock_interview_hints import follow_up_provider, hint_provider, prefetch_hint
+    from mock_interview_messages import RECRUITER_LLM_MESSAGES, personalize_in_background
+    improvement_digester = ImprovementDigester(session_manager)
     MOCK_INTERVIEW_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Mock interview modules not available: {e}")
@@ -710,8 +824,10 @@ if MOCK_INTERVIEW_AVAILABLE:
             if questions:
                 session.current_question_index = 0
                 session.last_question = questions[0]
+            session_manager.save_session(session)
+            prefetch_hint(session)
             
-            # Generate welcome message only for behavioral interviews
+            # Welcome message only for behavioral interviews (templated)
             welcome_message = None
             if interview_type.lower() == "behavioral":
                 welcome_message = RecruiterAgent.get_welcome_message(name, interview_type)
@@ -748,191 +864,202 @@ if MOCK_INTERVIEW_AVAILABLE:
             if not user_input:
                 return jsonify({"error": "user_input is required"}), 400
             
-            session = session_manager.get_session(session_id)
-            if not session:
-                return jsonify({"error": "Invalid session_id"}), 404
+            idempotency_key = (request.headers.get('Idempotency-Key') or data.get('idempotency_key') or '').strip()
             
-            # Get current question for context
-            current_question = session.last_question or ""
-            if session.current_question_index < len(session.questions):
-                if not current_question:
-                    current_question = session.questions[session.current_question_index]
+            # Evaluation takes seconds; without the lock a double-sent answer
+            # could be evaluated twice and skip a question
+            with session_manager.session_lock(session_id):
+                session = session_manager.get_session(session_id)
+                if not session:
+                    return jsonify({"error": "Invalid session_id"}), 404
+                
+                if idempotency_key:
+                    cached = session.cached_response(idempotency_key)
+                    if cached:
+                        status, body = cached
+                        return jsonify(body), status
+                
+                response, status = interact_with_session(session, session_id, user_input)
+                # Errors are not replayed: a retry with the same key should be handled anew
+                if idempotency_key and 200 <= status < 300:
+                    session.remember_response(idempotency_key, status, response.get_json())
+                session_manager.save_session(session)
             
-            # Detect intent from natural language
-            try:
-                intent = IntentDetectorAgent.detect_intent(
-                    user_input=user_input,
-                    current_question=current_question,
-                    conversation_state=""
-                )
-            except Exception as e:
-                print(f"Intent detection error: {e}")
-                # Default to normal_answer if intent detection fails
-                intent = "normal_answer"
+            if IMPROVEMENT_DIGEST_ENABLED and session.digest_answers < len(session.answers):
+                improvement_digester.schedule(session_id)
+            prefetch_hint(session)
+            return response, status
+                
+        except SessionConflictError:
+            return jsonify({"error": "Session was updated by another request, please retry"}), 409
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def interact_with_session(session, session_id, user_input):
+        """Detect the intent of user_input and apply it to the session (caller saves)."""
+        # Get current question for context
+        current_question = session.last_question or ""
+        if session.current_question_index < len(session.questions):
+            if not current_question:
+                current_question = session.questions[session.current_question_index]
+        
+        # Detect intent from natural language
+        try:
+            intent = IntentDetectorAgent.detect_intent(
+                user_input=user_input,
+                current_question=current_question,
+                conversation_state=""
+            )
+        except Exception as e:
+            print(f"Intent detection error: {e}")
+            # Default to normal_answer if intent detection fails
+            intent = "normal_answer"
+        
+        # Handle detected intent
+        if intent == 'repeat_question':
+            return jsonify({
+                "message": RecruiterAgent.get_polite_message("repeat"),
+                "question": session.last_question,
+                "session_id": session_id,
+                "intent": "repeat_question"
+            }), 200
+        
+        elif intent == 'hint_request':
+            if not session.last_question:
+                return jsonify({"error": "No question available for hint"}), 400
             
-            # Handle detected intent
-            if intent == 'repeat_question':
-                return jsonify({
-                    "message": RecruiterAgent.get_polite_message("repeat"),
-                    "question": session.last_question,
-                    "session_id": session_id,
-                    "intent": "repeat_question"
-                }), 200
+            hint = hint_provider.get(
+                session.last_question,
+                session.job_role,
+                session.interview_type
+            )
+            return jsonify({
+                "hint": hint,
+                "message": "Here's a hint to help guide your thinking:",
+                "session_id": session_id,
+                "intent": "hint_request"
+            }), 200
+        
+        elif intent == 'need_time':
+            return jsonify({
+                "message": RecruiterAgent.get_polite_message("pause"),
+                "session_id": session_id,
+                "intent": "need_time",
+                "pause_seconds": 10
+            }), 200
+        
+        elif intent == 'normal_answer':
+            # Check if we're answering a follow-up or main question
+            is_followup = (session.current_follow_up_index < len(session.follow_up_questions))
             
-            elif intent == 'hint_request':
-                if not session.last_question:
-                    return jsonify({"error": "No question available for hint"}), 400
+            if is_followup:
+                # Answering a follow-up question
+                current_followup = session.follow_up_questions[session.current_follow_up_index]
                 
-                hint = HintAgent.provide_hint(
-                    session.last_question,
+                # Evaluate the answer
+                evaluation = EvaluatorAgent.evaluate_answer(
+                    current_followup,
+                    user_input,
                     session.job_role,
                     session.interview_type
                 )
-                return jsonify({
-                    "hint": hint,
-                    "message": "Here's a hint to help guide your thinking:",
-                    "session_id": session_id,
-                    "intent": "hint_request"
-                }), 200
-            
-            elif intent == 'need_time':
-                return jsonify({
-                    "message": RecruiterAgent.get_polite_message("pause"),
-                    "session_id": session_id,
-                    "intent": "need_time",
-                    "pause_seconds": 10
-                }), 200
+                
+                # Store in session
+                session.add_answer(
+                    current_followup,
+                    user_input,
+                    evaluation,
+                    is_followup=True,
+                    parent_question_index=session.current_question_index - 1
+                )
+                
+                # Move to next follow-up
+                session.current_follow_up_index += 1
+                
+                # Check if more follow-ups exist
+                if session.current_follow_up_index < len(session.follow_up_questions):
+                    next_followup = session.follow_up_questions[session.current_follow_up_index]
+                    session.last_question = next_followup
+                    return jsonify({
+                        "feedback": evaluation["short_feedback"],
+                        "next_question": next_followup,
+                        "is_followup": True,
+                        "session_id": session_id,
+                        "intent": "normal_answer"
+                    }), 200
+                else:
+                    # Follow-ups exhausted, move to next main question
+                    # Get the last evaluation feedback before clearing
+                    last_feedback = evaluation["short_feedback"] if evaluation else None
+                    session.follow_up_questions = []
+                    session.current_follow_up_index = 0
+                    return handle_next_main_question(session, session_id, last_feedback)
             
-            elif intent == 'normal_answer':
-                # Check if we're answering a follow-up or main question
-                is_followup = (session.current_follow_up_index < len(session.follow_up_questions))
+            else:
+                # Answering a main question
+                current_question = session.questions[session.current_question_index]
                 
-                if is_followup:
-                    # Answering a follow-up question
-                    current_followup = session.follow_up_questions[session.current_follow_up_index]
-                    
-                    # Evaluate the answer
-                    evaluation = EvaluatorAgent.evaluate_answer(
-                        current_followup,
+                # Evaluate the answer
+                evaluation = EvaluatorAgent.evaluate_answer(
+                    current_question,
+                    user_input,
+                    session.job_role,
+                    session.interview_type
+                )
+                
+                # Store in session
+                session.add_answer(current_question, user_input, evaluation)
+                
+                # Decide whether to ask a follow-up: for first question, then every 5–6 questions
+                ask_followup_now = False
+                try:
+                    # next_followup_after stores a 1-based question number
+                    if (session.current_question_index + 1) == getattr(session, 'next_followup_after', 1):
+                        ask_followup_now = True
+                except Exception:
+                    ask_followup_now = False
+
+                if ask_followup_now:
+                    # Generate follow-up questions
+                    follow_ups = follow_up_provider.get(
+                        current_question,
                         user_input,
                         session.job_role,
                         session.interview_type
                     )
-                    
-                    # Store in session
-                    session.answers.append({
-                        "question": current_followup,
-                        "answer": user_input,
-                        "is_followup": True,
-                        "parent_question_index": session.current_question_index - 1,
-                        "feedback": evaluation["short_feedback"],
-                        "detailed_evaluation": evaluation["detailed_evaluation"]
-                    })
-                    session.detailed_evaluations.append({
-                        "question": current_followup,
-                        "evaluation": evaluation
-                    })
-                    
-                    # Move to next follow-up
-                    session.current_follow_up_index += 1
-                    
-                    # Check if more follow-ups exist
-                    if session.current_follow_up_index < len(session.follow_up_questions):
-                        next_followup = session.follow_up_questions[session.current_follow_up_index]
-                        session.last_question = next_followup
+
+                    if follow_ups:
+                        # Store follow-ups and ask first one
+                        session.follow_up_questions = follow_ups
+                        session.current_follow_up_index = 0
+                        session.last_question = follow_ups[0]
+
+                        # Schedule next follow-up after 5–6 more questions
+                        try:
+                            import random
+                            increment = random.choice([5, 6])
+                            session.next_followup_after = (session.current_question_index + 1) + increment
+                        except Exception:
+                            pass
+
                         return jsonify({
                             "feedback": evaluation["short_feedback"],
-                            "next_question": next_followup,
+                            "follow_up_question": follow_ups[0],
                             "is_followup": True,
                             "session_id": session_id,
                             "intent": "normal_answer"
                         }), 200
-                    else:
-                        # Follow-ups exhausted, move to next main question
-                        # Get the last evaluation feedback before clearing
-                        last_feedback = evaluation["short_feedback"] if evaluation else None
-                        session.follow_up_questions = []
-                        session.current_follow_up_index = 0
-                        return handle_next_main_question(session, session_id, last_feedback)
-                
-                else:
-                    # Answering a main question
-                    current_question = session.questions[session.current_question_index]
-                    
-                    # Evaluate the answer
-                    evaluation = EvaluatorAgent.evaluate_answer(
-                        current_question,
-                        user_input,
-                        session.job_role,
-                        session.interview_type
-                    )
-                    
-                    # Store in session
-                    session.answers.append({
-                        "question": current_question,
-                        "answer": user_input,
-                        "is_followup": False,
-                        "feedback": evaluation["short_feedback"],
-                        "detailed_evaluation": evaluation["detailed_evaluation"]
-                    })
-                    session.detailed_evaluations.append({
-                        "question": current_question,
-                        "evaluation": evaluation
-                    })
-                    
-                    # Decide whether to ask a follow-up: for first question, then every 5–6 questions
-                    ask_followup_now = False
-                    try:
-                        # next_followup_after stores a 1-based question number
-                        if (session.current_question_index + 1) == getattr(session, 'next_followup_after', 1):
-                            ask_followup_now = True
-                    except Exception:
-                        ask_followup_now = False
-
-                    if ask_followup_now:
-                        # Generate follow-up questions
-                        follow_ups = FollowUpAgent.generate_follow_ups(
-                            current_question,
-                            user_input,
-                            session.job_role,
-                            session.interview_type
-                        )
-
-                        if follow_ups:
-                            # Store follow-ups and ask first one
-                            session.follow_up_questions = follow_ups
-                            session.current_follow_up_index = 0
-                            session.last_question = follow_ups[0]
-
-                            # Schedule next follow-up after 5–6 more questions
-                            try:
-                                import random
-                                increment = random.choice([5, 6])
-                                session.next_followup_after = (session.current_question_index + 1) + increment
-                            except Exception:
-                                pass
-
-                            return jsonify({
-                                "feedback": evaluation["short_feedback"],
-                                "follow_up_question": follow_ups[0],
-                                "is_followup": True,
-                                "session_id": session_id,
-                                "intent": "normal_answer"
-                            }), 200
-
-                    # No (scheduled) follow-up right now, move to next main question
-                    # But first return feedback with the next question
-                    return handle_next_main_question(session, session_id, evaluation["short_feedback"])
-            
-            else:
-                # Unknown intent - default to normal_answer
-                return jsonify({
-                    "error": "Unable to determine intent, please try again",
-                    "session_id": session_id
-                }), 400
-                
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
+
+                # No (scheduled) follow-up right now, move to next main question
+                # But first return feedback with the next question
+                return handle_next_main_question(session, session_id, evaluation["short_feedback"])
+        
+        else:
+            # Unknown intent - default to normal_answer
+            return jsonify({
+                "error": "Unable to determine intent, please try again",
+                "session_id": session_id
+            }), 400
 
     def handle_next_main_question(session, session_id, feedback=None):
         """Handle moving to the next main question."""
@@ -978,84 +1105,124 @@ if MOCK_INTERVIEW_AVAILABLE:
             if not session_id:
                 return jsonify({"error": "session_id is required"}), 400
             
-            session = session_manager.get_session(session_id)
-            if not session:
-                return jsonify({"error": "Invalid session_id"}), 404
+            # Improvements and the closing message share one deadline
+            deadline = time.monotonic() + INTERVIEW_SUMMARY_DEADLINE_SECONDS
             
-            # Aggregate scores for overall summary - use STAR rubrics for behavioral, regular for others
-            if session.interview_type.lower() == "behavioral":
-                all_scores = {
-                    "Situation Clarity": [],
-                    "Task Definition": [],
-                    "Action Effectiveness": [],
-                    "Result Impact": [],
-                    "Communication Skill": []
-                }
-            else:
-                all_scores = {
-                    "Technical Accuracy": [],
-                    "Clarity of Communication": [],
-                    "Depth of Understanding": [],
-                    "Relevance to Role": [],
-                    "Overall Quality": []
-                }
+            if IMPROVEMENT_DIGEST_ENABLED:
+                # Let an update already running for the last answers finish first
+                improvement_digester.wait_for(session_id, timeout=min(
+                    IMPROVEMENT_DIGEST_WAIT_SECONDS, max(0.0, deadline - time.monotonic())))
             
-            for eval_data in session.detailed_evaluations:
-                evaluation = eval_data.get("evaluation", {})
-                rubric = evaluation.get("rubric_scores", {})
+            with session_manager.session_lock(session_id):
+                session = session_manager.get_session(session_id)
+                if not session:
+                    return jsonify({"error": "Invalid session_id"}), 404
                 
-                # Extract scores for aggregation
-                for metric in all_scores.keys():
-                    if metric in rubric:
-                        score_str = rubric[metric]
-                        # Try to extract numeric score
-                        try:
-                            score = float(score_str.split('/')[0].strip())
-                            all_scores[metric].append(score)
-                        except:
-                            pass
-            
-            # Calculate overall scores in format "Score: X/10"
-            overall_scores = {}
-            for metric, scores in all_scores.items():
-                if scores:
-                    avg_score = round(sum(scores) / len(scores), 1)
-                    overall_scores[metric] = f"Score: {avg_score}/10"
+                if session.summary:
+                    # Already ended; repeated calls get the same summary for free
+                    if "closing" in session.personalizing and "closing" not in session.personalized_messages:
+                        return jsonify(dict(session.summary, closing_message_pending=True)), 200
+                    return jsonify(session.summary), 200
+                
+                # Overall scores in format "Score: X/10", from the running per-metric averages
+                # (STAR rubrics for behavioral, regular for others)
+                overall_scores = {
+                    metric: f"Score: {avg_score if avg_score is not None else 0}/10"
+                    for metric, avg_score in session.average_scores().items()
+                }
+                
+                # Areas of improvement (usually already built up during the interview),
+                # bounded by the summary deadline
+                if IMPROVEMENT_DIGEST_ENABLED:
+                    improvements_stage = lambda: improvement_digester.final_improvements(session)
                 else:
-                    overall_scores[metric] = "Score: 0/10"
-            
-            # Generate areas of improvement
-            improvements = ImprovementAgent.generate_improvements(
-                session.detailed_evaluations,
-                session.job_role,
-                session.interview_type
-            )
-            
-            # Generate closing message for behavioral interviews
-            closing_message = RecruiterAgent.get_closing_message(
-                session.name,
-                session.interview_type,
-                overall_scores
-            )
-            
-            # Compile summary without detailed per-question evaluations
-            summary = {
-                "session_id": session_id,
-                "name": session.name,
-                "job_role": session.job_role,
-                "interview_type": session.interview_type,
-                "total_questions": len(session.questions),
-                "total_answers": len(session.answers),
-                "overall_scores": overall_scores,
-                "areas_of_improvement": improvements,
-                "closing_message": closing_message
-            }
+                    improvements_stage = lambda: ImprovementAgent.generate_improvements(
+                        session.detailed_evaluations,
+                        session.job_role,
+                        session.interview_type
+                    )
+                results, partial = run_summary_stages(
+                    {"areas_of_improvement": improvements_stage},
+                    {"areas_of_improvement": lambda: session.improvement_digest or dict(ImprovementAgent.DEFAULT_IMPROVEMENTS)},
+                    deadline,
+                )
+                improvements = results["areas_of_improvement"]
+                
+                # Templated closing message; a personalized one may replace it in the background
+                closing_message = session.personalized_messages.get("closing") or RecruiterAgent.get_closing_message(
+                    session.name,
+                    session.interview_type,
+                    overall_scores
+                )
+                
+                # Compile summary without detailed per-question evaluations
+                summary = {
+                    "session_id": session_id,
+                    "name": session.name,
+                    "job_role": session.job_role,
+                    "interview_type": session.interview_type,
+                    "total_questions": len(session.questions),
+                    "total_answers": len(session.answers),
+                    "overall_scores": overall_scores,
+                    "areas_of_improvement": improvements,
+                    "closing_message": closing_message
+                }
+                if partial:
+                    summary["partial"] = partial
+                
+                # Mark as completed; only a complete summary is kept, so a retry can fill in the rest.
+                # The last answer already sets completed, so whether the closing message was
+                # personalized is tracked separately and saved before it is scheduled
+                session.completed = True
+                personalize_closing = RECRUITER_LLM_MESSAGES and "closing" not in session.personalizing
+                if personalize_closing:
+                    session.personalizing.append("closing")
+                if not partial:
+                    session.summary = summary
+                session_manager.save_session(session)
+                if not partial:
+                    # Persisted with the first complete summary, so fallback improvements never
+                    # reach the database. Only enqueues; the write happens on the persister thread
+                    persist_completed_interview(session, improvements)
+                if personalize_closing:
+                    personalize_in_background(
+                        session_manager, session_id, "closing",
+                        lambda: RecruiterAgent.personalize_closing_message(
+                            session.name, session.interview_type, overall_scores))
+                if "closing" in session.personalizing and "closing" not in session.personalized_messages:
+                    # Tells the client to poll the progress endpoint for the personalized message
+                    return jsonify(dict(summary, closing_message_pending=True)), 200
+                
+                return jsonify(summary), 200
             
-            # Mark as completed
-            session.completed = True
+        except SessionConflictError:
+            return jsonify({"error": "Session was updated by another request, please retry"}), 409
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/mock-interview/progress', methods=['GET'])
+    def interview_progress():
+        """Answers so far and running average scores, without ending the interview."""
+        try:
+            session_id = request.args.get('session_id', '').strip()
+            if not session_id:
+                return jsonify({"error": "session_id is required"}), 400
             
-            return jsonify(summary), 200
+            session = session_manager.get_session(session_id)
+            if not session:
+                return jsonify({"error": "Invalid session_id"}), 404
             
+            return jsonify(session.progress()), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/mock-interview/metrics', methods=['GET'])
+    def mock_interview_metrics():
+        """Live session gauges, eviction and persistence counters."""
+        try:
+            return jsonify(dict(session_manager.stats(), persistence=interview_persister.stats(),
+                                improvement_digest=improvement_digester.stats(),
+                                hints=hint_provider.stats(), follow_ups=follow_up_provider.stats())), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -1068,16 +1235,23 @@ if MOCK_INTERVIEW_AVAILABLE:
             if not session_id:
                 return jsonify({"error": "session_id is required"}), 400
 
-            session = session_manager.get_session(session_id)
-            if not session:
-                return jsonify({"error": "Invalid session_id"}), 404
+            with session_manager.session_lock(session_id):
+                session = session_manager.get_session(session_id)
+                if not session:
+                    return jsonify({"error": "Invalid session_id"}), 404
 
-            # When follow-ups are in progress, clear them and move on
-            session.follow_up_questions = []
-            session.current_follow_up_index = 0
+                # When follow-ups are in progress, clear them and move on
+                session.follow_up_questions = []
+                session.current_follow_up_index = 0
 
-            return handle_next_main_question(session, session_id, None)
+                response = handle_next_main_question(session, session_id, None)
+                session_manager.save_session(session)
+            
+            prefetch_hint(session)
+            return response
 
+        except SessionConflictError:
+            return jsonify({"error": "Session was updated by another request, please retry"}), 409
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -0,0 +1,219 @@
+"""
+Audio helpers for voice processing.
+"""
+import os
+import struct
+import subprocess
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Whisper models expect 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# Voice uploads beyond these limits are rejected before any model work
+VOICE_MAX_UPLOAD_BYTES = int(os.getenv("VOICE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+VOICE_MAX_DURATION_SECONDS = float(os.getenv("VOICE_MAX_DURATION_SECONDS", "300"))
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode an uploaded recording."""
+
+
+class UploadLimitError(Exception):
+    """Raised when a recording exceeds VOICE_MAX_UPLOAD_BYTES or VOICE_MAX_DURATION_SECONDS."""
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    pos, byte_rate = 12, None
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk_id == b"fmt " and pos + 20 <= len(data):
+            byte_rate = struct.unpack_from("<I", data, pos + 16)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed WAVs carry a placeholder size; trust the bytes we have
+            return min(size, len(data) - pos - 8) / byte_rate
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def _ogg_duration(data: bytes) -> Optional[float]:
+    if b"OpusHead" in data[:512]:
+        rate = 48000  # Opus granule positions always count 48 kHz samples
+    else:
+        marker = data.find(b"\x01vorbis", 0, 512)
+        if marker < 0 or marker + 16 > len(data):
+            return None
+        rate = struct.unpack_from("<I", data, marker + 12)[0]
+    last_page = data.rfind(b"OggS")
+    if not rate or last_page < 0 or last_page + 14 > len(data):
+        return None
+    granule = struct.unpack_from("<q", data, last_page + 6)[0]
+    return granule / rate if granule > 0 else None
+
+
+def _webm_duration(data: bytes) -> Optional[float]:
+    # MediaRecorder output usually omits Duration; files from other tools carry it
+    head = data[:4096]
+    info = head.find(b"\x15\x49\xa9\x66")
+    if info < 0:
+        return None
+    scale = 1_000_000  # TimecodeScale default, in ns
+    scale_pos = head.find(b"\x2a\xd7\xb1", info)
+    if scale_pos >= 0 and scale_pos + 4 < len(head) and 0x81 <= head[scale_pos + 3] <= 0x88:
+        size = head[scale_pos + 3] & 0x0F
+        scale = int.from_bytes(head[scale_pos + 4:scale_pos + 4 + size], "big") or scale
+    dur_pos = head.find(b"\x44\x89", info)
+    if dur_pos < 0 or dur_pos + 3 > len(head):
+        return None
+    if head[dur_pos + 2] == 0x84 and dur_pos + 7 <= len(head):
+        duration = struct.unpack_from(">f", head, dur_pos + 3)[0]
+    elif head[dur_pos + 2] == 0x88 and dur_pos + 11 <= len(head):
+        duration = struct.unpack_from(">d", head, dur_pos + 3)[0]
+    else:
+        return None
+    return duration * scale / 1e9
+
+
+def _mp4_duration(data: bytes) -> Optional[float]:
+    pos = data.find(b"mvhd")
+    if pos < 0 or pos + 32 > len(data):
+        return None
+    if data[pos + 4] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, pos + 24)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, pos + 16)
+    return duration / timescale if timescale else None
+
+
+def header_duration(data: bytes) -> Optional[float]:
+    """Read a recording's duration from its container headers without decoding.
+
+    Supports WAV, Ogg (Opus/Vorbis), WebM/Matroska with a Duration element and
+    MP4/M4A. Returns None when the container does not state it.
+    """
+    try:
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            return _wav_duration(data)
+        if data[:4] == b"OggS":
+            return _ogg_duration(data)
+        if data[:4] == b"\x1a\x45\xdf\xa3":
+            return _webm_duration(data)
+        if data[4:8] == b"ftyp":
+            return _mp4_duration(data)
+    except struct.error:
+        pass
+    return None
+
+
+def check_upload_limits(data: bytes):
+    """Reject oversize recordings by byte count and stated duration, before decoding."""
+    if len(data) > VOICE_MAX_UPLOAD_BYTES:
+        raise UploadLimitError(
+            f"Recording is too large (limit {VOICE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB)")
+    duration = header_duration(data)
+    if duration is not None and duration > VOICE_MAX_DURATION_SECONDS:
+        raise UploadLimitError(
+            f"Recording is too long ({duration:.0f}s, limit {VOICE_MAX_DURATION_SECONDS:.0f}s)")
+
+
+def decode_audio_bytes(data: bytes, sample_rate: int = SAMPLE_RATE,
+                       max_seconds: Optional[float] = None) -> np.ndarray:
+    """Decode an encoded recording (webm/ogg/mp3/m4a/wav) held in memory.
+
+    ffmpeg reads the upload from stdin and writes 16-bit PCM to stdout, so
+    nothing touches the disk. Returns mono float32 samples in [-1, 1]. With
+    `max_seconds`, decoding stops after that much audio.
+    """
+    return _ffmpeg_decode("pipe:0", data, sample_rate, max_seconds)
+
+
+def decode_audio_file(path: str, sample_rate: int = SAMPLE_RATE,
+                      max_seconds: Optional[float] = None) -> np.ndarray:
+    """decode_audio_bytes for a recording on disk, for containers ffmpeg must seek (e.g. m4a with a trailing index)."""
+    return _ffmpeg_decode(path, None, sample_rate, max_seconds)
+
+
+def _ffmpeg_decode(source: str, data: Optional[bytes], sample_rate: int,
+                   max_seconds: Optional[float]) -> np.ndarray:
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-threads", "0",
+        "-i", source,
+    ]
+    if max_seconds is not None:
+        cmd += ["-t", str(max_seconds)]
+    cmd += [
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    except FileNotFoundError as e:
+        raise AudioDecodeError("ffmpeg is not installed") from e
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(e.stderr.decode(errors="replace").strip() or "ffmpeg failed") from e
+    if not proc.stdout:
+        raise AudioDecodeError("ffmpeg produced no audio")
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def trim_silence(
+    samples: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: int = 30,
+    min_db: float = -45.0,
+    noise_margin_db: float = 10.0,
+    padding_ms: int = 200,
+    max_pause_ms: int = 600,
+) -> Tuple[np.ndarray, float]:
+    """Energy-based voice activity detection.
+
+    Frames louder than both `min_db` (dBFS) and the estimated noise floor plus
+    `noise_margin_db` count as speech. Leading/trailing silence is dropped and
+    pauses longer than `max_pause_ms` are shortened to that length, keeping
+    `padding_ms` around speech so word edges are not clipped.
+
+    Returns the trimmed samples and the fraction of frames that held speech.
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    num_frames = len(samples) // frame_len
+    if num_frames == 0:
+        return samples[:0], 0.0
+
+    frames = samples[:num_frames * frame_len].reshape(num_frames, frame_len)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-10))
+    noise_floor = np.percentile(db, 10)
+    # Recordings without any silence have a "noise floor" at speech level;
+    # never demand more than 30 dB below the loudest frame
+    threshold = max(min_db, min(noise_floor + noise_margin_db, db.max() - 30.0))
+    is_speech = db > threshold
+    speech_ratio = float(is_speech.mean())
+    if not is_speech.any():
+        return samples[:0], 0.0
+
+    # Widen speech regions so soft onsets and endings survive
+    pad = max(1, padding_ms // frame_ms)
+    keep = np.convolve(is_speech, np.ones(2 * pad + 1), mode="same") > 0
+
+    # Shorten long pauses instead of removing them so phrasing is preserved
+    max_pause = max(1, max_pause_ms // frame_ms)
+    kept_idx = np.flatnonzero(keep)
+    run = 0
+    for i in range(kept_idx[0], kept_idx[-1] + 1):
+        if keep[i]:
+            run = 0
+            continue
+        run += 1
+        if run <= max_pause:
+            keep[i] = True
+
+    trimmed = frames[keep].reshape(-1)
+    return trimmed, speech_ratio
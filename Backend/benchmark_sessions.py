@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Measure memory held by mock interview sessions.
+
+Builds N synthetic sessions (default 1,000) with realistic evaluation text and
+reports the traced heap per session for the previous dict-based layout
+(answers as dicts plus a second detailed_evaluations list) and the current
+slotted Session/AnswerRecord layout, plus the serialized size stored in a
+shared session store.
+
+Usage:
+    python benchmark_sessions.py
+    python benchmark_sessions.py --sessions 1000 --answers 8
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import uuid
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_interview_config import DEFAULT_RUBRIC_METRICS  # noqa: E402
+from mock_interview_session_manager import Session  # noqa: E402
+
+
+class LegacySession:
+    """The session layout before AnswerRecord: plain attributes and nested dicts."""
+
+    def __init__(self, name, job_role, interview_type):
+        self.session_id = str(uuid.uuid4())
+        self.name = name
+        self.job_role = job_role
+        self.interview_type = interview_type
+        self.created_at = datetime.now()
+        self.questions = []
+        self.current_question_index = 0
+        self.answers = []
+        self.follow_up_questions = []
+        self.current_follow_up_index = 0
+        self.detailed_evaluations = []
+        self.last_question = ""
+        self.completed = False
+        self.next_followup_after = 1
+
+    def add_answer(self, question, answer, evaluation):
+        # Mirrors what the interact endpoint used to store
+        self.answers.append({
+            "question": question,
+            "answer": answer,
+            "is_followup": False,
+            "feedback": evaluation["short_feedback"],
+            "detailed_evaluation": evaluation["detailed_evaluation"],
+        })
+        self.detailed_evaluations.append({"question": question, "evaluation": evaluation})
+
+    def to_bytes(self):
+        # The dict-based store format: minified JSON, zlib-compressed when large
+        state = dict(self.__dict__, created_at=self.created_at.isoformat())
+        raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+        return b"z" + zlib.compress(raw, 6) if len(raw) > 1024 else b"j" + raw
+
+
+def synthetic_evaluation(i, j):
+    rubric = {metric: f"{(i + j + k) % 10 + 1}/10 - The answer {'covers' if k % 2 else 'misses'} "
+                      f"key points for {metric.lower()} in question {j} of session {i}."
+              for k, metric in enumerate(DEFAULT_RUBRIC_METRICS)}
+    detailed = "SHORT_FEEDBACK: ...\nDETAILED_EVALUATION:\n" + "\n".join(
+        f"{metric}: {text}" for metric, text in rubric.items()) + f"\nADDITIONAL_NOTES: Session {i}, answer {j}."
+    return {
+        "short_feedback": f"Good structure in answer {j} of session {i}.\nAdd a concrete example next time.",
+        "detailed_evaluation": detailed,
+        "rubric_scores": rubric,
+        "is_irrelevant": False,
+    }
+
+
+def build(session_cls, count, answers):
+    sessions = []
+    for i in range(count):
+        session = session_cls(f"Candidate {i}", "Python Developer", "Technical")
+        session.questions = [f"Question {j} for session {i}: explain how you would design service {j}."
+                             for j in range(answers)]
+        for j in range(answers):
+            answer = f"Answer {j} from session {i}: " + "I would start by clarifying requirements. " * 6
+            session.add_answer(session.questions[j], answer, synthetic_evaluation(i, j))
+        sessions.append(session)
+    return sessions
+
+
+def measure(session_cls, count, answers):
+    gc.collect()
+    tracemalloc.start()
+    sessions = build(session_cls, count, answers)
+    gc.collect()
+    heap, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    serialized = sum(len(session.to_bytes()) for session in sessions)
+    return heap / count, serialized / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--answers', type=int, default=8, help='Evaluated answers per session')
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.answers} answers")
+    print(f"{'layout':<16}{'heap/session':>16}{'stored/session':>18}")
+    results = {}
+    for label, session_cls in (("dict (before)", LegacySession), ("slots (after)", Session)):
+        heap, stored = measure(session_cls, args.sessions, args.answers)
+        results[label] = heap
+        print(f"{label:<16}{heap / 1024:>13.1f} KB{stored / 1024:>15.1f} KB")
+    before, after = results["dict (before)"], results["slots (after)"]
+    print(f"Heap reduction: {(1 - after / before):.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Compare transcription engines on a fixed local audio corpus.
+
+The corpus is a directory of audio files (.wav/.webm/.ogg/.mp3/.m4a), each with
+a reference transcript next to it using the same name and a .txt extension.
+For every engine the script reports the real-time factor (processing seconds
+per second of audio, lower is better) and the word error rate against the
+references.
+
+Usage:
+    python benchmark_transcription.py --corpus audio_corpus
+    python benchmark_transcription.py --corpus audio_corpus --faster-model small --threads 4
+    python benchmark_transcription.py --corpus audio_corpus --concurrency 1,2,4,8
+
+With --concurrency the script instead measures aggregate throughput (seconds
+of audio transcribed per wall-clock second) of the transcription process pool
+at each number of concurrent requests, comparing an untuned pool (one worker
+per request, every worker free to use all cores) with the auto-tuned one.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+AUDIO_EXTENSIONS = ('.wav', '.webm', '.ogg', '.mp3', '.m4a')
+SAMPLE_RATE = 16000
+
+
+def normalize_words(text):
+    """Lowercase and strip punctuation so WER only counts word differences."""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Levenshtein distance over words divided by the reference length."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_corpus(corpus_dir):
+    items = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if not name.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        audio_path = os.path.join(corpus_dir, name)
+        reference_path = os.path.splitext(audio_path)[0] + '.txt'
+        if not os.path.isfile(reference_path):
+            print(f"Skipping {name}: no reference transcript")
+            continue
+        with open(reference_path, encoding='utf-8') as f:
+            items.append((audio_path, f.read().strip()))
+    return items
+
+
+def audio_duration(audio_path):
+    import whisper  # type: ignore
+    return len(whisper.load_audio(audio_path)) / SAMPLE_RATE
+
+
+def run_engine(voice_processor, engine, model_size, corpus, durations):
+    # Load outside the timed region so results reflect steady-state inference
+    voice_processor.get_whisper_model(engine, model_size)
+    total_seconds = 0.0
+    total_errors = 0.0
+    total_words = 0
+    for audio_path, reference in corpus:
+        start = time.perf_counter()
+        text = voice_processor.transcribe_local(audio_path, engine=engine, model_size=model_size)
+        total_seconds += time.perf_counter() - start
+        words = len(normalize_words(reference))
+        total_errors += word_error_rate(reference, text) * words
+        total_words += words
+    rtf = total_seconds / sum(durations) if durations else 0.0
+    wer = total_errors / total_words if total_words else 0.0
+    return total_seconds, rtf, wer
+
+
+def pool_throughput(pool, corpus, durations, concurrency):
+    """Audio seconds per wall second with `concurrency` requests in flight."""
+    pool.warm_up()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(pool.transcribe, [path for path, _ in corpus]))
+    return sum(durations) / (time.perf_counter() - start)
+
+
+def run_concurrency(levels, corpus, durations, engine):
+    import transcription_pool
+    cores = len(transcription_pool.available_cpus())
+    workers, threads = transcription_pool.auto_tune()
+    print(f"Cores: {cores}, tuned pool: {workers} workers x {threads} threads (pinned: "
+          f"{transcription_pool.TRANSCRIBE_POOL_PIN_CPUS})")
+    print(f"{'concurrency':<14}{'untuned audio s/s':>20}{'tuned audio s/s':>20}")
+
+    tuned = transcription_pool.TranscriptionPool(workers, threads, engine=engine)
+    try:
+        for level in levels:
+            # The untuned baseline: as many workers as requests, no thread limit
+            untuned = transcription_pool.TranscriptionPool(level, cores, pin=False, engine=engine)
+            try:
+                untuned_rate = pool_throughput(untuned, corpus, durations, level)
+            finally:
+                untuned.shutdown()
+            tuned_rate = pool_throughput(tuned, corpus, durations, level)
+            print(f"{level:<14}{untuned_rate:>20.2f}{tuned_rate:>20.2f}")
+    finally:
+        tuned.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audio_corpus'))
+    parser.add_argument('--baseline-model', default='base', help='openai-whisper model size to compare against')
+    parser.add_argument('--faster-model', default='base', help='faster-whisper model size')
+    parser.add_argument('--compute-type', default=None, help='faster-whisper compute type (default: FASTER_WHISPER_COMPUTE_TYPE)')
+    parser.add_argument('--threads', type=int, default=None, help='CPU threads per engine (default: WHISPER_THREADS)')
+    parser.add_argument('--concurrency', default=None,
+                        help='Comma-separated concurrency levels for the process pool throughput test, e.g. 1,2,4,8')
+    parser.add_argument('--engine', default=None, help='Engine for the throughput test (default: TRANSCRIBE_ENGINE)')
+    args = parser.parse_args()
+
+    if args.compute_type:
+        os.environ['FASTER_WHISPER_COMPUTE_TYPE'] = args.compute_type
+    if args.threads is not None:
+        os.environ['WHISPER_THREADS'] = str(args.threads)
+    import voice_processor
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No audio files with reference transcripts found in {args.corpus}")
+        return 1
+    durations = [audio_duration(path) for path, _ in corpus]
+    print(f"Corpus: {len(corpus)} files, {sum(durations):.1f}s of audio")
+    print(f"Threads: {voice_processor.WHISPER_THREADS or 'default'}, "
+          f"faster-whisper compute type: {voice_processor.FASTER_WHISPER_COMPUTE_TYPE}")
+    print("=" * 60)
+
+    if args.concurrency:
+        levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+        run_concurrency(levels, corpus, durations, args.engine or voice_processor.TRANSCRIBE_ENGINE)
+        return 0
+
+    print(f"{'engine':<32}{'seconds':>10}{'RTF':>8}{'WER':>8}")
+
+    for engine, model_size in (("openai-whisper", args.baseline_model), ("faster-whisper", args.faster_model)):
+        seconds, rtf, wer = run_engine(voice_processor, engine, model_size, corpus, durations)
+        print(f"{engine + ' (' + model_size + ')':<32}{seconds:>10.2f}{rtf:>8.3f}{wer:>8.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
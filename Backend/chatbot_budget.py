@@ -0,0 +1,281 @@
+"""
+Prompt token budgeting for the chatbot.
+
+Every chatbot prompt is kept under CHATBOT_PROMPT_TOKEN_BUDGET tokens, counted
+locally with tiktoken (installed with langchain-openai). If tiktoken is
+missing, a four-characters-per-token estimate is used instead.
+
+- Uploaded text files longer than CHATBOT_FILE_TOKEN_BUDGET are split into
+  chunks and each chunk is summarized (in parallel, cached by content). If
+  summarizing is disabled or fails, the file is cut down to its beginning
+  and end.
+- The latest CHATBOT_RECENT_MESSAGES history messages are sent as they are,
+  as long as they fit. Older ones are rolled into a running summary. The
+  summary is cached by a chained hash of the messages it covers. It is
+  extended on a background thread, never inside the request. A prompt uses
+  the newest cached summary, plus, as the budget allows, the messages it
+  does not cover yet.
+- If the prompt is still over budget, the summary and then the oldest
+  messages are dropped, and the user's text is truncated as a last resort.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from result_cache import ResultCache, content_key
+
+logger = logging.getLogger(__name__)
+
+CHATBOT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHATBOT_PROMPT_TOKEN_BUDGET", "6000"))
+CHATBOT_FILE_TOKEN_BUDGET = int(os.getenv("CHATBOT_FILE_TOKEN_BUDGET", "2500"))
+CHATBOT_RECENT_MESSAGES = int(os.getenv("CHATBOT_RECENT_MESSAGES", "6"))
+CHATBOT_SUMMARY_TOKENS = int(os.getenv("CHATBOT_SUMMARY_TOKENS", "400"))
+CHATBOT_SUMMARIZE = os.getenv("CHATBOT_SUMMARIZE", "true").lower() == "true"
+CHATBOT_SUMMARY_MODEL = os.getenv("CHATBOT_SUMMARY_MODEL", "gpt-4o-mini")
+
+# Files are summarized in at most this many chunks; the rest is cut
+_MAX_FILE_CHUNKS = 8
+# Per-message overhead of the chat format, and a flat charge for an attached image
+_MESSAGE_OVERHEAD_TOKENS = 4
+_IMAGE_TOKENS = 765
+# Token counts remembered by content digest, so large texts are not kept alive
+_TOKEN_COUNT_CACHE_SIZE = 4096
+
+summary_cache = ResultCache("chatbot_summaries")
+
+_token_counts: "OrderedDict[str, int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+_summary_executor: Optional[ThreadPoolExecutor] = None
+# Digests of the history prefixes being summarized right now
+_summaries_in_flight: Set[str] = set()
+_summary_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken  # type: ignore
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    key = content_key(text)
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+    count = len(encoding.encode(text, disallowed_special=()))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        while len(_token_counts) > _TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the beginning and end of `text` within `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = "\n\n[... truncated ...]\n\n"
+    keep = max(0, max_tokens - count_tokens(marker))
+    encoding = _encoding()
+    if encoding is None:
+        head, tail = keep * 4 * 2 // 3, keep * 4 // 3
+        return text[:head] + marker + (text[-tail:] if tail else "")
+    tokens = encoding.encode(text, disallowed_special=())
+    head, tail = keep * 2 // 3, keep // 3
+    return encoding.decode(tokens[:head]) + marker + (encoding.decode(tokens[-tail:]) if tail else "")
+
+
+def message_tokens(message: Dict) -> int:
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return count_tokens(content) + _MESSAGE_OVERHEAD_TOKENS
+    total = _MESSAGE_OVERHEAD_TOKENS
+    for part in content:
+        if part.get("type") == "text":
+            total += count_tokens(part.get("text", ""))
+        else:
+            total += _IMAGE_TOKENS
+    return total
+
+
+def _summarize(text: str, max_tokens: int, instruction: str) -> str:
+    """One model call, cached by content."""
+    key = content_key("summary", CHATBOT_SUMMARY_MODEL, str(max_tokens), instruction, text)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached["text"]
+    from voice_processor import get_openai_client
+    completion = get_openai_client().chat.completions.create(
+        model=CHATBOT_SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": instruction},
+            {"role": "user", "content": text},
+        ],
+        temperature=0.2,
+        max_tokens=max_tokens,
+    )
+    summary = (completion.choices[0].message.content or "").strip()
+    summary_cache.set(key, {"text": summary})
+    return summary
+
+
+def fit_file_content(file_name: str, content: str, max_tokens: int = CHATBOT_FILE_TOKEN_BUDGET) -> str:
+    """File content that fits in `max_tokens`, chunk-summarized when it is too long."""
+    if count_tokens(content) <= max_tokens:
+        return content
+    if CHATBOT_SUMMARIZE:
+        try:
+            return _summarize_file(file_name, content, max_tokens)
+        except Exception as e:
+            logger.warning(f"Could not summarize {file_name}, truncating instead: {e}")
+    return truncate_tokens(content, max_tokens)
+
+
+def _summarize_file(file_name: str, content: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    chunk_tokens = max_tokens * 2
+    if encoding is None:
+        step = chunk_tokens * 4
+        chunks = [content[i:i + step] for i in range(0, len(content), step)]
+    else:
+        tokens = encoding.encode(content, disallowed_special=())
+        chunks = [encoding.decode(tokens[i:i + chunk_tokens]) for i in range(0, len(tokens), chunk_tokens)]
+    omitted = len(chunks) > _MAX_FILE_CHUNKS
+    chunks = chunks[:_MAX_FILE_CHUNKS]
+    per_chunk = max(64, max_tokens // len(chunks) - 16)
+    instruction = (f"Summarize this part of the file '{file_name}' for a later question about it. "
+                   "Keep names, code identifiers, numbers and anything a reader would ask about.")
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        summaries = list(executor.map(lambda chunk: _summarize(chunk, per_chunk, instruction), chunks))
+    parts = [f"[Part {i + 1} of {len(chunks)}, summarized]\n{summary}" for i, summary in enumerate(summaries)]
+    if omitted:
+        parts.append("[The rest of the file was too long to include]")
+    return truncate_tokens("\n\n".join(parts), max_tokens)
+
+
+def _history_digest(previous: str, message: Dict) -> str:
+    return content_key(previous, message.get("role", ""), str(message.get("content", "")))
+
+
+def _history_digests(messages: List[Dict]) -> List[str]:
+    digests, digest = [], ""
+    for message in messages:
+        digest = _history_digest(digest, message)
+        digests.append(digest)
+    return digests
+
+
+def cached_summary(messages: List[Dict], digests: Optional[List[str]] = None) -> Tuple[str, int]:
+    """Newest cached summary of a prefix of `messages`, and how many messages it covers."""
+    digests = digests if digests is not None else _history_digests(messages)
+    for i in range(len(digests) - 1, -1, -1):
+        cached = summary_cache.get(content_key("history", digests[i]))
+        if cached is not None:
+            return cached["text"], i + 1
+    return "", 0
+
+
+def _extend_summary(messages: List[Dict], digests: List[str]):
+    try:
+        summary, start = cached_summary(messages, digests)
+        new_text = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages[start:])
+        text = f"Summary so far:\n{summary}\n\nNew messages:\n{new_text}" if summary else new_text
+        summary = _summarize(
+            truncate_tokens(text, CHATBOT_PROMPT_TOKEN_BUDGET), CHATBOT_SUMMARY_TOKENS,
+            "Summarize this interview-preparation chat so it can continue without the full history. "
+            "Keep the user's goals, the topics covered and any facts or decisions they rely on.",
+        )
+        summary_cache.set(content_key("history", digests[-1]), {"text": summary})
+    except Exception as e:
+        logger.warning(f"Could not summarize chatbot history: {e}")
+    finally:
+        with _summary_lock:
+            _summaries_in_flight.discard(digests[-1])
+
+
+def refresh_summary(messages: List[Dict], digests: Optional[List[str]] = None):
+    """Extend the cached summary to cover `messages`, on a background thread."""
+    if not messages or not CHATBOT_SUMMARIZE:
+        return
+    digests = digests if digests is not None else _history_digests(messages)
+    global _summary_executor
+    with _summary_lock:
+        if digests[-1] in _summaries_in_flight:
+            return
+        _summaries_in_flight.add(digests[-1])
+        if _summary_executor is None:
+            # Created lazily so gunicorn's fork happens before the threads exist
+            _summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chatbot-summary")
+    _summary_executor.submit(_extend_summary, list(messages), digests)
+
+
+def fit_prompt(system: Dict, history: List[Dict], user: Dict,
+               budget: int = CHATBOT_PROMPT_TOKEN_BUDGET,
+               history_tokens: Optional[List[int]] = None) -> List[Dict]:
+    """[system, (summary), recent history..., user] within `budget` tokens.
+
+    `history_tokens` are the content token counts of `history`, if already known.
+    """
+    user_tokens = message_tokens(user)
+    available = budget - message_tokens(system) - user_tokens
+    if available < 0:
+        user = _truncate_user(user, user_tokens + available)
+        available = 0
+
+    def cost(i: int) -> int:
+        if history_tokens is None:
+            return message_tokens(history[i])
+        return history_tokens[i] + _MESSAGE_OVERHEAD_TOKENS
+
+    start = len(history)
+    while start > 0 and len(history) - start < CHATBOT_RECENT_MESSAGES and cost(start - 1) <= available:
+        start -= 1
+        available -= cost(start)
+    recent = history[start:]
+
+    older = history[:start]
+    messages = [system]
+    summary, covered = "", 0
+    if older and CHATBOT_SUMMARIZE:
+        digests = _history_digests(older)
+        summary, covered = cached_summary(older, digests)
+        if covered < len(older):
+            # Ready for a later request; this one uses what is cached
+            refresh_summary(older, digests)
+    if summary:
+        summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+        if message_tokens(summary_message) <= available:
+            messages.append(summary_message)
+            available -= message_tokens(summary_message)
+    # Messages the cached summary does not reach yet, newest first, while they fit
+    bridge = start
+    while bridge > covered and cost(bridge - 1) <= available:
+        bridge -= 1
+        available -= cost(bridge)
+    return messages + history[bridge:start] + recent + [user]
+
+
+def _truncate_user(user: Dict, max_tokens: int) -> Dict:
+    content = user.get("content")
+    if isinstance(content, str):
+        return dict(user, content=truncate_tokens(content, max_tokens - _MESSAGE_OVERHEAD_TOKENS))
+    images = sum(1 for part in content if part.get("type") != "text")
+    texts = max(1, len(content) - images)
+    text_budget = (max_tokens - _MESSAGE_OVERHEAD_TOKENS - images * _IMAGE_TOKENS) // texts
+    parts = [dict(part, text=truncate_tokens(part.get("text", ""), text_budget)) if part.get("type") == "text" else part
+             for part in content]
+    return dict(user, content=parts)
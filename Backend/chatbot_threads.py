@@ -0,0 +1,125 @@
+"""
+Server-side conversation threads for the chatbot.
+
+The browser used to send the whole conversation, including the contents of
+earlier uploaded files, with every /api/chatbot request. Now the server
+keeps each conversation under a thread id. The client sends only the new
+message and the threadId it got back last time.
+
+Threads are held in the same kind of store as interview sessions
+(CHATBOT_THREAD_STORE, defaulting to SESSION_STORE), in their own SQLite file
+or Redis prefix, so every worker sees them. Each message is stored with its
+token count, so prompt budgeting does not re-tokenize the history. A thread
+keeps at most CHATBOT_THREAD_MAX_MESSAGES messages. Threads idle for
+CHATBOT_THREAD_TTL seconds, and the least recently used beyond
+CHATBOT_THREAD_MAX_COUNT, are evicted.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from chatbot_budget import count_tokens
+from mock_interview_session_store import (
+    SESSION_STORE, SessionConflictError, SessionStore, create_session_store,
+)
+
+logger = logging.getLogger(__name__)
+
+CHATBOT_THREAD_STORE = os.getenv("CHATBOT_THREAD_STORE", SESSION_STORE).lower()
+CHATBOT_THREAD_STORE_PATH = os.getenv(
+    "CHATBOT_THREAD_STORE_PATH", os.path.join(tempfile.gettempdir(), "practice2panel-chat-threads.db")
+)
+CHATBOT_THREAD_PREFIX = os.getenv("CHATBOT_THREAD_PREFIX", "practice2panel:chat:")
+CHATBOT_THREAD_TTL = float(os.getenv("CHATBOT_THREAD_TTL", str(6 * 3600)))
+CHATBOT_THREAD_MAX_COUNT = int(os.getenv("CHATBOT_THREAD_MAX_COUNT", "5000"))
+CHATBOT_THREAD_MAX_MESSAGES = int(os.getenv("CHATBOT_THREAD_MAX_MESSAGES", "40"))
+
+# Serialized threads larger than this are zlib-compressed
+_COMPRESS_THRESHOLD = 1024
+# Evict idle threads after this many appends in this worker
+_SWEEP_EVERY = 100
+_SAVE_ATTEMPTS = 3
+
+
+def _encode(rows: List[list]) -> bytes:
+    raw = json.dumps(rows, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) > _COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def _decode(data: bytes) -> List[list]:
+    raw = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return json.loads(raw)
+
+
+class ChatThreads:
+    """Chat histories by thread id, stored as [role, content, tokens] rows."""
+
+    def __init__(self, store: Optional[SessionStore] = None, ttl: float = CHATBOT_THREAD_TTL,
+                 max_threads: int = CHATBOT_THREAD_MAX_COUNT, max_messages: int = CHATBOT_THREAD_MAX_MESSAGES):
+        self.store = store or create_session_store(
+            CHATBOT_THREAD_STORE, path=CHATBOT_THREAD_STORE_PATH, prefix=CHATBOT_THREAD_PREFIX
+        )
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._appends = 0
+
+    def create(self, history: Optional[List[Dict]] = None) -> str:
+        """New thread, optionally seeded with history sent by the client."""
+        if self.store.count() >= self.max_threads:
+            self.store.evict(self.ttl, self.max_threads - 1)
+        thread_id = uuid.uuid4().hex
+        rows = [[m["role"], m["content"], count_tokens(m["content"])] for m in (history or [])
+                if isinstance(m.get("content"), str)]
+        self.store.save(thread_id, _encode(self._trim(rows)), None)
+        return thread_id
+
+    def load(self, thread_id: str) -> Optional[Tuple[List[Dict], List[int]]]:
+        """(messages, token counts) for the thread, or None if it is unknown or expired."""
+        stored = self.store.load(thread_id)
+        if stored is None:
+            return None
+        rows = _decode(stored[1])
+        return [{"role": role, "content": content} for role, content, _ in rows], [tokens for _, _, tokens in rows]
+
+    def append(self, thread_id: str, messages: List[Dict]):
+        """Add messages to the thread, retrying if another request saved it meanwhile."""
+        new_rows = [[m["role"], m["content"], count_tokens(m["content"])] for m in messages]
+        for _ in range(_SAVE_ATTEMPTS):
+            stored = self.store.load(thread_id)
+            version, rows = (stored[0], _decode(stored[1])) if stored else (None, [])
+            try:
+                self.store.save(thread_id, _encode(self._trim(rows + new_rows)), version)
+                break
+            except SessionConflictError:
+                continue
+        else:
+            logger.warning(f"Could not append to chat thread {thread_id} after {_SAVE_ATTEMPTS} attempts")
+        with self._lock:
+            self._appends += 1
+            sweep = self._appends % _SWEEP_EVERY == 0
+        if sweep:
+            evicted = self.store.evict(self.ttl, self.max_threads)
+            if evicted:
+                logger.info(f"Evicted {len(evicted)} chat threads")
+
+    def _trim(self, rows: List[list]) -> List[list]:
+        # Drop a quarter at a time, so the cached history summary prefix changes rarely
+        if len(rows) <= self.max_messages:
+            return rows
+        keep = max(1, self.max_messages * 3 // 4)
+        return rows[-keep:]
+
+    def stats(self) -> Dict:
+        return dict(self.store.stats(), ttl_seconds=self.ttl, max_threads=self.max_threads)
+
+
+chat_threads = ChatThreads()
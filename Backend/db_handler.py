@@ -1,5 +1,7 @@
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+import json
 import os
 import logging
 from dotenv import load_dotenv
@@ -136,9 +138,129 @@ def create_users_table():
     finally:
         conn.close()
 
+def archive_interview_sessions(sessions):
+    """Store completed mock interview sessions (Session.to_dict() output) in interview_archive"""
+    if not sessions:
+        return
+    conn = get_pg_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS interview_archive (
+                    session_id VARCHAR(36) PRIMARY KEY,
+                    name VARCHAR(255),
+                    job_role VARCHAR(255),
+                    interview_type VARCHAR(100),
+                    created_at TIMESTAMP,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    data JSONB NOT NULL
+                );
+            """)
+            # Several workers may sweep the same shared store; keep the first copy
+            cursor.executemany(
+                "INSERT INTO interview_archive (session_id, name, job_role, interview_type, created_at, data) "
+                "VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (session_id) DO NOTHING",
+                [
+                    (s["session_id"], s["name"], s["job_role"], s["interview_type"],
+                     s["created_at"], json.dumps(s))
+                    for s in sessions
+                ],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_interview_results_tables(conn):
+    """Normalized tables for completed mock interviews"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS interview_results (
+                session_id VARCHAR(36) PRIMARY KEY,
+                name VARCHAR(255),
+                job_role VARCHAR(255),
+                interview_type VARCHAR(100),
+                started_at TIMESTAMP,
+                completed_at TIMESTAMP,
+                total_questions INTEGER,
+                total_answers INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS interview_result_answers (
+                session_id VARCHAR(36) REFERENCES interview_results(session_id) ON DELETE CASCADE,
+                position INTEGER,
+                question TEXT,
+                answer TEXT,
+                is_followup BOOLEAN,
+                feedback TEXT,
+                PRIMARY KEY (session_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS interview_result_scores (
+                session_id VARCHAR(36),
+                position INTEGER,
+                metric VARCHAR(100),
+                score REAL,
+                PRIMARY KEY (session_id, position, metric),
+                FOREIGN KEY (session_id, position)
+                    REFERENCES interview_result_answers(session_id, position) ON DELETE CASCADE
+            );
+            CREATE TABLE IF NOT EXISTS interview_result_improvements (
+                session_id VARCHAR(36) REFERENCES interview_results(session_id) ON DELETE CASCADE,
+                category VARCHAR(100),
+                suggestion TEXT,
+                PRIMARY KEY (session_id, category)
+            );
+        """)
+
+def ensure_interview_results_tables():
+    """Create the interview_results tables if they do not exist (run once per process)."""
+    conn = get_pg_connection()
+    try:
+        create_interview_results_tables(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def insert_interview_results(results):
+    """Bulk insert completed interviews in one transaction.
+
+    Each result is a dict with the interview_results columns plus "answers"
+    (dicts with question/answer/is_followup/feedback/scores) and
+    "improvements" ({category: suggestion}). Re-inserting a session is a no-op.
+    The tables must exist (see ensure_interview_results_tables).
+    """
+    if not results:
+        return
+    session_rows, answer_rows, score_rows, improvement_rows = [], [], [], []
+    for r in results:
+        session_rows.append((r["session_id"], r["name"], r["job_role"], r["interview_type"],
+                             r["started_at"], r["completed_at"], r["total_questions"], r["total_answers"]))
+        for position, a in enumerate(r["answers"]):
+            answer_rows.append((r["session_id"], position, a["question"], a["answer"], a["is_followup"], a["feedback"]))
+            score_rows.extend((r["session_id"], position, metric, score) for metric, score in a["scores"].items())
+        improvement_rows.extend((r["session_id"], category, text) for category, text in r["improvements"].items())
+
+    conn = get_pg_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_values(cursor, "INSERT INTO interview_results (session_id, name, job_role, interview_type, "
+                           "started_at, completed_at, total_questions, total_answers) VALUES %s "
+                           "ON CONFLICT DO NOTHING", session_rows)
+            execute_values(cursor, "INSERT INTO interview_result_answers (session_id, position, question, "
+                           "answer, is_followup, feedback) VALUES %s ON CONFLICT DO NOTHING", answer_rows)
+            execute_values(cursor, "INSERT INTO interview_result_scores (session_id, position, metric, score) "
+                           "VALUES %s ON CONFLICT DO NOTHING", score_rows)
+            execute_values(cursor, "INSERT INTO interview_result_improvements (session_id, category, suggestion) "
+                           "VALUES %s ON CONFLICT DO NOTHING", improvement_rows)
+        conn.commit()
+    finally:
+        conn.close()
+
 __all__ = [
     "get_pg_connection",
     "create_table_if_not_exists",
     "insert_qna_rows",
     "create_users_table",
+    "archive_interview_sessions",
+    "create_interview_results_tables",
+    "ensure_interview_results_tables",
+    "insert_interview_results",
 ]
@@ -0,0 +1,189 @@
+"""
+Write-behind persistence of completed mock interviews to Postgres.
+
+end_interview only enqueues the finished interview, so the database never adds
+to its latency. A background thread drains the queue in batches (up to
+INTERVIEW_PERSIST_BATCH_SIZE, or whatever arrived within
+INTERVIEW_PERSIST_FLUSH_SECONDS) and bulk-inserts them into the normalized
+interview_results tables. The buffer is bounded by
+INTERVIEW_PERSIST_MAX_BUFFER. When it is full, new results are dropped and
+counted rather than blocking requests. Pending results are flushed at
+interpreter shutdown.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERVIEW_PERSIST_ENABLED = os.getenv("INTERVIEW_PERSIST", "true").lower() == "true"
+INTERVIEW_PERSIST_BATCH_SIZE = int(os.getenv("INTERVIEW_PERSIST_BATCH_SIZE", "50"))
+INTERVIEW_PERSIST_FLUSH_SECONDS = float(os.getenv("INTERVIEW_PERSIST_FLUSH_SECONDS", "5"))
+INTERVIEW_PERSIST_MAX_BUFFER = int(os.getenv("INTERVIEW_PERSIST_MAX_BUFFER", "1000"))
+# A failed batch is retried this many times before it is dropped
+_MAX_ATTEMPTS = 5
+
+
+def interview_result(session, improvements: Dict[str, str]) -> Dict:
+    """Snapshot a completed Session as plain data for insert_interview_results."""
+    metrics = session.metrics
+    return {
+        "session_id": session.session_id,
+        "name": session.name,
+        "job_role": session.job_role,
+        "interview_type": session.interview_type,
+        "started_at": session.created_at,
+        "completed_at": datetime.now(),
+        "total_questions": len(session.questions),
+        "total_answers": len(session.answers),
+        "answers": [
+            {
+                "question": record.question,
+                "answer": record.answer,
+                "is_followup": record.is_followup,
+                "feedback": record.short_feedback,
+                "scores": dict(record.score_items(metrics)),
+            }
+            for record in session.answers
+        ],
+        "improvements": {category: text for category, text in (improvements or {}).items() if text},
+    }
+
+
+class InterviewPersister:
+    """Bounded queue of interview results flushed to the database by one thread."""
+
+    def __init__(self, writer=None, setup=None, batch_size: int = INTERVIEW_PERSIST_BATCH_SIZE,
+                 flush_seconds: float = INTERVIEW_PERSIST_FLUSH_SECONDS,
+                 max_buffer: int = INTERVIEW_PERSIST_MAX_BUFFER):
+        # `writer` takes a list of results; defaults to db_handler.insert_interview_results.
+        # `setup` runs once before the first write; defaults to db_handler.ensure_interview_results_tables
+        self._writer = writer
+        self._setup = setup
+        self._setup_done = False
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_buffer)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.persisted = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def _ensure_setup(self):
+        if self._setup_done:
+            return
+        if self._setup is None:
+            from db_handler import ensure_interview_results_tables
+            self._setup = ensure_interview_results_tables
+        self._setup()
+        self._setup_done = True
+
+    def _write(self, batch: List[Dict]):
+        # Only retried here if it failed when the thread started
+        self._ensure_setup()
+        if self._writer is None:
+            from db_handler import insert_interview_results
+            self._writer = insert_interview_results
+        self._writer(batch)
+
+    def _ensure_started(self):
+        # Started lazily so gunicorn's fork happens before the thread exists
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="interview-persister", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def submit(self, result: Dict) -> bool:
+        """Queue a result without blocking; returns False if the buffer is full."""
+        if self._stopped.is_set():
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(result)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"Interview persistence buffer full; dropped session {result.get('session_id')}")
+            return False
+
+    def _next_batch(self) -> List[Dict]:
+        """Block for the first result, then collect more until the batch or flush window fills."""
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_seconds
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        if item is None:
+            self._stopped.set()
+        return batch
+
+    def _run(self):
+        try:
+            self._ensure_setup()
+        except Exception as e:
+            logger.warning(f"Could not create interview results tables yet: {e}")
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[Dict]):
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                self._write(batch)
+                with self._lock:
+                    self.persisted += len(batch)
+                return
+            except Exception as e:
+                logger.warning(f"Persisting {len(batch)} interviews failed (attempt {attempt}): {e}")
+                if attempt < _MAX_ATTEMPTS and not self._stopped.is_set():
+                    time.sleep(min(30.0, 2 ** attempt))
+        with self._lock:
+            self.failed_batches += 1
+            self.dropped += len(batch)
+
+    def shutdown(self, timeout: float = 10.0):
+        """Flush what is queued and stop the thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "persisted": self.persisted,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches,
+            }
+
+
+persister = InterviewPersister()
+
+
+def persist_completed_interview(session, improvements: Dict[str, str]) -> bool:
+    """Queue a completed interview for write-behind persistence."""
+    if not INTERVIEW_PERSIST_ENABLED:
+        return False
+    return persister.submit(interview_result(session, improvements))
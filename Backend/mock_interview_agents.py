@@ -3,7 +3,7 @@ CrewAI agents for the mock interview application.
 """
 from crewai import Agent, Task, Crew
 from langchain_openai import ChatOpenAI
-from typing import List, Dict
+from typing import List, Dict, Optional
 import random
 import os
 import sys
@@ -671,9 +671,32 @@ Respond with ONLY one word: repeat_question, hint_request, need_time, or normal_
 class ImprovementAgent:
     """Generates areas of improvement based on interview performance."""
     
+    # Returned when the model call fails
+    DEFAULT_IMPROVEMENTS = {
+        "Communication": "- **Incorporate Examples**: Relate your explanations to concrete projects or experiences to keep your responses engaging and relevant.\n- **Practice Active Listening**: Rephrase or confirm the question before answering to stay aligned with the interviewer.",
+        "Knowledge Accuracy": "- **Deepen Technical Knowledge**: Refresh core concepts and be ready to explain them accurately.\n- **Stay Updated**: Keep up with recent developments so your answers reflect current best practices.",
+        "Clarity": "- **Use Structured Responses**: Organise answers with clear frameworks such as STAR.\n- **Summarise Key Points**: Close with a brief recap to reinforce your main message."
+    }
+    
     @staticmethod
     def generate_improvements(evaluations: List[Dict], job_role: str, interview_type: str) -> Dict[str, str]:
         """Generate areas of improvement for Communication, Knowledge Accuracy, and Clarity."""
+        try:
+            return ImprovementAgent.update_improvements(None, evaluations, 0, job_role, interview_type)
+        except Exception as e:
+            print(f"Error generating improvements: {e}")
+            return dict(ImprovementAgent.DEFAULT_IMPROVEMENTS)
+
+    @staticmethod
+    def update_improvements(previous: Optional[Dict[str, str]], evaluations: List[Dict], covered: int,
+                            job_role: str, interview_type: str) -> Dict[str, str]:
+        """Fold evaluations[covered:] into improvements generated from the first `covered` ones.
+
+        With `previous=None` all evaluations are summarized from scratch. The
+        prompt only carries the new feedback plus the previous suggestions, so
+        keeping improvements current after each answer stays a small call.
+        Raises if the model call fails.
+        """
         # Collect all feedback and scores
         all_feedback = []
         all_scores = {
@@ -725,7 +748,10 @@ class ImprovementAgent:
                 avg_scores[category] = 0.0
         
         # Generate improvements using AI
-        feedback_text = "\n\n".join(all_feedback[:5])  # Limit to first 5 for context
+        if previous:
+            feedback_text = "\n\n".join(all_feedback[covered:])  # Only what the previous call has not seen
+        else:
+            feedback_text = "\n\n".join(all_feedback[:5])  # Limit to first 5 for context
         
         if interview_type.lower() == "behavioral":
             rubric_guidance = """COMMUNICATION GUIDANCE:
@@ -759,13 +785,24 @@ CLARITY GUIDANCE:
 - **Use Signposting Language**: Guide the interviewer through your answer with cues like "First… Next… Finally…".
 - **Summarize Key Points**: End answers with a brief recap to reinforce your main message."""
         
+        if previous:
+            current = "\n\n".join(f"{category.upper().replace(' ', '_')}_IMPROVEMENTS:\n{text}"
+                                   for category, text in previous.items())
+            feedback_section = f"""CURRENT AREAS OF IMPROVEMENT (FROM THE FIRST {covered} ANSWERS):
+{current}
+
+NEW INTERVIEW FEEDBACK (revise the current suggestions with it, keeping those that still apply):
+{feedback_text}"""
+        else:
+            feedback_section = f"""INTERVIEW FEEDBACK SUMMARY:
+{feedback_text}"""
+        
         prompt = f"""Based on the following interview evaluations for a {job_role} position ({interview_type} interview), provide specific areas of improvement for each focus area. You must prioritise the rubric guidance provided below when crafting suggestions.
 
 RUBRIC TO FOLLOW:
 {rubric_guidance}
 
-INTERVIEW FEEDBACK SUMMARY:
-{feedback_text}
+{feedback_section}
 
 AVERAGE SCORES (OUT OF 10):
 - Communication: {avg_scores.get('Communication', 0)}/10
@@ -810,103 +847,93 @@ CLARITY_IMPROVEMENTS:
             verbose=True
         )
         
-        try:
-            result = crew.kickoff()
-            result_str = str(result) if not isinstance(result, str) else result
-            
-            # Parse improvements
-            improvements = {
-                "Communication": "",
-                "Knowledge Accuracy": "",
-                "Clarity": ""
-            }
-            
-            lines = result_str.split('\n')
-            current_category = None
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('COMMUNICATION_IMPROVEMENTS:'):
-                    current_category = "Communication"
-                    content = line.split(':', 1)[-1].strip()
-                    if content:
-                        improvements["Communication"] = content
-                elif line.startswith('KNOWLEDGE_ACCURACY_IMPROVEMENTS:'):
-                    current_category = "Knowledge Accuracy"
-                    content = line.split(':', 1)[-1].strip()
-                    if content:
-                        improvements["Knowledge Accuracy"] = content
-                elif line.startswith('CLARITY_IMPROVEMENTS:'):
-                    current_category = "Clarity"
-                    content = line.split(':', 1)[-1].strip()
-                    if content:
-                        improvements["Clarity"] = content
-                elif current_category and line:
-                    # Continue adding to current category
-                    if improvements[current_category]:
-                        improvements[current_category] += "\n" + line
-                    else:
-                        improvements[current_category] = line
-            
-            # Fallback: use OpenAI directly if parsing fails
-            if not any(improvements.values()):
-                from langchain_openai import ChatOpenAI
-                from langchain.schema import HumanMessage
-                
-                chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, api_key=OPENAI_API_KEY)
-                response = chat.invoke([HumanMessage(content=prompt)])
-                result_str = response.content
-                
-                # Simple extraction
-                for category in improvements.keys():
-                    category_upper = category.upper().replace(' ', '_')
-                    if f"{category_upper}_IMPROVEMENTS:" in result_str:
-                        start_idx = result_str.find(f"{category_upper}_IMPROVEMENTS:") + len(f"{category_upper}_IMPROVEMENTS:")
-                        # Find next category or end
-                        next_categories = [f"{c.upper().replace(' ', '_')}_IMPROVEMENTS:" for c in improvements.keys() if c != category]
-                        end_idx = len(result_str)
-                        for next_cat in next_categories:
-                            if next_cat in result_str:
-                                idx = result_str.find(next_cat, start_idx)
-                                if idx != -1:
-                                    end_idx = min(end_idx, idx)
-                        improvements[category] = result_str[start_idx:end_idx].strip()
-            
-            # Ensure we have content for each category
-            for category in improvements.keys():
-                if not improvements[category]:
-                    improvements[category] = ""
-                lines = []
-                for raw_line in improvements[category].split('\n'):
-                    line = raw_line.strip()
-                    if not line:
-                        continue
-                    if not line.startswith('-'):
-                        line = f"- {line}"
-                    if '**' not in line:
-                        if ':' in line:
-                            prefix, rest = line.split(':', 1)
-                            prefix_clean = prefix.lstrip('- ').strip()
-                            line = f"- **{prefix_clean}**:{rest}" if rest else f"- **{prefix_clean}**"
-                        else:
-                            content = line.lstrip('- ').strip()
-                            line = f"- **{content}**"
-                    lines.append(line)
-                if lines:
-                    improvements[category] = "\n".join(lines)
+        result = crew.kickoff()
+        result_str = str(result) if not isinstance(result, str) else result
+        
+        # Parse improvements
+        improvements = {
+            "Communication": "",
+            "Knowledge Accuracy": "",
+            "Clarity": ""
+        }
+        
+        lines = result_str.split('\n')
+        current_category = None
+        
+        for line in lines:
+            line = line.strip()
+            if line.startswith('COMMUNICATION_IMPROVEMENTS:'):
+                current_category = "Communication"
+                content = line.split(':', 1)[-1].strip()
+                if content:
+                    improvements["Communication"] = content
+            elif line.startswith('KNOWLEDGE_ACCURACY_IMPROVEMENTS:'):
+                current_category = "Knowledge Accuracy"
+                content = line.split(':', 1)[-1].strip()
+                if content:
+                    improvements["Knowledge Accuracy"] = content
+            elif line.startswith('CLARITY_IMPROVEMENTS:'):
+                current_category = "Clarity"
+                content = line.split(':', 1)[-1].strip()
+                if content:
+                    improvements["Clarity"] = content
+            elif current_category and line:
+                # Continue adding to current category
+                if improvements[current_category]:
+                    improvements[current_category] += "\n" + line
                 else:
-                    improvements[category] = "- **Focus Area**: Continue strengthening this skill based on the interview feedback."
+                    improvements[current_category] = line
+        
+        # Fallback: use OpenAI directly if parsing fails
+        if not any(improvements.values()):
+            from langchain_openai import ChatOpenAI
+            from langchain.schema import HumanMessage
             
-            return improvements
+            chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, api_key=OPENAI_API_KEY)
+            response = chat.invoke([HumanMessage(content=prompt)])
+            result_str = response.content
             
-        except Exception as e:
-            print(f"Error generating improvements: {e}")
-            # Return default improvements
-            return {
-                "Communication": "- **Incorporate Examples**: Relate your explanations to concrete projects or experiences to keep your responses engaging and relevant.\n- **Practice Active Listening**: Rephrase or confirm the question before answering to stay aligned with the interviewer.",
-                "Knowledge Accuracy": "- **Deepen Technical Knowledge**: Refresh core concepts and be ready to explain them accurately.\n- **Stay Updated**: Keep up with recent developments so your answers reflect current best practices.",
-                "Clarity": "- **Use Structured Responses**: Organise answers with clear frameworks such as STAR.\n- **Summarise Key Points**: Close with a brief recap to reinforce your main message."
-            }
+            # Simple extraction
+            for category in improvements.keys():
+                category_upper = category.upper().replace(' ', '_')
+                if f"{category_upper}_IMPROVEMENTS:" in result_str:
+                    start_idx = result_str.find(f"{category_upper}_IMPROVEMENTS:") + len(f"{category_upper}_IMPROVEMENTS:")
+                    # Find next category or end
+                    next_categories = [f"{c.upper().replace(' ', '_')}_IMPROVEMENTS:" for c in improvements.keys() if c != category]
+                    end_idx = len(result_str)
+                    for next_cat in next_categories:
+                        if next_cat in result_str:
+                            idx = result_str.find(next_cat, start_idx)
+                            if idx != -1:
+                                end_idx = min(end_idx, idx)
+                    improvements[category] = result_str[start_idx:end_idx].strip()
+        
+        # Ensure we have content for each category
+        for category in improvements.keys():
+            if not improvements[category]:
+                improvements[category] = ""
+            lines = []
+            for raw_line in improvements[category].split('\n'):
+                line = raw_line.strip()
+                if not line:
+                    continue
+                if not line.startswith('-'):
+                    line = f"- {line}"
+                if '**' not in line:
+                    if ':' in line:
+                        prefix, rest = line.split(':', 1)
+                        prefix_clean = prefix.lstrip('- ').strip()
+                        line = f"- **{prefix_clean}**:{rest}" if rest else f"- **{prefix_clean}**"
+                    else:
+                        content = line.lstrip('- ').strip()
+                        line = f"- **{content}**"
+                lines.append(line)
+            if lines:
+                improvements[category] = "\n".join(lines)
+            else:
+                improvements[category] = "- **Focus Area**: Continue strengthening this skill based on the interview feedback."
+        
+        return improvements
 
 
 class RecruiterAgent:
@@ -919,24 +946,83 @@ class RecruiterAgent:
             return session.questions[session.current_question_index]
         return None
     
+    # Precomputed message variants; {name} is filled in per candidate
+    POLITE_MESSAGES = {
+        "repeat": "Of course! Let me repeat that question for you.",
+        "pause": "Take your time. I'm here whenever you're ready to continue.",
+        "welcome": "Welcome! I'm excited to learn more about your background.",
+        "next": [
+            "Great! Let's move on to the next question.",
+            "Excellent! Here's the next question for you.",
+            "Thank you for that answer. Let's continue with the next question.",
+            "Well done! Moving forward to the next question.",
+            "I appreciate your response. Let's proceed to the next question.",
+            "Good answer! Here's what I'd like to ask next.",
+            "Thanks for sharing that. Let's explore the next question.",
+            "That's helpful. Moving on to the next question now."
+        ],
+        "complete": "Thank you for completing the interview! I'll prepare your detailed feedback now."
+    }
+    
+    BEHAVIORAL_WELCOME_TEMPLATES = [
+        "Hi {name}, welcome to your behavioral mock interview. I'll ask a few questions to understand how you handle real-life situations at work.",
+        "Hello {name}, thanks for joining this behavioral mock interview. I'll ask about real situations you've faced at work, so take your time and share specific examples.",
+        "Welcome, {name}! In this behavioral mock interview I'll ask about experiences from your work life. Walking me through the situation, your actions and the result works best.",
+        "Hi {name}, great to have you here. This behavioral mock interview focuses on how you've handled real challenges at work, so think of concrete examples as we go.",
+    ]
+    
+    # Behavioral closing messages by average score band: (minimum average, templates)
+    BEHAVIORAL_CLOSING_TEMPLATES = [
+        (8.0, [
+            "Thank you, {name}. You gave clear, well-structured examples with strong results. Keep bringing that level of detail to your real interviews.",
+            "Great work, {name}. Your answers showed thoughtful examples and a clear sense of impact. Keep quantifying your results to stand out even more.",
+            "Thank you, {name}. You communicated your experiences confidently and tied them to clear outcomes. Keep practising to stay this sharp.",
+        ]),
+        (5.0, [
+            "Thank you, {name}. You showed good communication and relevant examples. Keep structuring your answers with clear results to make them even stronger.",
+            "Thanks, {name}. You shared useful experiences throughout. Spelling out your specific actions and their outcomes will make your answers more compelling.",
+            "Thank you, {name}. There were solid examples in your answers. Try walking through situation, task, action and result in order to make them land even better.",
+        ]),
+        (0.0, [
+            "Thank you, {name}, for taking the time to practise. Try picking one specific example per question and walking through the situation, your actions and the result.",
+            "Thanks, {name}. Practising like this is the best way to improve. Focus on concrete examples and finish each answer with what you achieved or learned.",
+            "Thank you, {name}. Keep at it. Preparing a few real stories in advance and structuring them with STAR will make a big difference.",
+        ]),
+    ]
+    
+    CLOSING_TEMPLATES = [
+        "Thank you, {name}, for completing the interview. Your detailed feedback is ready.",
+    ]
+    
+    @staticmethod
+    def _average_score(overall_scores: Dict) -> Optional[float]:
+        """Mean of "Score: X/10" values, or None if there are none."""
+        scores = []
+        for score_str in (overall_scores or {}).values():
+            try:
+                scores.append(float(score_str.split(':')[1].split('/')[0].strip()))
+            except (IndexError, ValueError):
+                pass
+        return sum(scores) / len(scores) if scores else None
+    
     @staticmethod
     def get_closing_message(name: str, interview_type: str, overall_scores: Dict) -> str:
-        """Generate a personalized closing message based on interview type and performance."""
+        """Closing message from the templates, matched to the candidate's average score."""
         if interview_type.lower() == "behavioral":
-            # Get average score for a friendly summary
-            avg_score = 0
-            if overall_scores:
-                scores = []
-                for metric, score_str in overall_scores.items():
-                    try:
-                        score = float(score_str.split(':')[1].split('/')[0].strip())
-                        scores.append(score)
-                    except:
-                        pass
-                if scores:
-                    avg_score = sum(scores) / len(scores)
-            
-            prompt = f"""Generate a warm, professional closing message for a behavioral mock interview.
+            avg_score = RecruiterAgent._average_score(overall_scores) or 0.0
+            for minimum, templates in RecruiterAgent.BEHAVIORAL_CLOSING_TEMPLATES:
+                if avg_score >= minimum:
+                    return random.choice(templates).format(name=name)
+        return random.choice(RecruiterAgent.CLOSING_TEMPLATES).format(name=name)
+    
+    @staticmethod
+    def personalize_closing_message(name: str, interview_type: str, overall_scores: Dict) -> Optional[str]:
+        """Model-written closing message for behavioral interviews; None if unavailable."""
+        if interview_type.lower() != "behavioral":
+            return None
+        avg_score = RecruiterAgent._average_score(overall_scores) or 0
+        
+        prompt = f"""Generate a warm, professional closing message for a behavioral mock interview.
 
 Candidate Name: {name}
 Average Performance Score: {avg_score:.1f}/10
@@ -953,80 +1039,33 @@ Requirements:
 Example format: "Thank you, [Name]. You showed strong communication and thoughtful examples. Keep structuring your answers with clear results to make them even stronger."
 
 Generate the closing message:"""
+        
+        try:
+            from langchain_openai import ChatOpenAI
+            from langchain.schema import HumanMessage
             
-            try:
-                from langchain_openai import ChatOpenAI
-                from langchain.schema import HumanMessage
-                
-                chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.8, api_key=OPENAI_API_KEY)
-                response = chat.invoke([HumanMessage(content=prompt)])
-                closing_msg = response.content.strip()
-                
-                # Clean up if it has quotes or extra formatting
-                closing_msg = closing_msg.strip('"').strip("'").strip()
-                return closing_msg if closing_msg else f"Thank you, {name}. You showed strong communication and thoughtful examples. Keep structuring your answers with clear results to make them even stronger."
-            except:
-                return f"Thank you, {name}. You showed strong communication and thoughtful examples. Keep structuring your answers with clear results to make them even stronger."
-        else:
-            return f"Thank you, {name}, for completing the interview. Your detailed feedback is ready."
+            chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.8, api_key=OPENAI_API_KEY)
+            response = chat.invoke([HumanMessage(content=prompt)])
+            closing_msg = response.content.strip()
+            
+            # Clean up if it has quotes or extra formatting
+            closing_msg = closing_msg.strip('"').strip("'").strip()
+            return closing_msg or None
+        except Exception as e:
+            print(f"Error personalizing closing message: {e}")
+            return None
     
     @staticmethod
     def get_welcome_message(name: str, interview_type: str) -> str:
-        """Generate a personalized welcome message based on interview type."""
+        """Welcome message from the templates (behavioral interviews only)."""
         if interview_type.lower() == "behavioral":
-            prompt = f"""Generate a warm, professional welcome message for a behavioral mock interview.
-
-Candidate Name: {name}
-
-Requirements:
-- Start with a friendly greeting using the candidate's name
-- Welcome them to their behavioral mock interview
-- Briefly explain that you'll ask questions to understand how they handle real-life situations at work
-- Keep it conversational and human-like (not robotic)
-- Maximum 2-3 sentences
-- Be warm, professional, and encouraging
-
-Example format: "Hi [Name], welcome to your behavioral mock interview. I'll ask a few questions to understand how you handle real-life situations at work."
-
-Generate the welcome message:"""
-            
-            try:
-                from langchain_openai import ChatOpenAI
-                from langchain.schema import HumanMessage
-                
-                chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.8, api_key=OPENAI_API_KEY)
-                response = chat.invoke([HumanMessage(content=prompt)])
-                welcome_msg = response.content.strip()
-                
-                # Clean up if it has quotes or extra formatting
-                welcome_msg = welcome_msg.strip('"').strip("'").strip()
-                return welcome_msg if welcome_msg else f"Hi {name}, welcome to your behavioral mock interview. I'll ask a few questions to understand how you handle real-life situations at work."
-            except:
-                return f"Hi {name}, welcome to your behavioral mock interview. I'll ask a few questions to understand how you handle real-life situations at work."
-        else:
-            return None  # No welcome message for non-behavioral interviews
+            return random.choice(RecruiterAgent.BEHAVIORAL_WELCOME_TEMPLATES).format(name=name)
+        return None  # No welcome message for non-behavioral interviews
     
     @staticmethod
     def get_polite_message(message_type: str) -> str:
         """Get polite, conversational messages."""
-        messages = {
-            "repeat": "Of course! Let me repeat that question for you.",
-            "pause": "Take your time. I'm here whenever you're ready to continue.",
-            "welcome": "Welcome! I'm excited to learn more about your background.",
-            "next": [
-                "Great! Let's move on to the next question.",
-                "Excellent! Here's the next question for you.",
-                "Thank you for that answer. Let's continue with the next question.",
-                "Well done! Moving forward to the next question.",
-                "I appreciate your response. Let's proceed to the next question.",
-                "Good answer! Here's what I'd like to ask next.",
-                "Thanks for sharing that. Let's explore the next question.",
-                "That's helpful. Moving on to the next question now."
-            ],
-            "complete": "Thank you for completing the interview! I'll prepare your detailed feedback now."
-        }
-        
-        if message_type == "next":
-            return random.choice(messages["next"])
-        
-
+        message = RecruiterAgent.POLITE_MESSAGES.get(message_type, "")
+        if isinstance(message, list):
+            return random.choice(message)
+        return message
@@ -33,3 +33,16 @@ JOB_ROLE_SKILLS = {
 # Interview Types
 INTERVIEW_TYPES = ["Conceptual", "Behavioral", "Technical"]
 
+
+# Rubric metrics scored by EvaluatorAgent, in the order sessions store them
+BEHAVIORAL_RUBRIC_METRICS = (
+    "Situation Clarity", "Task Definition", "Action Effectiveness", "Result Impact", "Communication Skill",
+)
+DEFAULT_RUBRIC_METRICS = (
+    "Technical Accuracy", "Clarity of Communication", "Depth of Understanding", "Relevance to Role", "Overall Quality",
+)
+
+# Versions of the hint and follow-up prompts; bump one when its prompt changes
+# so cached generations from the old prompt are no longer served
+HINT_PROMPT_VERSION = 1
+FOLLOW_UP_PROMPT_VERSION = 1
@@ -0,0 +1,189 @@
+"""
+Hints and follow-up questions for mock interviews, cached across sessions.
+
+Bank questions repeat across many interviews, so regenerating their hints
+every time wastes a Crew round trip. Generated hints are kept in the
+two-tier result cache (memory plus local disk, shared by the workers and
+surviving restarts). The key is (question, job role, interview type, prompt
+version). Follow-ups depend on the candidate's free-text answer as well, so
+they rarely repeat and are only cached with FOLLOW_UP_CACHE=true.
+
+Each hint key holds a pool of up to HINT_CACHE_VARIANTS generations. A
+request is served a random variant, like RecruiterAgent.get_polite_message
+does, and while the pool is not full another variant is generated in the
+background.
+Bumping HINT_PROMPT_VERSION or FOLLOW_UP_PROMPT_VERSION in
+mock_interview_config stops old generations being served. They then age out
+under the cache's TTL and size limits.
+
+With HINT_SPECULATIVE=true, serving a question also starts generating its hint
+in the background. A later hint request is then answered from the cache, or
+waits for the generation already under way instead of starting a second one.
+Background work runs on HINT_PREFETCH_WORKERS reniced threads and is skipped
+when more than HINT_PREFETCH_MAX_PENDING generations are queued, so it never
+competes with requests.
+"""
+import logging
+import os
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from mock_interview_config import FOLLOW_UP_PROMPT_VERSION, HINT_PROMPT_VERSION
+from result_cache import ResultCache, content_key
+
+logger = logging.getLogger(__name__)
+
+HINT_SPECULATIVE = os.getenv("HINT_SPECULATIVE", "false").lower() == "true"
+HINT_CACHE_VARIANTS = int(os.getenv("HINT_CACHE_VARIANTS", "3"))
+HINT_PREFETCH_WORKERS = int(os.getenv("HINT_PREFETCH_WORKERS", "1"))
+HINT_PREFETCH_MAX_PENDING = int(os.getenv("HINT_PREFETCH_MAX_PENDING", "32"))
+FOLLOW_UP_CACHE = os.getenv("FOLLOW_UP_CACHE", "false").lower() == "true"
+# Niceness added to background threads (Linux applies it per thread)
+_PREFETCH_NICENESS = 10
+
+
+def _lower_priority():
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), _PREFETCH_NICENESS)
+    except (AttributeError, OSError):
+        pass  # Not supported on this platform; the worker count still bounds the load
+
+
+class VariantCache:
+    """Cached generations of one agent call, up to `variants` per argument tuple.
+
+    `load_generate` returns the agent function (imported lazily, since the
+    agents need an API key); it is called with the same arguments as `get`.
+    Each key is generated by at most one thread at a time. With
+    `enabled=False` every `get` calls the agent and nothing is stored.
+    """
+
+    def __init__(self, name: str, load_generate: Callable[[], Callable], prompt_version: int,
+                 variants: int = HINT_CACHE_VARIANTS, workers: int = HINT_PREFETCH_WORKERS,
+                 max_pending: int = HINT_PREFETCH_MAX_PENDING, cache: Optional[ResultCache] = None,
+                 enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._load_generate = load_generate
+        self._generate: Optional[Callable] = None
+        self.prompt_version = prompt_version
+        self.variants = max(1, variants)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cache = (cache or ResultCache(name)) if enabled else None
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # Guards the read-modify-write of a variant pool
+        self._pool_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.counters = {"served_cached": 0, "generated": 0, "joined_in_flight": 0,
+                         "background": 0, "background_skipped": 0}
+
+    def _key(self, args: Tuple[str, ...]) -> str:
+        return content_key(self.name, str(self.prompt_version), *args)
+
+    def _run(self, key: str, args: Tuple[str, ...], future: Future):
+        try:
+            if self._generate is None:
+                self._generate = self._load_generate()
+            value = self._generate(*args)
+            if value:
+                # Serializes this worker's updates; two workers can still overwrite
+                # each other's new variant, which only costs a regeneration later
+                with self._pool_lock:
+                    pool = (self.cache.get(key) or {}).get("variants", [])
+                    if value not in pool:
+                        self.cache.set(key, {"variants": (pool + [value])[-self.variants:]})
+            future.set_result(value)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _start_background(self, key: str, args: Tuple[str, ...]):
+        with self._lock:
+            if key in self._in_flight:
+                return
+            if len(self._in_flight) >= self.max_pending:
+                self.counters["background_skipped"] += 1
+                return
+            if self._executor is None:
+                # Created lazily so gunicorn's fork happens before the threads exist
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix=f"{self.name}-prefetch",
+                                                    initializer=_lower_priority)
+            future = Future()
+            self._in_flight[key] = future
+            self.counters["background"] += 1
+        self._executor.submit(self._run, key, args, future)
+
+    def prefetch(self, *args: str):
+        """Generate in the background unless the pool is already full or a generation is under way."""
+        if not self.enabled:
+            return
+        key = self._key(args)
+        pool = (self.cache.get(key) or {}).get("variants", [])
+        if len(pool) < self.variants:
+            self._start_background(key, args)
+
+    def get(self, *args: str) -> Any:
+        """A cached variant if there is one, else the result of generating now."""
+        if not self.enabled:
+            if self._generate is None:
+                self._generate = self._load_generate()
+            with self._lock:
+                self.counters["generated"] += 1
+            return self._generate(*args)
+        key = self._key(args)
+        pool = (self.cache.get(key) or {}).get("variants", [])
+        if pool:
+            with self._lock:
+                self.counters["served_cached"] += 1
+            if len(pool) < self.variants:
+                self._start_background(key, args)
+            return random.choice(pool)
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.counters["generated"] += 1
+            else:
+                self.counters["joined_in_flight"] += 1
+        if owner:
+            self._run(key, args, future)
+        return future.result()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"enabled": self.enabled, "in_flight": len(self._in_flight),
+                    "prompt_version": self.prompt_version, **self.counters,
+                    **(self.cache.stats() if self.cache is not None else {})}
+
+
+def _hint_agent():
+    from mock_interview_agents import HintAgent
+    return HintAgent.provide_hint
+
+
+def _follow_up_agent():
+    from mock_interview_agents import FollowUpAgent
+    return FollowUpAgent.generate_follow_ups
+
+
+# get(question, job_role, interview_type)
+hint_provider = VariantCache("hints", _hint_agent, HINT_PROMPT_VERSION)
+# get(question, answer, job_role, interview_type); answers rarely repeat exactly, and
+# a hit would freeze the agent's randomized follow-up count, so caching is opt-in
+follow_up_provider = VariantCache("follow_ups", _follow_up_agent, FOLLOW_UP_PROMPT_VERSION, variants=1,
+                                  enabled=FOLLOW_UP_CACHE)
+
+
+def prefetch_hint(session):
+    """Speculatively prepare the hint for the question the session is on."""
+    if HINT_SPECULATIVE and session is not None and session.last_question:
+        hint_provider.prefetch(session.last_question, session.job_role, session.interview_type)
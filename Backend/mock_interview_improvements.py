@@ -0,0 +1,133 @@
+"""
+Areas of improvement built up while the interview is running.
+
+Generating improvements from every evaluation at end-interview is one large
+model call that the summary screen has to wait for. With
+IMPROVEMENT_DIGEST=true (the default), each evaluated answer schedules a
+background update. The update folds only the answers not yet covered into the
+session's current improvements (ImprovementAgent.update_improvements). By the
+time the interview ends, the digest usually covers every answer and is
+returned as is. If it is behind, end-interview waits up to
+IMPROVEMENT_DIGEST_WAIT_SECONDS for the update in flight, then makes one small
+call for whatever answers are left.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Set
+
+from mock_interview_session_store import SessionConflictError
+
+logger = logging.getLogger(__name__)
+
+IMPROVEMENT_DIGEST_ENABLED = os.getenv("IMPROVEMENT_DIGEST", "true").lower() == "true"
+IMPROVEMENT_DIGEST_WORKERS = int(os.getenv("IMPROVEMENT_DIGEST_WORKERS", "2"))
+IMPROVEMENT_DIGEST_WAIT_SECONDS = float(os.getenv("IMPROVEMENT_DIGEST_WAIT_SECONDS", "5"))
+# Saves retried when a request updates the session while the digest is written
+_SAVE_ATTEMPTS = 3
+
+
+class ImprovementDigester:
+    """Keeps each session's improvement digest current with at most one update in flight."""
+
+    def __init__(self, session_manager, workers: int = IMPROVEMENT_DIGEST_WORKERS):
+        self.session_manager = session_manager
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        # Sessions that got another answer while their update was running
+        self._rerun: Set[str] = set()
+        self.updates = 0
+        self.failures = 0
+
+    def schedule(self, session_id: str):
+        """Bring the session's digest up to date in the background."""
+        with self._lock:
+            if session_id in self._in_flight:
+                self._rerun.add(session_id)
+                return
+            if self._executor is None:
+                # Created lazily so gunicorn's fork happens before the threads exist
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="improvement-digest")
+            self._in_flight[session_id] = self._executor.submit(self._run, session_id)
+
+    def _run(self, session_id: str):
+        try:
+            while True:
+                self._fold(session_id)
+                with self._lock:
+                    if session_id not in self._rerun:
+                        return
+                    self._rerun.discard(session_id)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"Improvement digest update failed for session {session_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(session_id, None)
+                self._rerun.discard(session_id)
+
+    def _fold(self, session_id: str):
+        from mock_interview_agents import ImprovementAgent
+
+        # Read without the session lock; the model call takes seconds
+        session = self.session_manager.get_session(session_id)
+        if session is None or session.digest_answers >= len(session.answers):
+            return
+        evaluations = session.detailed_evaluations
+        digest = ImprovementAgent.update_improvements(
+            session.improvement_digest, evaluations, session.digest_answers,
+            session.job_role, session.interview_type,
+        )
+        for _ in range(_SAVE_ATTEMPTS):
+            with self.session_manager.session_lock(session_id):
+                fresh = self.session_manager.get_session(session_id)
+                if fresh is None or fresh.digest_answers >= len(evaluations):
+                    return
+                fresh.improvement_digest = digest
+                fresh.digest_answers = len(evaluations)
+                try:
+                    self.session_manager.save_session(fresh)
+                except SessionConflictError:
+                    continue
+            with self._lock:
+                self.updates += 1
+            return
+
+    def wait_for(self, session_id: str, timeout: float = IMPROVEMENT_DIGEST_WAIT_SECONDS) -> bool:
+        """Wait for the session's update in flight, if any. False if it is still running."""
+        with self._lock:
+            future = self._in_flight.get(session_id)
+        if future is None:
+            return True
+        done, _ = wait([future], timeout=timeout)
+        return bool(done)
+
+    def final_improvements(self, session) -> Dict[str, str]:
+        """Improvements covering every answer, using the digest where it is current.
+
+        The caller should have called wait_for and reloaded the session first.
+        """
+        from mock_interview_agents import ImprovementAgent
+
+        evaluations = session.detailed_evaluations
+        if session.improvement_digest and session.digest_answers >= len(evaluations):
+            return session.improvement_digest
+        if session.improvement_digest:
+            try:
+                return ImprovementAgent.update_improvements(
+                    session.improvement_digest, evaluations, session.digest_answers,
+                    session.job_role, session.interview_type,
+                )
+            except Exception as e:
+                logger.warning(f"Improvement delta failed for session {session.session_id}: {e}")
+                return session.improvement_digest
+        return ImprovementAgent.generate_improvements(evaluations, session.job_role, session.interview_type)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"in_flight": len(self._in_flight), "updates": self.updates, "failures": self.failures}
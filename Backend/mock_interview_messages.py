@@ -0,0 +1,74 @@
+"""
+Optional model-written closing message.
+
+RecruiterAgent's welcome and closing messages come from score-aware templates,
+so start-interview and end-interview never wait on a model for them. With
+RECRUITER_LLM_MESSAGES=true, a personalized closing message is also generated
+in the background once the templated one has been returned. End-interview
+then sets closing_message_pending. The message is stored on the session under
+personalized_messages, which the progress endpoint reports and the summary
+screen polls. It also replaces the message in the stored summary, so a
+repeated end-interview returns it.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from mock_interview_session_store import SessionConflictError
+
+logger = logging.getLogger(__name__)
+
+RECRUITER_LLM_MESSAGES = os.getenv("RECRUITER_LLM_MESSAGES", "false").lower() == "true"
+RECRUITER_LLM_WORKERS = int(os.getenv("RECRUITER_LLM_WORKERS", "2"))
+# Saves retried when a request updates the session while the message is written
+_SAVE_ATTEMPTS = 3
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=RECRUITER_LLM_WORKERS,
+                                               thread_name_prefix="recruiter-messages")
+    return _executor
+
+
+def _personalize(session_manager, session_id: str, kind: str, generate: Callable[[], Optional[str]]):
+    try:
+        message = generate()
+    except Exception as e:
+        logger.warning(f"Personalized {kind} message failed for session {session_id}: {e}")
+        return
+    if not message:
+        return
+    for _ in range(_SAVE_ATTEMPTS):
+        with session_manager.session_lock(session_id):
+            session = session_manager.get_session(session_id)
+            if session is None:
+                return
+            session.personalized_messages[kind] = message
+            if kind == "closing" and session.summary:
+                session.summary["closing_message"] = message
+            try:
+                session_manager.save_session(session)
+                return
+            except SessionConflictError:
+                continue
+
+
+def personalize_in_background(session_manager, session_id: str, kind: str,
+                              generate: Callable[[], Optional[str]]) -> bool:
+    """Generate a personalized `kind` message (e.g. "closing") without blocking.
+
+    Returns whether one was scheduled.
+    """
+    if not RECRUITER_LLM_MESSAGES:
+        return False
+    _get_executor().submit(_personalize, session_manager, session_id, kind, generate)
+    return True
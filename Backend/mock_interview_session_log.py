@@ -0,0 +1,236 @@
+"""
+Append-only snapshot log of interview sessions, for recovery after a restart.
+
+With the default in-memory session store, a deploy or a killed worker loses
+every interview in progress. When SESSION_SNAPSHOT=true the session manager
+marks each saved or deleted session as dirty. Every SESSION_SNAPSHOT_INTERVAL
+seconds a background thread appends the latest state of the dirty sessions to
+SESSION_SNAPSHOT_PATH and fsyncs the file. Only sessions that changed are
+written, and several changes within one interval cost a single record. At
+startup the log is replayed into the store, so interviews continue where they
+left off.
+
+Each record is framed as length + CRC32, so a record torn by a crash is
+detected and dropped on recovery. When the log grows past
+SESSION_SNAPSHOT_COMPACT_RATIO times the size of its live sessions, it is
+rewritten with one record per live session.
+
+Several workers may share one log. Appends, compaction and recovery each
+hold an exclusive flock on SESSION_SNAPSHOT_PATH + ".lock". Compaction keeps
+every worker's sessions, and drops only those idle longer than the age limit
+given to recover().
+"""
+import atexit
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, use a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SESSION_SNAPSHOT_ENABLED = os.getenv("SESSION_SNAPSHOT", "false").lower() == "true"
+SESSION_SNAPSHOT_PATH = os.getenv(
+    "SESSION_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "practice2panel-sessions.log")
+)
+SESSION_SNAPSHOT_INTERVAL = float(os.getenv("SESSION_SNAPSHOT_INTERVAL", "1"))
+SESSION_SNAPSHOT_COMPACT_RATIO = float(os.getenv("SESSION_SNAPSHOT_COMPACT_RATIO", "4"))
+
+# Record: payload length, CRC32 of the payload; payload: op, wall time, id length, id, data
+_FRAME = struct.Struct("<II")
+_HEADER = struct.Struct("<cdH")
+_SAVE = b"S"
+_DELETE = b"D"
+# Logs smaller than this are never compacted
+_MIN_COMPACT_BYTES = 1 << 20
+
+
+def _encode(op: bytes, session_id: str, data: bytes, timestamp: float) -> bytes:
+    sid = session_id.encode("utf-8")
+    payload = _HEADER.pack(op, timestamp, len(sid)) + sid + data
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _records(f) -> Iterator[Tuple[int, bytes, str, bytes, float]]:
+    """Yield (end_offset, op, session_id, data, timestamp) up to the first torn or corrupt record."""
+    while True:
+        frame = f.read(_FRAME.size)
+        if len(frame) < _FRAME.size:
+            return
+        length, crc = _FRAME.unpack(frame)
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc or length < _HEADER.size:
+            return
+        op, timestamp, sid_length = _HEADER.unpack_from(payload)
+        start = _HEADER.size
+        session_id = payload[start:start + sid_length].decode("utf-8")
+        yield f.tell(), op, session_id, payload[start + sid_length:], timestamp
+
+
+def read_log(path: str) -> Tuple[Dict[str, Tuple[bytes, float]], int]:
+    """Latest state of each live session in the log, and the offset of the last intact record."""
+    sessions: Dict[str, Tuple[bytes, float]] = {}
+    good_offset = 0
+    if not os.path.exists(path):
+        return sessions, good_offset
+    with open(path, "rb") as f:
+        for good_offset, op, session_id, data, timestamp in _records(f):
+            if op == _SAVE:
+                sessions[session_id] = (data, timestamp)
+            else:
+                sessions.pop(session_id, None)
+    return sessions, good_offset
+
+
+class SessionSnapshotLog:
+    """Coalesces session changes and appends them to the log on a background thread."""
+
+    def __init__(self, path: str = SESSION_SNAPSHOT_PATH, interval: float = SESSION_SNAPSHOT_INTERVAL,
+                 compact_ratio: float = SESSION_SNAPSHOT_COMPACT_RATIO):
+        self.path = path
+        self.interval = interval
+        self.compact_ratio = compact_ratio
+        # session_id -> (op, data, timestamp) changed since the last flush
+        self._dirty: Dict[str, Tuple[bytes, bytes, float]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Approximate bytes of the latest record per live session, for compaction
+        self._live_bytes: Dict[str, int] = {}
+        # Bytes of every worker's live sessions when the log was last read in full
+        self._shared_live_bytes = 0
+        self._log_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+        # Set by recover(); compaction drops sessions idle longer than this
+        self._max_age: Optional[float] = None
+        self.records_written = 0
+        self.compactions = 0
+
+    def _ensure_started(self):
+        # Started lazily so gunicorn's fork happens before the thread exists
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-snapshots", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def record_save(self, session_id: str, data: bytes):
+        self._ensure_started()
+        with self._lock:
+            self._dirty[session_id] = (_SAVE, data, time.time())
+
+    def record_delete(self, session_id: str):
+        self._ensure_started()
+        with self._lock:
+            self._dirty[session_id] = (_DELETE, b"", time.time())
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive against this worker's threads and, via flock, other workers."""
+        with self._write_lock:
+            with open(self.path + ".lock", "ab") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield  # Closing the file releases the flock
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Session snapshot failed: {e}")
+
+    def flush(self):
+        """Append every dirty session to the log and fsync it."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        with self._locked():
+            chunks = []
+            for session_id, (op, data, timestamp) in dirty.items():
+                record = _encode(op, session_id, data, timestamp)
+                chunks.append(record)
+                if op == _SAVE:
+                    self._live_bytes[session_id] = len(record)
+                else:
+                    self._live_bytes.pop(session_id, None)
+            blob = b"".join(chunks)
+            with open(self.path, "ab") as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+                # Includes other workers' appends
+                self._log_bytes = f.tell()
+            self.records_written += len(chunks)
+            live = max(sum(self._live_bytes.values()), self._shared_live_bytes)
+            if self._log_bytes > max(_MIN_COMPACT_BYTES, self.compact_ratio * live):
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the log with only the latest record of each live session (lock held)."""
+        sessions, _ = read_log(self.path)
+        if self._max_age is not None:
+            # Idle past the limit: recovery would skip them anyway
+            cutoff = time.time() - self._max_age
+            sessions = {sid: entry for sid, entry in sessions.items() if entry[1] >= cutoff}
+        tmp_path = self.path + ".tmp"
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for session_id, (data, timestamp) in sessions.items():
+                record = _encode(_SAVE, session_id, data, timestamp)
+                f.write(record)
+                size += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._log_bytes = self._shared_live_bytes = size
+        self.compactions += 1
+        logger.info(f"Compacted session snapshot log to {len(sessions)} sessions ({size} bytes)")
+
+    def recover(self, max_age: Optional[float] = None) -> Dict[str, bytes]:
+        """Serialized sessions from the log, skipping ones idle longer than `max_age`.
+
+        A torn record at the end of the log (from a crash mid-write) is cut off
+        so later appends start on a record boundary.
+        """
+        self._max_age = max_age
+        # Under the lock, a record another worker is still appending is never mistaken for a torn one
+        with self._locked():
+            sessions, good_offset = read_log(self.path)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > good_offset:
+                logger.warning(f"Truncating damaged session snapshot log at byte {good_offset}")
+                with open(self.path, "r+b") as f:
+                    f.truncate(good_offset)
+            self._log_bytes = good_offset
+            self._shared_live_bytes = sum(_FRAME.size + _HEADER.size + len(sid.encode("utf-8")) + len(data)
+                                          for sid, (data, _) in sessions.items())
+            cutoff = time.time() - max_age if max_age is not None else None
+            recovered = {}
+            for session_id, (data, timestamp) in sessions.items():
+                if cutoff is not None and timestamp < cutoff:
+                    continue
+                recovered[session_id] = data
+                self._live_bytes[session_id] = _FRAME.size + _HEADER.size + len(session_id) + len(data)
+            return recovered
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._dirty)
+        return {
+            "log_bytes": self._log_bytes,
+            "pending": pending,
+            "records_written": self.records_written,
+            "compactions": self.compactions,
+        }
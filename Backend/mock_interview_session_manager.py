@@ -1,12 +1,150 @@
 """
-In-memory session management for interview sessions.
+Session management for interview sessions.
+
+Sessions are kept in the store selected by SESSION_STORE (see
+mock_interview_session_store); the default is process memory. A background
+sweeper evicts idle and least recently used sessions; completed ones are
+archived to the database first (SESSION_ARCHIVE). With SESSION_SNAPSHOT=true
+changes are also appended to a local snapshot log (see
+mock_interview_session_log) and replayed at startup, so in-memory sessions
+survive a restart.
 """
-from typing import Dict, List, Optional
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
 import uuid
+import zlib
 from datetime import datetime
 
+from mock_interview_config import BEHAVIORAL_RUBRIC_METRICS, DEFAULT_RUBRIC_METRICS
+from mock_interview_session_log import SESSION_SNAPSHOT_ENABLED, SessionSnapshotLog
+from mock_interview_session_store import (
+    SESSION_IDLE_TTL, SESSION_MAX_COUNT, SessionConflictError, SessionStore, create_session_store,
+)
+
+logger = logging.getLogger(__name__)
+
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_ARCHIVE = os.getenv("SESSION_ARCHIVE", "true").lower() == "true"
+# Lock stripes shared by all sessions; collisions only serialize unrelated sessions
+SESSION_LOCK_STRIPES = int(os.getenv("SESSION_LOCK_STRIPES", "256"))
+
+# Serialized sessions larger than this are zlib-compressed
+_COMPRESS_THRESHOLD = 1024
+# Leading element of the serialized session list; bump it when the positional part changes
+_FORMAT_VERSION = 3
+_MISSING_SCORE = float("nan")
+# Responses remembered per session for repeated idempotency keys
+_IDEMPOTENT_RESPONSES = 8
+
+
+def rubric_metrics(interview_type: str) -> Tuple[str, ...]:
+    """Rubric metrics scored for an interview type, in stored order."""
+    if interview_type.lower() == "behavioral":
+        return BEHAVIORAL_RUBRIC_METRICS
+    return DEFAULT_RUBRIC_METRICS
+
+
+def _key_digest(idempotency_key: str) -> str:
+    # Keys may be long client strings; only a digest is stored
+    return hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()[:32]
+
+
+def _parse_score(value) -> float:
+    """'7/10 - explanation' -> 7.0; NaN when there is no number."""
+    try:
+        return float(str(value).split('/')[0].strip())
+    except ValueError:
+        return _MISSING_SCORE
+
+
+class AnswerRecord:
+    """One evaluated answer. Rubric scores are kept once, as a float array in metric order."""
+    __slots__ = ("question", "answer", "is_followup", "parent_question_index",
+                 "short_feedback", "detailed_evaluation", "is_irrelevant", "scores")
+
+    def __init__(self, question: str, answer: str, short_feedback: str, detailed_evaluation: str,
+                 scores: array, is_irrelevant: bool = False, is_followup: bool = False,
+                 parent_question_index: Optional[int] = None):
+        self.question = question
+        self.answer = answer
+        self.is_followup = is_followup
+        self.parent_question_index = parent_question_index
+        self.short_feedback = short_feedback
+        self.detailed_evaluation = detailed_evaluation
+        self.is_irrelevant = is_irrelevant
+        self.scores = scores
+
+    @classmethod
+    def from_evaluation(cls, question: str, answer: str, evaluation: Dict, metrics: Tuple[str, ...],
+                        is_followup: bool = False, parent_question_index: Optional[int] = None) -> "AnswerRecord":
+        """Build a record from an EvaluatorAgent.evaluate_answer result."""
+        rubric = evaluation.get("rubric_scores", {})
+        return cls(
+            question, answer,
+            evaluation.get("short_feedback", ""),
+            evaluation.get("detailed_evaluation", ""),
+            array("f", (_parse_score(rubric[m]) if m in rubric else _MISSING_SCORE for m in metrics)),
+            is_irrelevant=evaluation.get("is_irrelevant", False),
+            is_followup=is_followup,
+            parent_question_index=parent_question_index,
+        )
+
+    def score_items(self, metrics: Tuple[str, ...]) -> Iterator[Tuple[str, float]]:
+        """(metric, score) pairs for the metrics that were scored."""
+        for metric, score in zip(metrics, self.scores):
+            if not math.isnan(score):
+                # float32 storage: 7.3 comes back as 7.300000190734863
+                yield metric, round(score, 2)
+
+    def evaluation(self, metrics: Tuple[str, ...]) -> Dict:
+        """The evaluation in EvaluatorAgent.evaluate_answer's shape."""
+        return {
+            "short_feedback": self.short_feedback,
+            "detailed_evaluation": self.detailed_evaluation,
+            "rubric_scores": {metric: f"{score:g}/10" for metric, score in self.score_items(metrics)},
+            "is_irrelevant": self.is_irrelevant,
+        }
+
+    def to_row(self) -> list:
+        return [self.question, self.answer, self.is_followup, self.parent_question_index,
+                self.short_feedback, self.detailed_evaluation, self.is_irrelevant,
+                [None if math.isnan(score) else score for score in self.scores]]
+
+    @classmethod
+    def from_row(cls, row: list) -> "AnswerRecord":
+        question, answer, is_followup, parent_index, feedback, detailed, irrelevant, scores = row
+        return cls(question, answer, feedback, detailed,
+                   array("f", (_MISSING_SCORE if score is None else score for score in scores)),
+                   is_irrelevant=irrelevant, is_followup=is_followup, parent_question_index=parent_index)
+
+    def to_dict(self, metrics: Tuple[str, ...]) -> Dict:
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "is_followup": self.is_followup,
+            "parent_question_index": self.parent_question_index,
+            "feedback": self.short_feedback,
+            "detailed_evaluation": self.detailed_evaluation,
+            "is_irrelevant": self.is_irrelevant,
+            "scores": dict(self.score_items(metrics)),
+        }
+
+
 class Session:
     """Represents a single interview session."""
+    __slots__ = ("session_id", "name", "job_role", "interview_type", "created_at", "questions",
+                 "current_question_index", "answers", "follow_up_questions", "current_follow_up_index",
+                 "last_question", "completed", "next_followup_after", "idempotent_responses", "version",
+                 "score_totals", "score_counts", "improvement_digest", "digest_answers",
+                 "summary", "personalized_messages", "personalizing")
+
     def __init__(self, name: str, job_role: str, interview_type: str):
         self.session_id = str(uuid.uuid4())
         self.name = name
@@ -15,38 +153,303 @@ class Session:
         self.created_at = datetime.now()
         self.questions: List[str] = []
         self.current_question_index = 0
-        self.answers: List[Dict] = []  # Store answer, feedback, follow-ups
+        self.answers: List[AnswerRecord] = []  # Evaluated answers to main questions and follow-ups
         self.follow_up_questions: List[str] = []  # Current follow-ups queue
         self.current_follow_up_index = 0
-        self.detailed_evaluations: List[Dict] = []  # Detailed rubric scores
         self.last_question = ""
         self.completed = False
         # Ask a follow-up after the first question, then after every 5–6 questions
         # This stores the 1-based question number at which the next follow-up should be asked
         self.next_followup_after = 1
+        # Recent [idempotency_key, status, body] so client retries get the original response
+        self.idempotent_responses: List[list] = []
+        # Store version this session was loaded at (None until first saved)
+        self.version: Optional[int] = None
+        self._reset_aggregates()
+        # Areas of improvement kept current in the background, and how many answers they cover
+        self.improvement_digest: Optional[Dict[str, str]] = None
+        self.digest_answers = 0
+        # End-of-interview summary, kept so repeated end-interview calls return it unchanged
+        self.summary: Optional[Dict] = None
+        # Model-written closing message that replaces the templated one once ready
+        self.personalized_messages: Dict[str, str] = {}
+        # Kinds of personalized message already scheduled, so each is generated once
+        self.personalizing: List[str] = []
+
+    def _reset_aggregates(self):
+        # Running per-metric sums and counts, in metric order, updated as answers are added
+        self.score_totals = array("d", bytes(8 * len(self.metrics)))
+        self.score_counts = array("I", bytes(4 * len(self.metrics)))
+
+    def _aggregate(self, record: AnswerRecord):
+        for i, score in enumerate(record.scores):
+            if not math.isnan(score):
+                self.score_totals[i] += round(score, 2)
+                self.score_counts[i] += 1
+
+    @property
+    def metrics(self) -> Tuple[str, ...]:
+        return rubric_metrics(self.interview_type)
+
+    def add_answer(self, question: str, answer: str, evaluation: Dict, is_followup: bool = False,
+                   parent_question_index: Optional[int] = None) -> AnswerRecord:
+        """Record an answer with its evaluation."""
+        record = AnswerRecord.from_evaluation(question, answer, evaluation, self.metrics,
+                                              is_followup=is_followup,
+                                              parent_question_index=parent_question_index)
+        self.answers.append(record)
+        self._aggregate(record)
+        return record
+
+    def average_scores(self) -> Dict[str, Optional[float]]:
+        """Mean score per metric (1 decimal) over the answers so far; None if never scored."""
+        return {
+            metric: round(total / count, 1) if count else None
+            for metric, total, count in zip(self.metrics, self.score_totals, self.score_counts)
+        }
+
+    def progress(self) -> Dict:
+        """Cheap mid-interview snapshot of where the candidate stands."""
+        return {
+            "session_id": self.session_id,
+            "interview_type": self.interview_type,
+            "total_questions": len(self.questions),
+            "current_question_index": self.current_question_index,
+            "total_answers": len(self.answers),
+            "average_scores": self.average_scores(),
+            "completed": self.completed,
+            "messages": self.personalized_messages,
+        }
+
+    def cached_response(self, idempotency_key: str) -> Optional[Tuple[int, Dict]]:
+        """(status, body) previously returned for this idempotency key, if any."""
+        digest = _key_digest(idempotency_key)
+        for key, status, body in self.idempotent_responses:
+            if key == digest:
+                return status, body
+        return None
+
+    def remember_response(self, idempotency_key: str, status: int, body: Dict):
+        self.idempotent_responses.append([_key_digest(idempotency_key), status, body])
+        del self.idempotent_responses[:-_IDEMPOTENT_RESPONSES]
+
+    @property
+    def detailed_evaluations(self) -> List[Dict]:
+        """Per-answer evaluations in the {"question", "evaluation"} shape agents expect."""
+        metrics = self.metrics
+        return [{"question": record.question, "evaluation": record.evaluation(metrics)}
+                for record in self.answers]
+
+    def to_dict(self) -> Dict:
+        """Readable form, used for archiving."""
+        metrics = self.metrics
+        return {
+            "session_id": self.session_id,
+            "name": self.name,
+            "job_role": self.job_role,
+            "interview_type": self.interview_type,
+            "created_at": self.created_at.isoformat(),
+            "questions": self.questions,
+            "current_question_index": self.current_question_index,
+            "answers": [record.to_dict(metrics) for record in self.answers],
+            "completed": self.completed,
+        }
+
+    def to_bytes(self) -> bytes:
+        """Compact serialization, zlib-compressed when large.
+
+        A positional JSON list of the core fields led by _FORMAT_VERSION, then
+        a dict of the fields added since, so a new field never shifts indices.
+        """
+        state = [
+            _FORMAT_VERSION, self.session_id, self.name, self.job_role, self.interview_type,
+            self.created_at.isoformat(), self.questions, self.current_question_index,
+            [record.to_row() for record in self.answers],
+            self.follow_up_questions, self.current_follow_up_index, self.last_question,
+            self.completed, self.next_followup_after, self.idempotent_responses,
+            {
+                "score_totals": list(self.score_totals),
+                "score_counts": list(self.score_counts),
+                "improvement_digest": self.improvement_digest,
+                "digest_answers": self.digest_answers,
+                "summary": self.summary,
+                "personalized_messages": self.personalized_messages,
+                "personalizing": self.personalizing,
+            },
+        ]
+        raw = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if len(raw) > _COMPRESS_THRESHOLD:
+            return b"z" + zlib.compress(raw, 6)
+        return b"j" + raw
+
+    @classmethod
+    def from_bytes(cls, data: bytes, version: Optional[int] = None) -> "Session":
+        """Inverse of to_bytes. Raises ValueError for a format this code cannot read."""
+        raw = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        state = json.loads(raw)
+        if not isinstance(state, list) or not state or state[0] != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported session format {state[0] if isinstance(state, list) and state else '?'}")
+        session = cls.__new__(cls)
+        (_format, session.session_id, session.name, session.job_role, session.interview_type,
+         created_at, session.questions, session.current_question_index, answers,
+         session.follow_up_questions, session.current_follow_up_index, session.last_question,
+         session.completed, session.next_followup_after, session.idempotent_responses, extras) = state
+        session.created_at = datetime.fromisoformat(created_at)
+        session.answers = [AnswerRecord.from_row(row) for row in answers]
+        if "score_totals" in extras:
+            session.score_totals = array("d", extras["score_totals"])
+            session.score_counts = array("I", extras["score_counts"])
+        else:
+            session._reset_aggregates()
+            for record in session.answers:
+                session._aggregate(record)
+        session.improvement_digest = extras.get("improvement_digest")
+        session.digest_answers = extras.get("digest_answers", 0)
+        session.summary = extras.get("summary")
+        session.personalized_messages = extras.get("personalized_messages", {})
+        session.personalizing = extras.get("personalizing", [])
+        session.version = version
+        return session
 
 class SessionManager:
-    """Manages interview sessions in memory."""
-    def __init__(self):
-        self.sessions: Dict[str, Session] = {}
-    
+    """Manages interview sessions in a (possibly shared) session store."""
+    def __init__(self, store: Optional[SessionStore] = None, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_sessions: int = SESSION_MAX_COUNT, sweep_interval: float = SESSION_SWEEP_INTERVAL,
+                 snapshots: Optional[SessionSnapshotLog] = None):
+        self.store = store or create_session_store()
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweep_lock = threading.Lock()
+        self._counters = {"evicted_idle": 0, "evicted_lru": 0, "archived": 0, "archive_failures": 0}
+        self._locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+        self.snapshots = snapshots
+        if self.snapshots is None and SESSION_SNAPSHOT_ENABLED:
+            self.snapshots = SessionSnapshotLog()
+        if self.snapshots is not None:
+            self.recover()
+
+    def recover(self) -> int:
+        """Load sessions from the snapshot log into the store. Returns the number restored."""
+        start = time.perf_counter()
+        restored = 0
+        for session_id, data in self.snapshots.recover(max_age=self.idle_ttl).items():
+            try:
+                self.store.save(session_id, data, None)
+                restored += 1
+            except SessionConflictError:
+                pass  # Already in a shared store
+        if restored:
+            logger.info(f"Restored {restored} interview sessions from snapshot log "
+                        f"in {time.perf_counter() - start:.2f}s")
+        return restored
+
+    def session_lock(self, session_id: str) -> threading.Lock:
+        """Lock serializing requests for one session within this process.
+
+        Requests on other workers are still caught by the store's version check.
+        """
+        return self._locks[zlib.crc32(session_id.encode("utf-8")) % len(self._locks)]
+
+    def _ensure_sweeper(self):
+        # Started lazily so gunicorn's fork happens before the thread exists
+        if self._sweeper is not None:
+            return
+        with self._sweep_lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_forever, name="session-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}")
+
+    def sweep(self, max_sessions: Optional[int] = None) -> int:
+        """Evict idle and excess sessions, archiving completed ones. Returns the number evicted."""
+        evicted = self.store.evict(self.idle_ttl, self.max_sessions if max_sessions is None else max_sessions)
+        if not evicted:
+            return 0
+        completed = []
+        for session_id, data, reason in evicted:
+            self._counters["evicted_" + reason] += 1
+            if self.snapshots is not None:
+                self.snapshots.record_delete(session_id)
+            try:
+                session = Session.from_bytes(data)
+            except ValueError as e:
+                logger.warning(f"Not archiving evicted session {session_id}: {e}")
+                continue
+            if session.completed:
+                completed.append(session)
+        if completed and SESSION_ARCHIVE:
+            self._archive(completed)
+        logger.info(f"Evicted {len(evicted)} interview sessions ({len(completed)} completed)")
+        return len(evicted)
+
+    def _archive(self, sessions: List[Session]):
+        try:
+            from db_handler import archive_interview_sessions
+            archive_interview_sessions([session.to_dict() for session in sessions])
+            self._counters["archived"] += len(sessions)
+        except Exception as e:
+            self._counters["archive_failures"] += len(sessions)
+            logger.warning(f"Could not archive {len(sessions)} completed interview sessions: {e}")
+
+    def stats(self) -> Dict:
+        """Gauges for live sessions and bytes held, plus this worker's eviction counters."""
+        store_stats = self.store.stats()
+        return {
+            "live_sessions": store_stats["sessions"],
+            "approx_bytes": store_stats["bytes"],
+            "idle_ttl_seconds": self.idle_ttl,
+            "max_sessions": self.max_sessions,
+            **self._counters,
+            **({"snapshots": self.snapshots.stats()} if self.snapshots is not None else {}),
+        }
+
     def create_session(self, name: str, job_role: str, interview_type: str) -> Session:
         """Create a new interview session."""
+        self._ensure_sweeper()
+        # Enforce the cap now rather than waiting for the next sweep
+        if self.store.count() >= self.max_sessions:
+            self.sweep(max_sessions=self.max_sessions - 1)
         session = Session(name, job_role, interview_type)
-        self.sessions[session.session_id] = session
+        self.save_session(session)
         return session
-    
+
     def get_session(self, session_id: str) -> Optional[Session]:
         """Retrieve a session by ID."""
-        return self.sessions.get(session_id)
-    
+        self._ensure_sweeper()
+        stored = self.store.load(session_id)
+        if stored is None:
+            return None
+        version, data = stored
+        try:
+            return Session.from_bytes(data, version)
+        except ValueError as e:
+            logger.warning(f"Cannot read session {session_id}: {e}")
+            return None
+
+    def save_session(self, session: Session):
+        """Persist changes to a session.
+
+        Raises SessionConflictError if another request saved it first.
+        """
+        data = session.to_bytes()
+        session.version = self.store.save(session.session_id, data, session.version)
+        if self.snapshots is not None:
+            self.snapshots.record_save(session.session_id, data)
+
     def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            return True
-        return False
+        if self.snapshots is not None:
+            self.snapshots.record_delete(session_id)
+        return self.store.delete(session_id)
 
 # Global session manager instance
 session_manager = SessionManager()
-
@@ -0,0 +1,347 @@
+"""
+Storage backends for mock interview sessions.
+
+The default in-memory store only works with a single gunicorn worker. With
+SESSION_STORE=sqlite (one WAL-mode database file shared by the workers on a
+host) or SESSION_STORE=redis (any Redis-compatible server), every worker sees
+the same sessions.
+
+Sessions idle for SESSION_IDLE_TTL seconds, and the least recently used ones
+beyond SESSION_MAX_COUNT, are evicted by SessionStore.evict (called
+periodically by the session manager's sweeper).
+
+Sessions are saved with optimistic concurrency. Each stored session carries a
+version, and a save only succeeds if the version is unchanged since the
+session was loaded. Otherwise SessionConflictError is raised and the request
+can be retried against the fresh state.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", os.path.join(tempfile.gettempdir(), "practice2panel-sessions.db"))
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+SESSION_STORE_PREFIX = os.getenv("SESSION_STORE_PREFIX", "practice2panel:interview:")
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(2 * 3600)))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+
+
+class SessionConflictError(Exception):
+    """Raised when a session was changed by another request since it was loaded."""
+
+
+class SessionStore(ABC):
+    """Stores serialized sessions as (version, data) pairs.
+
+    `save` with `expected_version=None` creates the session; otherwise it
+    replaces it only if the stored version still equals `expected_version`.
+    Returns the new version.
+
+    `evict` removes sessions idle for longer than `idle_ttl` and the least
+    recently used ones beyond `max_sessions`, returning them as
+    (session_id, data, reason) with reason "idle" or "lru".
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, session_id: str, data: bytes, expected_version: Optional[int]) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def evict(self, idle_ttl: float, max_sessions: int) -> List[Tuple[str, bytes, str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Live session count and approximate bytes of serialized session data."""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store; sessions are not shared between workers."""
+
+    def __init__(self):
+        # session_id -> (version, data, last_access), least recently used first
+        self._sessions: "OrderedDict[str, Tuple[int, bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], entry[1], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return entry[0], entry[1]
+
+    def save(self, session_id: str, data: bytes, expected_version: Optional[int]) -> int:
+        with self._lock:
+            current = self._sessions.get(session_id)
+            current_version = current[0] if current else None
+            if current_version != expected_version:
+                raise SessionConflictError(f"Session {session_id} was modified concurrently")
+            version = (current_version or 0) + 1
+            self._bytes += len(data) - (len(current[1]) if current else 0)
+            self._sessions[session_id] = (version, data, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return version
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return False
+            self._bytes -= len(entry[1])
+            return True
+
+    def evict(self, idle_ttl: float, max_sessions: int) -> List[Tuple[str, bytes, str]]:
+        cutoff = time.monotonic() - idle_ttl
+        evicted = []
+        with self._lock:
+            # Oldest access first, so stop at the first session still in use
+            while self._sessions:
+                session_id, (_version, data, last_access) = next(iter(self._sessions.items()))
+                if last_access >= cutoff and len(self._sessions) <= max_sessions:
+                    break
+                del self._sessions[session_id]
+                self._bytes -= len(data)
+                evicted.append((session_id, data, "idle" if last_access < cutoff else "lru"))
+        return evicted
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self._bytes}
+
+
+class SQLiteSessionStore(SessionStore):
+    """One WAL-mode SQLite file shared by every worker on the host."""
+
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS interview_sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " data BLOB NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS interview_sessions_updated_at ON interview_sessions (updated_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL lets readers proceed while another worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        row = self._connection().execute(
+            "SELECT version, data FROM interview_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def save(self, session_id: str, data: bytes, expected_version: Optional[int]) -> int:
+        conn = self._connection()
+        with conn:
+            if expected_version is None:
+                try:
+                    conn.execute(
+                        "INSERT INTO interview_sessions (session_id, version, data, updated_at) VALUES (?, 1, ?, ?)",
+                        (session_id, data, time.time()),
+                    )
+                except sqlite3.IntegrityError:
+                    raise SessionConflictError(f"Session {session_id} already exists")
+                return 1
+            cursor = conn.execute(
+                "UPDATE interview_sessions SET version = version + 1, data = ?, updated_at = ?"
+                " WHERE session_id = ? AND version = ?",
+                (data, time.time(), session_id, expected_version),
+            )
+            if cursor.rowcount != 1:
+                raise SessionConflictError(f"Session {session_id} was modified concurrently")
+            return expected_version + 1
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM interview_sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def evict(self, idle_ttl: float, max_sessions: int) -> List[Tuple[str, bytes, str]]:
+        # Every request that changes a session saves it, so updated_at tracks activity
+        conn = self._connection()
+        cutoff = time.time() - idle_ttl
+        candidates = [(row[0], row[1], bytes(row[2]), "idle") for row in conn.execute(
+            "SELECT session_id, version, data FROM interview_sessions WHERE updated_at < ?", (cutoff,)
+        )]
+        excess = self.count() - len(candidates) - max_sessions
+        if excess > 0:
+            candidates += [(row[0], row[1], bytes(row[2]), "lru") for row in conn.execute(
+                "SELECT session_id, version, data FROM interview_sessions WHERE updated_at >= ?"
+                " ORDER BY updated_at LIMIT ?", (cutoff, excess)
+            )]
+        evicted = []
+        with conn:
+            for session_id, version, data, reason in candidates:
+                # Skip sessions saved again since they were selected (or evicted by another worker)
+                cursor = conn.execute(
+                    "DELETE FROM interview_sessions WHERE session_id = ? AND version = ?", (session_id, version)
+                )
+                if cursor.rowcount:
+                    evicted.append((session_id, data, reason))
+        return evicted
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM interview_sessions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM interview_sessions"
+        ).fetchone()
+        return {"sessions": count, "bytes": total}
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in a Redis-compatible server, one hash {v, d} per session.
+
+    A sorted set scored by last save time tracks activity for eviction.
+
+    Pass `client` to use an existing connection (or an in-process stand-in
+    such as fakeredis); otherwise one is created from SESSION_STORE_URL.
+    """
+
+    def __init__(self, client=None, url: str = SESSION_STORE_URL, prefix: str = SESSION_STORE_PREFIX):
+        if client is None:
+            # Lazy import so the backend runs without redis installed
+            import redis  # type: ignore
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return self.prefix + session_id
+
+    @property
+    def _activity_key(self) -> str:
+        return self.prefix + "activity"
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        values = self.client.hmget(self._key(session_id), "v", "d")
+        if values[0] is None:
+            return None
+        return int(values[0]), values[1]
+
+    def save(self, session_id: str, data: bytes, expected_version: Optional[int]) -> int:
+        import redis  # type: ignore
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            try:
+                # WATCH aborts the transaction if another worker writes the key first
+                pipe.watch(key)
+                current = pipe.hget(key, "v")
+                current_version = int(current) if current is not None else None
+                if current_version != expected_version:
+                    raise SessionConflictError(f"Session {session_id} was modified concurrently")
+                version = (current_version or 0) + 1
+                pipe.multi()
+                pipe.hset(key, mapping={"v": version, "d": data})
+                pipe.zadd(self._activity_key, {session_id: time.time()})
+                pipe.execute()
+                return version
+            except redis.WatchError:
+                raise SessionConflictError(f"Session {session_id} was modified concurrently")
+
+    def delete(self, session_id: str) -> bool:
+        self.client.zrem(self._activity_key, session_id)
+        return bool(self.client.delete(self._key(session_id)))
+
+    def _decode(self, session_id) -> str:
+        return session_id.decode() if isinstance(session_id, bytes) else session_id
+
+    def evict(self, idle_ttl: float, max_sessions: int) -> List[Tuple[str, bytes, str]]:
+        candidates = [(self._decode(sid), score, "idle") for sid, score in
+                      self.client.zrangebyscore(self._activity_key, "-inf", time.time() - idle_ttl, withscores=True)]
+        excess = self.count() - len(candidates) - max_sessions
+        if excess > 0:
+            candidates += [(self._decode(sid), score, "lru") for sid, score in
+                           self.client.zrange(self._activity_key, len(candidates), len(candidates) + excess - 1,
+                                              withscores=True)]
+        evicted = []
+        for session_id, score, reason in candidates:
+            data = self._evict_one(session_id, score)
+            if data is not None:
+                evicted.append((session_id, data, reason))
+        return evicted
+
+    def _evict_one(self, session_id: str, score: float) -> Optional[bytes]:
+        """Remove the session unless it was saved (or evicted elsewhere) since `score` was read."""
+        import redis  # type: ignore
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            try:
+                # A save in between changes the key, so EXEC aborts and the fresh session stays
+                pipe.watch(key)
+                if pipe.zscore(self._activity_key, session_id) != score:
+                    return None
+                data = pipe.hget(key, "d")
+                pipe.multi()
+                pipe.zrem(self._activity_key, session_id)
+                pipe.delete(key)
+                removed, _ = pipe.execute()
+            except redis.WatchError:
+                return None
+        # ZREM succeeds for exactly one worker, so each session is evicted once
+        return data if removed else None
+
+    def count(self) -> int:
+        return self.client.zcard(self._activity_key)
+
+    def stats(self) -> Dict:
+        session_ids = self.client.zrange(self._activity_key, 0, -1)
+        with self.client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                pipe.hstrlen(self._key(self._decode(session_id)), "d")
+            sizes = pipe.execute() if session_ids else []
+        return {"sessions": len(session_ids), "bytes": sum(sizes)}
+
+
+def create_session_store(kind: str = SESSION_STORE, path: str = SESSION_STORE_PATH,
+                         prefix: str = SESSION_STORE_PREFIX) -> SessionStore:
+    """Build the store selected by SESSION_STORE (memory, sqlite or redis).
+
+    Other kinds of state (e.g. chatbot threads) pass their own `path` and
+    `prefix` so they never mix with interview sessions.
+    """
+    if kind == "sqlite":
+        return SQLiteSessionStore(path)
+    if kind == "redis":
+        return RedisSessionStore(url=SESSION_STORE_URL, prefix=prefix)
+    return MemorySessionStore()
@@ -0,0 +1,91 @@
+"""
+Concurrent stages of the end-of-interview summary.
+
+Model-backed parts of the summary (currently the areas of improvement; the
+closing message is templated) run side by side under one deadline
+(INTERVIEW_SUMMARY_DEADLINE_SECONDS). The summary therefore takes as long as
+the slowest stage instead of their sum. A stage that fails or misses the
+deadline is replaced by its fallback, and its name is reported so the
+response can say which parts are partial.
+
+Stages that miss the deadline cannot be cancelled and keep a worker busy
+until they finish. A stage is therefore only started when a worker is free.
+Otherwise it falls back at once rather than waiting in a queue behind stale
+work and missing its own deadline.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTERVIEW_SUMMARY_DEADLINE_SECONDS = float(os.getenv("INTERVIEW_SUMMARY_DEADLINE_SECONDS", "20"))
+INTERVIEW_SUMMARY_WORKERS = int(os.getenv("INTERVIEW_SUMMARY_WORKERS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Stages submitted and not yet finished, including ones past their deadline
+_running = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=INTERVIEW_SUMMARY_WORKERS,
+                                               thread_name_prefix="interview-summary")
+    return _executor
+
+
+def _reserve_worker() -> bool:
+    global _running
+    with _executor_lock:
+        if _running >= INTERVIEW_SUMMARY_WORKERS:
+            return False
+        _running += 1
+        return True
+
+
+def _release_worker(_future):
+    global _running
+    with _executor_lock:
+        _running -= 1
+
+
+def run_stages(stages: Dict[str, Callable[[], Any]], fallbacks: Dict[str, Callable[[], Any]],
+               deadline: float) -> Tuple[Dict[str, Any], List[str]]:
+    """Run `stages` concurrently until `deadline` (a time.monotonic() value).
+
+    Returns each stage's result, or its fallback if it raised, was still
+    running at the deadline or found no free worker, plus the names of the
+    stages that fell back.
+    Stages still running are left to finish in the background.
+    """
+    futures = {}
+    for name, stage in stages.items():
+        if _reserve_worker():
+            futures[name] = _get_executor().submit(stage)
+            futures[name].add_done_callback(_release_worker)
+    wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+    results, partial = {}, []
+    for name in stages:
+        future = futures.get(name)
+        if future is None:
+            logger.warning(f"Summary stage {name} skipped: all workers busy")
+            results[name] = fallbacks[name]()
+            partial.append(name)
+            continue
+        if future.done() and future.exception() is None:
+            results[name] = future.result()
+            continue
+        if future.done():
+            logger.warning(f"Summary stage {name} failed: {future.exception()}")
+        else:
+            logger.warning(f"Summary stage {name} missed the deadline")
+        results[name] = fallbacks[name]()
+        partial.append(name)
+    return results, partial
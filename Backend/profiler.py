@@ -0,0 +1,206 @@
+"""
+On-demand statistical profiling for live workers.
+
+Profiling is disabled unless PROFILER_TOKEN is set. When enabled, callers that
+present the token in the X-Profiler-Token header can:
+
+- sample the whole worker for N seconds via /api/admin/profile; sampling runs
+  in the background and the result is fetched by the returned profile_id
+- profile a single request by sending the X-Profile: 1 header
+Both kinds of profile are kept in memory by the worker that recorded them and
+fetched from /api/admin/profile/requests/<id>.
+
+Output is in the collapsed-stack format ("frame;frame;frame count") accepted by
+flamegraph.pl, speedscope and similar tools.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+import logging
+from collections import Counter, OrderedDict
+from typing import Optional, Set
+
+from flask import Blueprint, Response, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+profiler_bp = Blueprint('profiler', __name__)
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+# Number of per-request profiles kept for retrieval
+PROFILER_KEEP_REQUESTS = int(os.getenv("PROFILER_KEEP_REQUESTS", "20"))
+
+
+class StackSampler:
+    """Samples Python stacks of running threads from a background thread."""
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Set[int]] = None,
+                 exclude_thread_ids: Optional[Set[int]] = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.exclude_thread_ids = exclude_thread_ids or set()
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or thread_id in self.exclude_thread_ids:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                self.counts[";".join(stack)] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self) -> str:
+        """Return samples in collapsed-stack format, heaviest stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+# Whole-worker profiles are exclusive: overlapping samplers would skew each other
+_profile_lock = threading.Lock()
+_request_profiles: "OrderedDict[str, str]" = OrderedDict()
+# Whole-worker profiles still sampling, by profile ID
+_running_profiles: Set[str] = set()
+_request_profiles_lock = threading.Lock()
+
+
+def _is_authorized() -> bool:
+    token = request.headers.get('X-Profiler-Token', '')
+    return bool(token) and hmac.compare_digest(token, PROFILER_TOKEN)
+
+
+def _store_request_profile(profile_id: str, collapsed: str):
+    with _request_profiles_lock:
+        _request_profiles[profile_id] = collapsed
+        while len(_request_profiles) > PROFILER_KEEP_REQUESTS:
+            _request_profiles.popitem(last=False)
+
+
+@profiler_bp.before_app_request
+def start_request_profile():
+    """Start sampling the current thread when the request opts in."""
+    if not PROFILER_TOKEN or request.headers.get('X-Profile') != '1':
+        return None
+    if not _is_authorized():
+        return None
+    sampler = StackSampler(PROFILER_INTERVAL_MS / 1000.0, {threading.get_ident()})
+    sampler.start()
+    g.request_profiler = sampler
+    return None
+
+
+@profiler_bp.after_app_request
+def finish_request_profile(response):
+    """Stop the per-request sampler and expose the profile ID in a header."""
+    sampler = g.pop('request_profiler', None)
+    if sampler is None:
+        return response
+    sampler.stop()
+    profile_id = str(uuid.uuid4())
+    _store_request_profile(profile_id, sampler.collapsed())
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+@profiler_bp.teardown_app_request
+def stop_request_profile(exc):
+    """Stop a sampler that after_request never reached (e.g. the view raised)."""
+    sampler = g.pop('request_profiler', None)
+    if sampler is not None:
+        sampler.stop()
+
+
+def _profile_worker(profile_id: str, seconds: float, interval: float):
+    try:
+        # Skip this thread; it only sleeps
+        sampler = StackSampler(interval, exclude_thread_ids={threading.get_ident()})
+        sampler.start()
+        time.sleep(seconds)
+        sampler.stop()
+        _store_request_profile(profile_id, sampler.collapsed())
+        logger.info(f"Worker profile {profile_id} done ({sampler.samples} samples)")
+    finally:
+        with _request_profiles_lock:
+            _running_profiles.discard(profile_id)
+        _profile_lock.release()
+
+
+@profiler_bp.route('/api/admin/profile', methods=['GET', 'POST'])
+def profile_worker():
+    """Start sampling every thread of this worker for ?seconds=N; returns 202 with a profile_id.
+
+    The request returns at once, so the worker keeps serving the traffic being
+    profiled even with a single sync thread.
+    """
+    if not PROFILER_TOKEN:
+        return jsonify({'success': False, 'message': 'Profiling is disabled'}), 404
+    if not _is_authorized():
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval_ms = float(request.args.get('interval_ms', PROFILER_INTERVAL_MS))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seconds and interval_ms must be numbers'}), 400
+    seconds = max(0.1, min(seconds, PROFILER_MAX_SECONDS))
+    interval_ms = max(1.0, interval_ms)
+
+    if not _profile_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'message': 'A profile is already running on this worker'}), 409
+    profile_id = str(uuid.uuid4())
+    with _request_profiles_lock:
+        _running_profiles.add(profile_id)
+    threading.Thread(target=_profile_worker, args=(profile_id, seconds, interval_ms / 1000.0),
+                     name="worker-profile", daemon=True).start()
+    logger.info(f"Profiling worker pid={os.getpid()} for {seconds}s as {profile_id}")
+    return jsonify({
+        'success': True,
+        'profile_id': profile_id,
+        'pid': os.getpid(),
+        'seconds': seconds,
+        'result_url': f'/api/admin/profile/requests/{profile_id}',
+    }), 202
+
+
+@profiler_bp.route('/api/admin/profile/requests/<profile_id>', methods=['GET'])
+def get_request_profile(profile_id):
+    """Fetch the collapsed stacks of a profiled request or worker profile (202 while sampling)."""
+    if not PROFILER_TOKEN:
+        return jsonify({'success': False, 'message': 'Profiling is disabled'}), 404
+    if not _is_authorized():
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+    with _request_profiles_lock:
+        collapsed = _request_profiles.get(profile_id)
+        running = profile_id in _running_profiles
+    if running:
+        return jsonify({'success': True, 'running': True, 'message': 'Profile still running'}), 202
+    if collapsed is None:
+        return jsonify({'success': False, 'message': 'Profile not found'}), 404
+    response = Response(collapsed, mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.collapsed'
+    return response
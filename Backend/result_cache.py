@@ -0,0 +1,140 @@
+"""
+Two-tier (memory LRU + local disk) cache for expensive voice results.
+
+Keys are content hashes, so a retried upload of the same recording, or a
+re-evaluation of the same transcript for the same question, is answered
+without running Whisper or the LLM again. The disk tier is shared by all
+workers on the host and survives restarts.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "true").lower() == "true"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "practice2panel-cache"))
+RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256"))
+RESULT_CACHE_DISK_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_ENTRIES", "5000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def content_key(*parts) -> str:
+    """SHA-256 over the given bytes/str parts, separated so boundaries matter."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """JSON-serializable values by key, in an LRU dict backed by one file per entry."""
+
+    def __init__(self, name: str, memory_entries: int = RESULT_CACHE_MEMORY_ENTRIES,
+                 disk_entries: int = RESULT_CACHE_DISK_ENTRIES, ttl: float = RESULT_CACHE_TTL,
+                 directory: str = RESULT_CACHE_DIR):
+        self.name = name
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.directory = os.path.join(directory, name)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not RESULT_CACHE_ENABLED:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) < self.ttl:
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+                self._remember(key, value, os.path.getmtime(path))
+                with self._lock:
+                    self.hits += 1
+                return value
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict):
+        if not RESULT_CACHE_ENABLED:
+            return
+        self._remember(key, value, time.time())
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so other workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write {self.name} cache entry: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            self._prune_disk()
+
+    def _remember(self, key: str, value: Dict, stored_at: float):
+        with self._lock:
+            self._memory[key] = (stored_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _prune_disk(self):
+        """Drop expired files and the oldest ones beyond disk_entries."""
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        entries.sort()
+        cutoff = time.time() - self.ttl
+        excess = len(entries) - self.disk_entries
+        for i, (mtime, path) in enumerate(entries):
+            if mtime >= cutoff and i >= excess:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"memory_entries": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+
+transcript_cache = ResultCache("transcripts")
+evaluation_cache = ResultCache("evaluations")
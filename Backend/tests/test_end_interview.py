@@ -0,0 +1,78 @@
+"""
+End-interview after a full interview: every question answered, then the summary.
+
+Model calls are replaced with fixed results, so this runs without API keys:
+    cd Backend && python -m pytest tests
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The agents module requires a key at import; no request reaches the API here
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import app as backend  # noqa: E402
+import mock_interview_messages  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not backend.MOCK_INTERVIEW_AVAILABLE,
+                                reason="mock interview modules not available")
+
+QUESTIONS = ["Tell me about a conflict.", "Describe a deadline you missed.", "What are you proud of?"]
+EVALUATION = {
+    "short_feedback": "Clear answer.\nGood structure.",
+    "detailed_evaluation": "",
+    "rubric_scores": {},
+    "is_irrelevant": False,
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend.QuestionAgent, "generate_questions", staticmethod(lambda *a, **k: list(QUESTIONS)))
+    monkeypatch.setattr(backend.IntentDetectorAgent, "detect_intent", staticmethod(lambda **k: "normal_answer"))
+    monkeypatch.setattr(backend.EvaluatorAgent, "evaluate_answer", staticmethod(lambda *a, **k: dict(EVALUATION)))
+    monkeypatch.setattr(backend.ImprovementAgent, "generate_improvements",
+                        staticmethod(lambda *a, **k: {"Structure": "Lead with the result."}))
+    monkeypatch.setattr(backend.RecruiterAgent, "personalize_closing_message",
+                        staticmethod(lambda *a, **k: "Personal closing"))
+    monkeypatch.setattr(backend.follow_up_provider, "get", lambda *a, **k: [])
+    monkeypatch.setattr(backend, "prefetch_hint", lambda session: None)
+    monkeypatch.setattr(backend, "persist_completed_interview", lambda *a, **k: True)
+    monkeypatch.setattr(backend, "IMPROVEMENT_DIGEST_ENABLED", False)
+    monkeypatch.setattr(backend, "RECRUITER_LLM_MESSAGES", True)
+    monkeypatch.setattr(mock_interview_messages, "RECRUITER_LLM_MESSAGES", True)
+    return backend.app.test_client()
+
+
+def test_closing_message_personalized_after_every_question_answered(client):
+    started = client.post("/api/mock-interview/start-interview", json={
+        "name": "Sam", "job_role": "AI Engineer", "interview_type": "Behavioral"})
+    assert started.status_code == 200
+    session_id = started.get_json()["session_id"]
+
+    for i in range(len(QUESTIONS)):
+        answered = client.post("/api/mock-interview/interact", json={
+            "session_id": session_id, "user_input": f"Answer {i}"})
+        assert answered.status_code == 200
+    assert answered.get_json().get("completed") is True
+
+    ended = client.post("/api/mock-interview/end-interview", json={"session_id": session_id})
+    assert ended.status_code == 200
+    assert ended.get_json().get("closing_message_pending") is True
+
+    deadline = time.monotonic() + 5
+    messages = {}
+    while time.monotonic() < deadline:
+        progress = client.get("/api/mock-interview/progress", query_string={"session_id": session_id})
+        messages = progress.get_json()["messages"]
+        if "closing" in messages:
+            break
+        time.sleep(0.05)
+    assert messages.get("closing") == "Personal closing"
+
+    repeated = client.post("/api/mock-interview/end-interview", json={"session_id": session_id})
+    assert repeated.get_json()["closing_message"] == "Personal closing"
+    assert "closing_message_pending" not in repeated.get_json()
@@ -0,0 +1,162 @@
+"""
+Process pool for Whisper transcription with bounded parallelism.
+
+Running Whisper inline lets every transcription grab all cores through torch's
+thread pool, so concurrent requests thrash each other. With
+TRANSCRIBE_POOL=true, transcriptions run in a fixed set of worker processes.
+Each worker owns its own model, is limited to TRANSCRIBE_POOL_THREADS
+threads and (on Linux) is pinned to its own slice of cores. The pool size
+defaults to the number of such slices that fit on the machine.
+
+Spawned children normally re-run the parent's main script (start_server.py or
+app.py, i.e. the whole Flask app) before doing any work. The workers are
+therefore all started up front with this module standing in as __main__, so
+each child imports only this module.
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIBE_POOL_ENABLED = os.getenv("TRANSCRIBE_POOL", "false").lower() == "true"
+# "auto" or a number of worker processes
+TRANSCRIBE_POOL_SIZE = os.getenv("TRANSCRIBE_POOL_SIZE", "auto")
+# "auto" or torch/CTranslate2 threads per worker
+TRANSCRIBE_POOL_THREADS = os.getenv("TRANSCRIBE_POOL_THREADS", "auto")
+TRANSCRIBE_POOL_PIN_CPUS = os.getenv("TRANSCRIBE_POOL_PIN_CPUS", "true").lower() == "true"
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def auto_tune(size: str = TRANSCRIBE_POOL_SIZE, threads: str = TRANSCRIBE_POOL_THREADS):
+    """Resolve (workers, threads_per_worker) from config and the core count.
+
+    Whisper scales poorly past a few threads per inference, so by default each
+    worker gets 2 cores and the pool runs as many workers as that allows.
+    """
+    cores = len(available_cpus())
+    if size != "auto" and threads != "auto":
+        return max(1, int(size)), max(1, int(threads))
+    if size != "auto":
+        workers = max(1, int(size))
+        return workers, max(1, cores // workers)
+    per_worker = max(1, int(threads)) if threads != "auto" else (2 if cores >= 4 else 1)
+    return max(1, cores // per_worker), per_worker
+
+
+# Set in each worker process by _init_worker
+_worker_model_args = {}
+
+
+def _init_worker(counter, threads: int, pin: bool, engine: Optional[str], model_size: Optional[str]):
+    """Give this worker its thread budget and core slice, then load its model."""
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    if pin and hasattr(os, "sched_setaffinity"):
+        cpus = available_cpus()
+        start = (index * threads) % len(cpus)
+        core_slice = [cpus[(start + i) % len(cpus)] for i in range(threads)]
+        os.sched_setaffinity(0, core_slice)
+
+    # Must be set before torch or CTranslate2 start their thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import voice_processor
+    voice_processor.WHISPER_THREADS = threads
+    voice_processor.get_whisper_model(engine, model_size)
+    _worker_model_args.update(engine=engine, model_size=model_size)
+
+
+def _ping():
+    return os.getpid()
+
+
+def in_pool_worker() -> bool:
+    """True inside a spawned pool worker (set before its main module is imported)."""
+    return multiprocessing.current_process().name != "MainProcess"
+
+
+_main_swap_lock = threading.Lock()
+
+
+@contextmanager
+def _as_main_module():
+    """Make processes spawned in this block import this module as their __main__."""
+    with _main_swap_lock:
+        original = sys.modules["__main__"]
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = original
+
+
+def _transcribe_in_worker(audio):
+    import voice_processor
+    return voice_processor.transcribe_local(audio, **_worker_model_args)
+
+
+class TranscriptionPool:
+    """A ProcessPoolExecutor whose workers each hold a thread-limited Whisper model."""
+
+    def __init__(self, workers: int, threads: int, pin: bool = TRANSCRIBE_POOL_PIN_CPUS,
+                 engine: Optional[str] = None, model_size: Optional[str] = None):
+        self.workers = workers
+        self.threads = threads
+        # spawn: forking a process that already runs torch threads can deadlock
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(context.Value("i", 0), threads, pin, engine, model_size),
+        )
+        # Spawn never replaces workers later, so every child is created here,
+        # one per submit while none is idle
+        with _as_main_module():
+            self._started = [self._executor.submit(_ping) for _ in range(workers)]
+
+    def warm_up(self):
+        """Wait until every worker has loaded its model."""
+        for future in self._started:
+            future.result()
+
+    def submit(self, audio):
+        return self._executor.submit(_transcribe_in_worker, audio)
+
+    def transcribe(self, audio) -> Optional[str]:
+        return self.submit(audio).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool: Optional[TranscriptionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> TranscriptionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers, threads = auto_tune()
+                logger.info(f"Starting transcription pool: {workers} workers x {threads} threads")
+                _pool = TranscriptionPool(workers, threads)
+    return _pool
+
+
+def transcribe(audio) -> Optional[str]:
+    """Transcribe a file path or decoded samples on the shared pool."""
+    return get_pool().transcribe(audio)
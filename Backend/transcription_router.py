@@ -0,0 +1,188 @@
+"""
+Latency-aware routing between local Whisper and the remote transcription API.
+
+Without routing, the OpenAI API is only used when local Whisper fails. With
+TRANSCRIBE_ROUTING=true each request is sent to whichever route is expected
+to finish first. The local estimate is the wait behind transcriptions already
+in flight on this worker plus this recording's own processing time, both
+learned from recent local runs. The remote estimate is learned from recent API
+calls. Remote routing for speed stops once the API spend in the last hour
+reaches TRANSCRIBE_REMOTE_MAX_COST_PER_HOUR. Falling back after a local
+failure is not limited by the ceiling, as before.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIBE_ROUTING_ENABLED = os.getenv("TRANSCRIBE_ROUTING", "false").lower() == "true"
+# Transcriptions this worker can run at once ("auto": the pool size, else 1)
+TRANSCRIBE_LOCAL_CONCURRENCY = os.getenv("TRANSCRIBE_LOCAL_CONCURRENCY", "auto")
+# Starting estimate for an API call, replaced by measurements
+TRANSCRIBE_REMOTE_LATENCY_SECONDS = float(os.getenv("TRANSCRIBE_REMOTE_LATENCY_SECONDS", "4"))
+TRANSCRIBE_REMOTE_MAX_COST_PER_HOUR = float(os.getenv("TRANSCRIBE_REMOTE_MAX_COST_PER_HOUR", "1.0"))
+OPENAI_STT_COST_PER_MINUTE = float(os.getenv("OPENAI_STT_COST_PER_MINUTE", "0.006"))
+# Weight of the newest measurement in the moving averages
+_SMOOTHING = 0.2
+_COST_WINDOW_SECONDS = 3600.0
+# Used when the recording length is unknown (file paths)
+_DEFAULT_AUDIO_SECONDS = 30.0
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else (1 - _SMOOTHING) * current + _SMOOTHING * sample
+
+
+class TranscriptionRouter:
+    """Chooses local or remote transcription per request from live latency estimates.
+
+    `local` and `remote` are callables taking (audio, upload) and returning the
+    transcript.
+    """
+
+    def __init__(self, local: Callable, remote: Callable, local_concurrency: int = 1,
+                 max_cost_per_hour: float = TRANSCRIBE_REMOTE_MAX_COST_PER_HOUR,
+                 cost_per_minute: float = OPENAI_STT_COST_PER_MINUTE,
+                 remote_latency: float = TRANSCRIBE_REMOTE_LATENCY_SECONDS):
+        self.local = local
+        self.remote = remote
+        self.local_concurrency = max(1, local_concurrency)
+        self.max_cost_per_hour = max_cost_per_hour
+        self.cost_per_minute = cost_per_minute
+        self._lock = threading.Lock()
+        self._local_in_flight = 0
+        # Local seconds per audio second, and per job (for the jobs ahead of us)
+        self._local_rtf: Optional[float] = None
+        self._local_job_seconds: Optional[float] = None
+        self._remote_seconds = remote_latency
+        self._spend = deque()  # (timestamp, usd)
+        self.counters = {
+            "local": 0,
+            "remote": 0,
+            "local_failed_to_remote": 0,
+            "remote_failed_to_local": 0,
+            "remote_skipped_cost": 0,
+            "failed": 0,
+        }
+
+    def _spent_last_hour(self, now: float) -> float:
+        while self._spend and self._spend[0][0] < now - _COST_WINDOW_SECONDS:
+            self._spend.popleft()
+        return sum(usd for _, usd in self._spend)
+
+    def estimate_local_seconds(self, duration: float) -> Optional[float]:
+        """Expected local completion time, or None before the first local run."""
+        with self._lock:
+            if self._local_rtf is None:
+                return None
+            rounds_ahead = self._local_in_flight // self.local_concurrency
+            return rounds_ahead * self._local_job_seconds + self._local_rtf * duration
+
+    def choose(self, duration: float, remote_available: bool) -> str:
+        if not remote_available:
+            return "local"
+        local_estimate = self.estimate_local_seconds(duration)
+        if local_estimate is None or local_estimate <= self._remote_seconds:
+            return "local"
+        cost = self.cost_per_minute * duration / 60.0
+        with self._lock:
+            if self._spent_last_hour(time.time()) + cost > self.max_cost_per_hour:
+                self.counters["remote_skipped_cost"] += 1
+                return "local"
+        return "remote"
+
+    def _run_local(self, audio, upload, duration: float):
+        with self._lock:
+            self._local_in_flight += 1
+        start = time.perf_counter()
+        try:
+            text = self.local(audio, upload)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._local_in_flight -= 1
+        with self._lock:
+            self._local_rtf = _ewma(self._local_rtf, elapsed / max(duration, 0.1))
+            self._local_job_seconds = _ewma(self._local_job_seconds, elapsed)
+            self.counters["local"] += 1
+        return text
+
+    def _run_remote(self, audio, upload, duration: float):
+        start = time.perf_counter()
+        text = self.remote(audio, upload)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._spend.append((time.time(), self.cost_per_minute * duration / 60.0))
+            if text:
+                self._remote_seconds = _ewma(self._remote_seconds, elapsed)
+                self.counters["remote"] += 1
+        return text
+
+    def transcribe(self, audio, upload=None, duration: Optional[float] = None,
+                   remote_available: bool = True) -> Optional[str]:
+        duration = duration or _DEFAULT_AUDIO_SECONDS
+        if self.choose(duration, remote_available) == "remote":
+            text = self._run_remote(audio, upload, duration)
+            if text:
+                return text
+            with self._lock:
+                self.counters["remote_failed_to_local"] += 1
+
+        try:
+            return self._run_local(audio, upload, duration)
+        except Exception as e:
+            logger.error(f"Local Whisper transcription error: {e}")
+        if not remote_available:
+            with self._lock:
+                self.counters["failed"] += 1
+            return None
+        with self._lock:
+            self.counters["local_failed_to_remote"] += 1
+        text = self._run_remote(audio, upload, duration)
+        if not text:
+            with self._lock:
+                self.counters["failed"] += 1
+        return text
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "routes": dict(self.counters),
+                "local_in_flight": self._local_in_flight,
+                "local_concurrency": self.local_concurrency,
+                "local_rtf": round(self._local_rtf, 3) if self._local_rtf is not None else None,
+                "remote_latency_seconds": round(self._remote_seconds, 3),
+                "remote_cost_last_hour": round(self._spent_last_hour(time.time()), 4),
+                "remote_cost_ceiling_per_hour": self.max_cost_per_hour,
+            }
+
+
+def _default_local_concurrency() -> int:
+    if TRANSCRIBE_LOCAL_CONCURRENCY != "auto":
+        return int(TRANSCRIBE_LOCAL_CONCURRENCY)
+    import transcription_pool
+    if transcription_pool.TRANSCRIBE_POOL_ENABLED:
+        return transcription_pool.auto_tune()[0]
+    return 1
+
+
+_router: Optional[TranscriptionRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> TranscriptionRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                from voice_processor import transcribe_local_route, transcribe_remote
+                _router = TranscriptionRouter(
+                    local=transcribe_local_route,
+                    remote=transcribe_remote,
+                    local_concurrency=_default_local_concurrency(),
+                )
+    return _router
@@ -0,0 +1,199 @@
+"""
+Shared Whisper transcription process.
+
+Each gunicorn worker otherwise loads its own copy of the Whisper model. With
+TRANSCRIBE_SERVICE=true, workers instead submit audio to a single long-lived
+process that owns the only model instance. The process listens on a Unix socket
+and is started on demand by the first worker that needs it (or manually with
+`python transcription_service.py`). Combined with TRANSCRIBE_POOL=true the
+service fans requests out to a process pool instead of a single model.
+
+Requests are pickled, so the service only starts with TRANSCRIBE_SERVICE_AUTHKEY
+(or SECRET_KEY) set, and its socket lives in a directory only this user can
+open: $XDG_RUNTIME_DIR/practice2panel, else practice2panel-<uid> in the temp
+directory. Unix only; on Windows leave TRANSCRIBE_SERVICE off.
+"""
+import logging
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no Unix sockets, the shared service is unavailable
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default_socket_dir() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "practice2panel")
+    suffix = f"-{os.getuid()}" if hasattr(os, "getuid") else ""
+    return os.path.join(tempfile.gettempdir(), f"practice2panel{suffix}")
+
+
+TRANSCRIBE_SERVICE_ENABLED = os.getenv("TRANSCRIBE_SERVICE", "false").lower() == "true"
+TRANSCRIBE_SERVICE_SOCKET = os.getenv("TRANSCRIBE_SERVICE_SOCKET") or os.path.join(
+    _default_socket_dir(), "transcribe.sock"
+)
+# Seconds a worker waits for a freshly spawned service to load the model
+TRANSCRIBE_SERVICE_START_TIMEOUT = float(os.getenv("TRANSCRIBE_SERVICE_START_TIMEOUT", "120"))
+
+
+def _authkey() -> bytes:
+    key = os.getenv("TRANSCRIBE_SERVICE_AUTHKEY") or os.getenv("SECRET_KEY")
+    if not key:
+        raise RuntimeError("Set TRANSCRIBE_SERVICE_AUTHKEY or SECRET_KEY to use the shared transcription service")
+    return key.encode()
+
+
+def _ensure_private_dir():
+    """Create the socket's directory (0700); refuse one another user could write to."""
+    path = os.path.dirname(os.path.abspath(TRANSCRIBE_SERVICE_SOCKET))
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be a directory owned by this user with mode 0700")
+
+
+def _lock_path() -> str:
+    return TRANSCRIBE_SERVICE_SOCKET + ".lock"
+
+
+def _connect() -> Optional[Client]:
+    authkey = _authkey()
+    _ensure_private_dir()
+    try:
+        return Client(TRANSCRIBE_SERVICE_SOCKET, family='AF_UNIX', authkey=authkey)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+
+def _spawn_service():
+    """Start the service in the background; duplicate spawns exit on the lock."""
+    logger.info("Starting shared transcription service...")
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        start_new_session=True,
+    )
+
+
+def ensure_service_running(wait: bool = True) -> bool:
+    """Make sure the shared service is up, spawning it if needed."""
+    conn = _connect()
+    if conn is not None:
+        conn.close()
+        return True
+    _spawn_service()
+    if not wait:
+        return False
+    deadline = time.monotonic() + TRANSCRIBE_SERVICE_START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        conn = _connect()
+        if conn is not None:
+            conn.close()
+            return True
+    logger.error("Shared transcription service did not start in time")
+    return False
+
+
+def transcribe(audio) -> Optional[str]:
+    """Transcribe a file path or decoded samples through the shared service. Raises on service errors."""
+    conn = _connect()
+    if conn is None:
+        if not ensure_service_running():
+            raise RuntimeError("Shared transcription service unavailable")
+        conn = _connect()
+        if conn is None:
+            raise RuntimeError("Shared transcription service unavailable")
+    try:
+        conn.send({"audio": audio})
+        reply = conn.recv()
+    finally:
+        conn.close()
+    if reply.get("error"):
+        raise RuntimeError(reply["error"])
+    return reply.get("text")
+
+
+def _handle_client(conn, model_lock: threading.Lock):
+    from voice_processor import transcribe_local
+    import transcription_pool
+    try:
+        request = conn.recv()
+        try:
+            if transcription_pool.TRANSCRIBE_POOL_ENABLED:
+                # Each pool worker owns a model, so requests run in parallel
+                text = transcription_pool.transcribe(request["audio"])
+            else:
+                # Whisper models are not safe for concurrent use
+                with model_lock:
+                    text = transcribe_local(request["audio"])
+            conn.send({"text": text})
+        except Exception as e:
+            logger.error(f"Shared transcription error: {e}")
+            conn.send({"error": str(e)})
+    except EOFError:
+        pass
+    finally:
+        conn.close()
+
+
+def serve():
+    """Run the service until killed. Exits if another instance holds the lock or it cannot run safely."""
+    if fcntl is None:
+        logger.error("The shared transcription service needs Unix sockets; leave TRANSCRIBE_SERVICE off")
+        return
+    try:
+        authkey = _authkey()
+        _ensure_private_dir()
+    except RuntimeError as e:
+        logger.error(f"Not starting shared transcription service: {e}")
+        return
+    lock_file = open(_lock_path(), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        logger.info("Shared transcription service already running")
+        return
+
+    import transcription_pool
+    if transcription_pool.TRANSCRIBE_POOL_ENABLED:
+        transcription_pool.get_pool().warm_up()
+    else:
+        from voice_processor import get_whisper_model
+        get_whisper_model()
+
+    if os.path.exists(TRANSCRIBE_SERVICE_SOCKET):
+        os.unlink(TRANSCRIBE_SERVICE_SOCKET)
+    listener = Listener(TRANSCRIBE_SERVICE_SOCKET, family='AF_UNIX', authkey=authkey)
+    logger.info(f"Shared transcription service listening on {TRANSCRIBE_SERVICE_SOCKET} (pid={os.getpid()})")
+    model_lock = threading.Lock()
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logger.warning(f"Rejected transcription client: {e}")
+                continue
+            threading.Thread(target=_handle_client, args=(conn, model_lock), daemon=True).start()
+    finally:
+        listener.close()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+    logging.basicConfig(level=logging.INFO)
+    serve()
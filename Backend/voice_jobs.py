@@ -0,0 +1,272 @@
+"""
+Asynchronous voice processing jobs.
+
+POST /api/process-voice with `async=true` enqueues the upload and returns a job
+ID straight away instead of holding the request worker through transcription
+and evaluation. A bounded pool of background threads works the queue in
+priority order (FIFO within a priority). Clients poll
+/api/voice-jobs/<job_id> or subscribe to /api/voice-jobs/<job_id>/events
+(Server-Sent Events), which emits the transcript as soon as it is ready and
+the evaluation afterwards.
+
+Jobs live in the memory of the worker that accepted them, so polling must
+reach the same worker (run gunicorn with one worker and threads, or use
+sticky sessions).
+"""
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Optional
+
+from flask import Blueprint, Response, jsonify, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+voice_jobs_bp = Blueprint('voice_jobs', __name__)
+
+VOICE_JOB_WORKERS = int(os.getenv("VOICE_JOB_WORKERS", "2"))
+VOICE_JOB_MAX_QUEUED = int(os.getenv("VOICE_JOB_MAX_QUEUED", "50"))
+# Finished jobs are kept this long for polling
+VOICE_JOB_TTL = float(os.getenv("VOICE_JOB_TTL", "600"))
+DEFAULT_PRIORITY = 5
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at VOICE_JOB_MAX_QUEUED."""
+
+
+class VoiceJob:
+    """A queued voice upload and its progress."""
+
+    def __init__(self, data: bytes, ext: str, question: str, priority: int,
+                 job_title: str, skills: str, with_feedback: bool):
+        self.job_id = str(uuid.uuid4())
+        self.data = data
+        self.ext = ext
+        self.question = question
+        self.priority = priority
+        self.job_title = job_title
+        self.skills = skills
+        self.with_feedback = with_feedback
+        self.status = "queued"  # queued -> transcribing -> evaluating -> done | failed
+        self.transcript: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Bumped on every change so SSE subscribers know when to emit
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def update(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "priority": self.priority,
+            "transcript": self.transcript,
+            "result": self.result,
+            "queued_seconds": round((self.started_at or time.time()) - self.created_at, 3),
+        }
+
+
+class VoiceJobQueue:
+    """Bounded pool of worker threads draining a priority queue of voice jobs."""
+
+    def __init__(self, workers: int = VOICE_JOB_WORKERS, max_queued: int = VOICE_JOB_MAX_QUEUED):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.jobs: Dict[str, VoiceJob] = {}
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._recent_waits = deque(maxlen=200)
+
+    def _ensure_started(self):
+        # Threads start lazily so gunicorn's fork happens before they exist
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"voice-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job: VoiceJob) -> VoiceJob:
+        with self._lock:
+            self._ensure_started()
+            self._purge_expired()
+            if self._queue.qsize() >= self.max_queued:
+                self._rejected += 1
+                raise QueueFullError("Voice processing queue is full")
+            self.jobs[job.job_id] = job
+            self._queue.put((job.priority, next(self._sequence), job.job_id))
+        return job
+
+    def get(self, job_id: str) -> Optional[VoiceJob]:
+        with self._lock:
+            self._purge_expired()
+            return self.jobs.get(job_id)
+
+    def _purge_expired(self):
+        # Called with self._lock held
+        cutoff = time.time() - VOICE_JOB_TTL
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def _work(self):
+        while True:
+            try:
+                _priority, _seq, job_id = self._queue.get(timeout=VOICE_JOB_TTL)
+            except queue.Empty:
+                # Idle: drop finished jobs nobody polled, since no submit() will
+                with self._lock:
+                    self._purge_expired()
+                continue
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            started = time.time()
+            with self._lock:
+                self._running += 1
+                self._recent_waits.append(started - job.created_at)
+            try:
+                self._process(job, started)
+                with self._lock:
+                    self._completed += 1
+            except Exception as e:
+                logger.error(f"Voice job {job_id} failed: {e}")
+                job.update(status="failed", finished_at=time.time(), result={
+                    'success': False,
+                    'message': f'Server error during voice processing: {str(e)}'
+                })
+                with self._lock:
+                    self._failed += 1
+            finally:
+                # The upload is no longer needed once processed
+                job.data = b""
+                with self._lock:
+                    self._running -= 1
+
+    def _process(self, job: VoiceJob, started: float):
+        from voice_processor import build_voice_result, process_text_response, transcribe_upload
+
+        job.update(status="transcribing", started_at=started)
+        transcript, speech_ratio, rejection = transcribe_upload(job.data, job.ext)
+        if rejection:
+            job.update(status="done", result=rejection, finished_at=time.time())
+            return
+
+        result = build_voice_result(transcript, job.question, job_title=job.job_title,
+                                    skills=job.skills, with_feedback=False)
+        if speech_ratio is not None:
+            result['speech_ratio'] = round(speech_ratio, 3)
+        if not result.get('success') or not job.with_feedback:
+            job.update(status="done", transcript=result.get('transcript'), result=result, finished_at=time.time())
+            return
+
+        # Publish the transcript before the (slower) evaluation
+        job.update(status="evaluating", transcript=result['transcript'])
+        eval_result = process_text_response(result['transcript'], job.question,
+                                            job_title=job.job_title, skills=job.skills)
+        result.update({
+            'evaluation': (eval_result.get('evaluation') if eval_result.get('success') else None),
+            'rubric_used': eval_result.get('rubric_used', False),
+            'rubric_source': eval_result.get('rubric_source'),
+        })
+        job.update(status="done", result=result, finished_at=time.time())
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "tracked_jobs": len(self.jobs),
+                "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            }
+
+
+job_queue = VoiceJobQueue()
+
+
+def submit_voice_job(data: bytes, ext: str, question: str, priority: int = DEFAULT_PRIORITY,
+                     job_title: str = "Software Engineer", skills: str = "Python, React",
+                     with_feedback: bool = True) -> VoiceJob:
+    """Queue a voice upload; raises QueueFullError when the queue is saturated."""
+    job = VoiceJob(data, ext, question, priority, job_title, skills, with_feedback)
+    return job_queue.submit(job)
+
+
+@voice_jobs_bp.route('/api/voice-jobs/metrics', methods=['GET'])
+def voice_job_metrics():
+    """Queue depth, worker usage and wait-time metrics for this worker."""
+    import transcription_router
+    metrics = job_queue.metrics()
+    if transcription_router.TRANSCRIBE_ROUTING_ENABLED:
+        metrics['transcription_routing'] = transcription_router.get_router().metrics()
+    return jsonify({'success': True, 'metrics': metrics})
+
+
+@voice_jobs_bp.route('/api/voice-jobs/<job_id>', methods=['GET'])
+def get_voice_job(job_id):
+    """Poll a voice job for its status, transcript and result."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+
+@voice_jobs_bp.route('/api/voice-jobs/<job_id>/events', methods=['GET'])
+def stream_voice_job(job_id):
+    """Stream job updates as Server-Sent Events until the job finishes."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+    def events():
+        seen = -1
+        while True:
+            # Decide under the lock, write after releasing it, so a slow client never blocks job.update()
+            with job.changed:
+                if job.version == seen:
+                    job.changed.wait(timeout=15)
+                payload = None
+                if job.version != seen:
+                    seen = job.version
+                    payload = job.to_dict()
+            if payload is None:
+                # Keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {payload['status']}\ndata: {json.dumps(payload)}\n\n"
+            if payload['status'] in ("done", "failed"):
+                return
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,11 +1,20 @@
 import os
 import tempfile
 import re
+import threading
 from dotenv import load_dotenv
 import logging
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from rubric_loader import load_rubric_text
+from audio_utils import (
+    SAMPLE_RATE, VOICE_MAX_DURATION_SECONDS, AudioDecodeError, decode_audio_bytes, decode_audio_file,
+    trim_silence,
+)
+from result_cache import content_key, evaluation_cache, transcript_cache
+import transcription_pool
+import transcription_router
+import transcription_service
 from openai import OpenAI
 
 # Load environment variables
@@ -15,23 +24,84 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global whisper model instance
-whisper_model = None
+# Loaded transcription models, keyed by (engine, model size)
+whisper_models: Dict[Tuple[str, str], object] = {}
+whisper_model_lock = threading.Lock()
 openai_client: Optional[OpenAI] = None
 
-def get_whisper_model():
-    """Get or initialize the Whisper model"""
-    global whisper_model
-    if whisper_model is None:
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+# "openai-whisper" (PyTorch, fp32 on CPU) or "faster-whisper" (CTranslate2, quantized)
+TRANSCRIBE_ENGINE = os.getenv("TRANSCRIBE_ENGINE", "openai-whisper").lower()
+# Quantization used by faster-whisper: int8, int8_float32, float32, ...
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+# CPU threads per model; 0 keeps the library default
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "0"))
+# Decode uploads through an ffmpeg pipe instead of a temp file
+VOICE_IN_MEMORY_DECODE = os.getenv("VOICE_IN_MEMORY_DECODE", "true").lower() == "true"
+# Trim silence before transcription and reject recordings without speech
+VOICE_VAD = os.getenv("VOICE_VAD", "true").lower() == "true"
+VAD_MIN_SPEECH_SECONDS = float(os.getenv("VAD_MIN_SPEECH_SECONDS", "0.5"))
+
+def _load_openai_whisper(model_size: str):
+    try:
+        # Lazy import so backend can start without whisper installed
+        import whisper  # type: ignore
+    except ImportError as e:
+        logger.error("Whisper is not installed. Install 'openai-whisper' to enable voice features.")
+        raise
+    if WHISPER_THREADS:
+        import torch  # type: ignore
+        torch.set_num_threads(WHISPER_THREADS)
+    return whisper.load_model(model_size)
+
+def _load_faster_whisper(model_size: str):
+    try:
+        from faster_whisper import WhisperModel  # type: ignore
+    except ImportError as e:
+        logger.error("faster-whisper is not installed. Install 'faster-whisper' to use TRANSCRIBE_ENGINE=faster-whisper.")
+        raise
+    return WhisperModel(
+        model_size,
+        device="cpu",
+        compute_type=FASTER_WHISPER_COMPUTE_TYPE,
+        cpu_threads=WHISPER_THREADS,
+    )
+
+def get_whisper_model(engine: Optional[str] = None, model_size: Optional[str] = None):
+    """Get or initialize the Whisper model for the given (or configured) engine and size"""
+    key = (engine or TRANSCRIBE_ENGINE, model_size or WHISPER_MODEL)
+    model = whisper_models.get(key)
+    if model is None:
+        # Warm-up and request threads may race to load the model
+        with whisper_model_lock:
+            model = whisper_models.get(key)
+            if model is None:
+                logger.info(f"Loading Whisper model '{key[1]}' with engine '{key[0]}'...")
+                if key[0] == "faster-whisper":
+                    model = _load_faster_whisper(key[1])
+                else:
+                    model = _load_openai_whisper(key[1])
+                whisper_models[key] = model
+    return model
+
+
+def warm_up_transcription():
+    """Load the transcription model ahead of the first request (non-blocking)."""
+    if transcription_pool.in_pool_worker():
+        return  # Pool workers load their own model in their initializer
+    def _warm():
         try:
-            # Lazy import so backend can start without whisper installed
-            import whisper  # type: ignore
-        except ImportError as e:
-            logger.error("Whisper is not installed. Install 'openai-whisper' to enable voice features.")
-            raise
-        logger.info("Loading Whisper model...")
-        whisper_model = whisper.load_model("base")
-    return whisper_model
+            if transcription_service.TRANSCRIBE_SERVICE_ENABLED:
+                transcription_service.ensure_service_running()
+            elif transcription_pool.TRANSCRIBE_POOL_ENABLED:
+                transcription_pool.get_pool().warm_up()
+            else:
+                get_whisper_model()
+            logger.info("✓ Transcription model warmed up")
+        except Exception as e:
+            logger.warning(f"⚠ Transcription warm-up failed: {e}")
+
+    threading.Thread(target=_warm, name="whisper-warmup", daemon=True).start()
 
 
 def get_openai_client() -> OpenAI:
@@ -40,28 +110,51 @@ def get_openai_client() -> OpenAI:
         openai_client = OpenAI()
     return openai_client
 
-def transcribe_audio(audio_file_path):
-    """Transcribe audio using local Whisper; on failure, fall back to OpenAI API if available."""
-    # First: local whisper
-    try:
-        model = get_whisper_model()
-        result = model.transcribe(audio_file_path)
-        return result["text"]
-    except Exception as e:
-        logger.error(f"Local Whisper transcription error: {e}")
+def transcribe_local(audio, engine: Optional[str] = None, model_size: Optional[str] = None):
+    """Transcribe a file path or 16 kHz float32 samples with the in-process Whisper model."""
+    engine = engine or TRANSCRIBE_ENGINE
+    model = get_whisper_model(engine, model_size)
+    if engine == "faster-whisper":
+        segments, _info = model.transcribe(audio, beam_size=5)
+        # segments is a lazy generator; decoding happens while joining
+        return "".join(segment.text for segment in segments)
+    result = model.transcribe(audio)
+    return result["text"]
 
-    # Fallback: OpenAI Whisper API
+def transcribe_local_route(audio, upload: Optional[Tuple[str, bytes]] = None):
+    """Transcribe with local Whisper (in the shared service or process pool when enabled)."""
+    if transcription_service.TRANSCRIBE_SERVICE_ENABLED:
+        return transcription_service.transcribe(audio)
+    if transcription_pool.TRANSCRIBE_POOL_ENABLED:
+        return transcription_pool.transcribe(audio)
+    return transcribe_local(audio)
+
+def remote_transcription_available(audio, upload: Optional[Tuple[str, bytes]] = None) -> bool:
+    """The OpenAI API needs a key and an encoded file (a path or the original upload)."""
+    return bool(os.getenv("OPENAI_API_KEY")) and (isinstance(audio, str) or upload is not None)
+
+def transcribe_remote(audio, upload: Optional[Tuple[str, bytes]] = None):
+    """Transcribe with the OpenAI Whisper API; returns None on failure."""
     try:
         api_key_present = bool(os.getenv("OPENAI_API_KEY"))
         if not api_key_present:
             logger.error("OPENAI_API_KEY not set; cannot use OpenAI Whisper fallback.")
             return None
         client = get_openai_client()
-        with open(audio_file_path, "rb") as f:
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                tr = client.audio.transcriptions.create(
+                    model=os.getenv("OPENAI_STT_MODEL", "whisper-1"),
+                    file=f
+                )
+        elif upload is not None:
             tr = client.audio.transcriptions.create(
                 model=os.getenv("OPENAI_STT_MODEL", "whisper-1"),
-                file=f
+                file=upload
             )
+        else:
+            logger.error("No encoded audio available for OpenAI Whisper fallback.")
+            return None
         text = getattr(tr, "text", None) or (tr.get("text") if isinstance(tr, dict) else None)
         if not text:
             logger.error("OpenAI Whisper API returned no text.")
@@ -71,8 +164,38 @@ def transcribe_audio(audio_file_path):
         logger.error(f"OpenAI Whisper API transcription error: {e}")
         return None
 
+def transcribe_audio(audio, upload: Optional[Tuple[str, bytes]] = None):
+    """Transcribe audio using local Whisper; on failure, fall back to OpenAI API if available.
+
+    `audio` is either a file path or decoded 16 kHz mono float32 samples. When
+    passing samples, `upload` carries the original (filename, bytes) for the
+    API fallback, which only accepts encoded files. With TRANSCRIBE_ROUTING
+    enabled the API is also used when it is expected to be faster.
+    """
+    if transcription_router.TRANSCRIBE_ROUTING_ENABLED:
+        duration = None if isinstance(audio, str) else len(audio) / SAMPLE_RATE
+        return transcription_router.get_router().transcribe(
+            audio, upload, duration=duration,
+            remote_available=remote_transcription_available(audio, upload),
+        )
+
+    # First: local whisper
+    try:
+        return transcribe_local_route(audio, upload)
+    except Exception as e:
+        logger.error(f"Local Whisper transcription error: {e}")
+
+    # Fallback: OpenAI Whisper API
+    return transcribe_remote(audio, upload)
+
 def process_text_response(text_response, question, job_title="Software Engineer", skills="Python, React"):
     """Process text response using LLM and rubric-derived criteria."""
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    cache_key = content_key(text_response, question, job_title, skills, model)
+    cached = evaluation_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Evaluation cache hit")
+        return cached
     try:
         # Infer a primary skill to find a rubric
         primary_skill = (skills.split(',')[0] if isinstance(skills, str) and skills else "").strip()
@@ -93,7 +216,7 @@ def process_text_response(text_response, question, job_title="Software Engineer"
 
         client = get_openai_client()
         completion = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            model=model,
             temperature=0.2,
             messages=[
                 {"role": "system", "content": prompt_system},
@@ -102,12 +225,14 @@ def process_text_response(text_response, question, job_title="Software Engineer"
             response_format={"type": "json_object"}
         )
         content = completion.choices[0].message.content
-        return {
+        result = {
             'success': True,
             'evaluation': content,
             'rubric_used': bool(rubric_text),
             'rubric_source': rubric_source,
         }
+        evaluation_cache.set(cache_key, result)
+        return result
     except Exception as e:
         logger.error(f"Error processing text response: {e}")
         return {
@@ -115,81 +240,159 @@ def process_text_response(text_response, question, job_title="Software Engineer"
             'message': f'Error processing text response: {str(e)}'
         }
 
+def guess_audio_extension(filename: str, mimetype: str) -> str:
+    """Determine appropriate extension based on uploaded file metadata"""
+    ext = '.wav'
+    lower_name = (filename or '').lower()
+    mimetype = mimetype or ''
+    if lower_name.endswith('.webm') or 'webm' in mimetype:
+        ext = '.webm'
+    elif lower_name.endswith('.ogg') or 'ogg' in mimetype:
+        ext = '.ogg'
+    elif lower_name.endswith('.mp3') or 'mp3' in mimetype:
+        ext = '.mp3'
+    elif lower_name.endswith('.m4a') or 'mp4' in mimetype or 'm4a' in mimetype:
+        ext = '.m4a'
+    return ext
+
+def build_voice_result(transcript, question, job_title="Software Engineer", skills="Python, React", with_feedback: bool = True):
+    """Validate a transcript and, when meaningful, evaluate it."""
+    # Clean and validate transcript
+    if transcript:
+        transcript_clean = transcript.strip() if transcript else ''
+        # Check if transcript is meaningful (more strict validation)
+        words = transcript_clean.split() if transcript_clean else []
+        word_count = len([w for w in words if re.search(r'\w', w)])
+
+        is_meaningful = (
+            len(transcript_clean) >= 10 and  # At least 10 characters
+            word_count >= 2 and  # At least 2 words
+            bool(re.search(r'\w', transcript_clean)) and  # Contains word characters
+            not re.match(r'^(uh+|um+|er+|ah+|hmm+|\.{2,}|\s+|[\.\s\-_]+)$', transcript_clean, re.IGNORECASE) and
+            not re.match(r'^[^\w\s]+$', transcript_clean)  # Not just punctuation
+        )
+
+        if is_meaningful:
+            logger.info(f"Transcription successful: {transcript_clean[:100]}...")
+            if with_feedback:
+                eval_result = process_text_response(transcript_clean, question, job_title=job_title, skills=skills)
+            else:
+                eval_result = None
+            return {
+                'success': True,
+                'transcript': transcript_clean,
+                'question': question,
+                'message': 'Voice response processed successfully',
+                'evaluation': (eval_result.get('evaluation') if eval_result and eval_result.get('success') else None),
+                'rubric_used': (eval_result.get('rubric_used') if eval_result else False),
+                'rubric_source': (eval_result.get('rubric_source') if eval_result else None),
+            }
+        else:
+            logger.warning(f"Transcript detected but not meaningful: '{transcript_clean}' (length: {len(transcript_clean)})")
+            return {
+                'success': False,
+                'message': 'No meaningful speech detected. Please try again.',
+                'transcript': transcript_clean  # Include for debugging
+            }
+    else:
+        logger.error("Transcription failed - no transcript returned")
+        return {
+            'success': False,
+            'message': 'Failed to transcribe audio. Please try again.'
+        }
+
+def _decode_via_temp_file(data: bytes, ext: str, max_seconds: float):
+    """Write the upload to disk and decode it from there, where ffmpeg can seek."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
+        temp_file.write(data)
+        temp_file_path = temp_file.name
+    try:
+        return decode_audio_file(temp_file_path, max_seconds=max_seconds)
+    finally:
+        # Clean up temporary file
+        if os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
+def transcribe_upload(data: bytes, ext: str) -> Tuple[Optional[str], Optional[float], Optional[Dict]]:
+    """Decode, VAD-trim and transcribe an uploaded recording.
+
+    Returns (transcript, speech_ratio, rejection); `rejection` is a ready
+    response when the recording was turned away before transcription.
+    Identical uploads (e.g. client retries) are served from the result cache.
+    """
+    cache_key = content_key(data, TRANSCRIBE_ENGINE, WHISPER_MODEL, str(VOICE_VAD), str(VOICE_MAX_DURATION_SECONDS))
+    cached = transcript_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Transcript cache hit")
+        return cached['transcript'], cached['speech_ratio'], cached['rejection']
+
+    transcript, speech_ratio, rejection = _transcribe_upload_uncached(data, ext)
+    # Failed transcriptions are not cached so a retry gets another attempt
+    if transcript or rejection:
+        transcript_cache.set(cache_key, {
+            'transcript': transcript,
+            'speech_ratio': speech_ratio,
+            'rejection': rejection,
+        })
+    return transcript, speech_ratio, rejection
+
+def _transcribe_upload_uncached(data: bytes, ext: str) -> Tuple[Optional[str], Optional[float], Optional[Dict]]:
+    audio = None
+    speech_ratio = None
+    # Stop decoding just past the limit; longer recordings are rejected below
+    max_seconds = VOICE_MAX_DURATION_SECONDS + 1
+    if VOICE_IN_MEMORY_DECODE:
+        try:
+            audio = decode_audio_bytes(data, max_seconds=max_seconds)
+        except AudioDecodeError as e:
+            # e.g. m4a with the index at the end of the file cannot be read from a pipe
+            logger.warning(f"In-memory decode failed, falling back to temp file: {e}")
+    if audio is None:
+        try:
+            audio = _decode_via_temp_file(data, ext, max_seconds)
+        except AudioDecodeError as e:
+            logger.error(f"Could not decode recording: {e}")
+            return None, None, None
+
+    if len(audio) / SAMPLE_RATE > VOICE_MAX_DURATION_SECONDS:
+        return None, None, {
+            'success': False,
+            'message': f'Recording is too long (limit {VOICE_MAX_DURATION_SECONDS:.0f}s). Please record a shorter answer.',
+        }
+
+    if VOICE_VAD:
+        original_seconds = len(audio) / SAMPLE_RATE
+        audio, speech_ratio = trim_silence(audio)
+        speech_seconds = len(audio) / SAMPLE_RATE
+        logger.info(f"VAD kept {speech_seconds:.1f}s of {original_seconds:.1f}s (speech ratio {speech_ratio:.2f})")
+        if speech_seconds < VAD_MIN_SPEECH_SECONDS:
+            # Nothing worth transcribing; skip the model entirely
+            return None, speech_ratio, {
+                'success': False,
+                'message': 'No meaningful speech detected. Please try again.',
+                'transcript': '',
+                'speech_ratio': round(speech_ratio, 3),
+            }
+    return transcribe_audio(audio, upload=(f"audio{ext}", data)), speech_ratio, None
+
 def process_voice_response(audio_file, question, job_title="Software Engineer", skills="Python, React", with_feedback: bool = True):
     """Process voice recording and return transcript with evaluation"""
     try:
-        # Save uploaded file temporarily
-        # Determine appropriate extension based on uploaded file metadata
         filename = getattr(audio_file, 'filename', '') or ''
         mimetype = getattr(audio_file, 'mimetype', '') or ''
-        ext = '.wav'
-        lower_name = filename.lower()
-        if lower_name.endswith('.webm') or 'webm' in mimetype:
-            ext = '.webm'
-        elif lower_name.endswith('.ogg') or 'ogg' in mimetype:
-            ext = '.ogg'
-        elif lower_name.endswith('.mp3') or 'mp3' in mimetype:
-            ext = '.mp3'
-        elif lower_name.endswith('.m4a') or 'mp4' in mimetype or 'm4a' in mimetype:
-            ext = '.m4a'
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            audio_file.save(temp_file.name)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Transcribe audio
-            logger.info(f"Starting audio transcription... (ext={ext}, mimetype={mimetype})")
-            transcript = transcribe_audio(temp_file_path)
-            
-            # Clean and validate transcript
-            if transcript:
-                transcript_clean = transcript.strip() if transcript else ''
-                # Check if transcript is meaningful (more strict validation)
-                words = transcript_clean.split() if transcript_clean else []
-                word_count = len([w for w in words if re.search(r'\w', w)])
-                
-                is_meaningful = (
-                    len(transcript_clean) >= 10 and  # At least 10 characters
-                    word_count >= 2 and  # At least 2 words
-                    bool(re.search(r'\w', transcript_clean)) and  # Contains word characters
-                    not re.match(r'^(uh+|um+|er+|ah+|hmm+|\.{2,}|\s+|[\.\s\-_]+)$', transcript_clean, re.IGNORECASE) and
-                    not re.match(r'^[^\w\s]+$', transcript_clean)  # Not just punctuation
-                )
-                
-                if is_meaningful:
-                    logger.info(f"Transcription successful: {transcript_clean[:100]}...")
-                    if with_feedback:
-                        eval_result = process_text_response(transcript_clean, question, job_title=job_title, skills=skills)
-                    else:
-                        eval_result = None
-                    return {
-                        'success': True,
-                        'transcript': transcript_clean,
-                        'question': question,
-                        'message': 'Voice response processed successfully',
-                        'evaluation': (eval_result.get('evaluation') if eval_result and eval_result.get('success') else None),
-                        'rubric_used': (eval_result.get('rubric_used') if eval_result else False),
-                        'rubric_source': (eval_result.get('rubric_source') if eval_result else None),
-                    }
-                else:
-                    logger.warning(f"Transcript detected but not meaningful: '{transcript_clean}' (length: {len(transcript_clean)})")
-                    return {
-                        'success': False,
-                        'message': 'No meaningful speech detected. Please try again.',
-                        'transcript': transcript_clean  # Include for debugging
-                    }
-            else:
-                logger.error("Transcription failed - no transcript returned")
-                return {
-                    'success': False,
-                    'message': 'Failed to transcribe audio. Please try again.'
-                }
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-                
+        ext = guess_audio_extension(filename, mimetype)
+        data = audio_file.read()
+
+        logger.info(f"Starting audio transcription... (ext={ext}, mimetype={mimetype})")
+        transcript, speech_ratio, rejection = transcribe_upload(data, ext)
+        if rejection:
+            return rejection
+
+        result = build_voice_result(transcript, question, job_title=job_title, skills=skills, with_feedback=with_feedback)
+        if speech_ratio is not None:
+            result['speech_ratio'] = round(speech_ratio, 3)
+        return result
+
     except Exception as e:
         logger.error(f"Error processing voice response: {e}")
         return {
@@ -0,0 +1,295 @@
+"""
+Incremental transcription of voice answers while they are being recorded.
+
+The frontend opens a stream, posts MediaRecorder chunks as they are produced
+and calls finish when the user stops. Each stream keeps one ffmpeg process fed
+through stdin, so the container (webm/ogg) is decoded continuously rather than
+chunk by chunk. A background thread transcribes fixed windows with a small
+overlap as soon as enough audio has arrived; on finish only the remaining tail
+is transcribed, so the final transcript is ready shortly after recording stops.
+
+Streams live in the memory of the worker that opened them. With more than one
+gunicorn worker, a chunk or finish request that reaches another worker gets
+404 and the client falls back to a full upload; use one worker (with threads)
+or sticky routing to keep streaming effective.
+"""
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+from flask import Blueprint, jsonify, request
+
+from audio_utils import SAMPLE_RATE, VOICE_MAX_DURATION_SECONDS, VOICE_MAX_UPLOAD_BYTES, UploadLimitError
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceStreamClosedError(Exception):
+    """A chunk arrived after the stream was finished or closed."""
+
+
+voice_stream_bp = Blueprint('voice_stream', __name__)
+
+VOICE_STREAM_WINDOW_SECONDS = float(os.getenv("VOICE_STREAM_WINDOW_SECONDS", "10"))
+VOICE_STREAM_OVERLAP_SECONDS = float(os.getenv("VOICE_STREAM_OVERLAP_SECONDS", "1.5"))
+VOICE_STREAM_IDLE_TIMEOUT = float(os.getenv("VOICE_STREAM_IDLE_TIMEOUT", "120"))
+VOICE_STREAM_MAX = int(os.getenv("VOICE_STREAM_MAX", "20"))
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def merge_transcripts(previous: str, new: str, max_overlap_words: int = 20) -> str:
+    """Append `new` to `previous`, dropping words repeated by the window overlap."""
+    new = (new or "").strip()
+    if not previous:
+        return new
+    if not new:
+        return previous
+    prev_words = [_normalize(w) for w in previous.split()]
+    new_raw = new.split()
+    new_words = [_normalize(w) for w in new_raw]
+    for k in range(min(max_overlap_words, len(prev_words), len(new_words)), 0, -1):
+        if prev_words[-k:] == new_words[:k]:
+            new_raw = new_raw[k:]
+            break
+    return " ".join([previous] + new_raw) if new_raw else previous
+
+
+class VoiceStream:
+    """One in-progress recording: an ffmpeg decoder plus a window transcriber."""
+
+    def __init__(self):
+        self.stream_id = str(uuid.uuid4())
+        self.last_activity = time.monotonic()
+        self.text = ""
+        self._pcm = bytearray()
+        self._pcm_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._next_seq = 0
+        self._bytes_received = 0
+        self._pending: Dict[int, bytes] = {}
+        self._committed = 0  # samples already covered by transcribed windows
+        self._new_audio = threading.Event()
+        self._finishing = threading.Event()
+        self._closed = False  # set once the decoder's stdin is closed or ffmpeg killed
+        self._proc = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+             "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+             "-ar", str(SAMPLE_RATE), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._reader = threading.Thread(target=self._read_pcm, daemon=True)
+        self._reader.start()
+        self._worker = threading.Thread(target=self._transcribe_windows, daemon=True)
+        self._worker.start()
+
+    def add_chunk(self, seq: int, data: bytes):
+        """Feed a chunk to the decoder; out-of-order chunks wait for their turn.
+
+        Raises UploadLimitError once the recording passes the size or duration limit,
+        and VoiceStreamClosedError for a chunk arriving after finish or close.
+        """
+        self.last_activity = time.monotonic()
+        with self._write_lock:
+            if self._closed:
+                raise VoiceStreamClosedError("Voice stream is already finished")
+            if seq < self._next_seq:
+                return  # duplicate from a client retry
+            self._bytes_received += len(data)
+            if self._bytes_received > VOICE_MAX_UPLOAD_BYTES:
+                raise UploadLimitError(
+                    f"Recording is too large (limit {VOICE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB)")
+            if self._available() > VOICE_MAX_DURATION_SECONDS * SAMPLE_RATE:
+                raise UploadLimitError(
+                    f"Recording is too long (limit {VOICE_MAX_DURATION_SECONDS:.0f}s)")
+            self._pending[seq] = data
+            try:
+                while self._next_seq in self._pending:
+                    self._proc.stdin.write(self._pending.pop(self._next_seq))
+                    self._next_seq += 1
+                self._proc.stdin.flush()
+            except (OSError, ValueError) as e:
+                if self._closed:  # killed by close() mid-write
+                    raise VoiceStreamClosedError("Voice stream is already finished") from e
+                raise
+
+    def _read_pcm(self):
+        while True:
+            chunk = self._proc.stdout.read(8192)
+            if not chunk:
+                break
+            with self._pcm_lock:
+                self._pcm.extend(chunk)
+            self._new_audio.set()
+
+    def _samples(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        with self._pcm_lock:
+            raw = bytes(self._pcm[start * 2:(end * 2 if end is not None else None)])
+        return np.frombuffer(raw, np.int16).astype(np.float32) / 32768.0
+
+    def _available(self) -> int:
+        with self._pcm_lock:
+            return len(self._pcm) // 2
+
+    def _transcribe_span(self, end: Optional[int]):
+        from voice_processor import transcribe_audio
+        overlap = int(VOICE_STREAM_OVERLAP_SECONDS * SAMPLE_RATE)
+        audio = self._samples(max(0, self._committed - overlap), end)
+        self.text = merge_transcripts(self.text, transcribe_audio(audio) or "")
+
+    def _transcribe_windows(self):
+        window = int(VOICE_STREAM_WINDOW_SECONDS * SAMPLE_RATE)
+        while not self._finishing.is_set():
+            self._new_audio.wait(timeout=1.0)
+            self._new_audio.clear()
+            while not self._finishing.is_set() and self._available() >= self._committed + window:
+                end = self._committed + window
+                try:
+                    self._transcribe_span(end)
+                except Exception as e:
+                    logger.error(f"Streaming window transcription error: {e}")
+                self._committed = end
+
+    def finish(self) -> str:
+        """Flush the decoder, transcribe the remaining tail and return the transcript."""
+        with self._write_lock:
+            self._closed = True
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+        self._reader.join(timeout=10)
+        self._finishing.set()
+        self._new_audio.set()
+        # Lets an in-flight window finish so the tail starts where it ended
+        self._worker.join()
+        if self._available() > self._committed:
+            self._transcribe_span(None)
+        self.close()
+        return self.text
+
+    def close(self):
+        self._closed = True
+        self._finishing.set()
+        self._new_audio.set()
+        if self._proc.poll() is None:
+            self._proc.kill()
+
+
+_streams: Dict[str, VoiceStream] = {}
+_streams_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+
+
+def _sweep_idle_streams():
+    cutoff = time.monotonic() - VOICE_STREAM_IDLE_TIMEOUT
+    with _streams_lock:
+        idle = [sid for sid, stream in _streams.items() if stream.last_activity < cutoff]
+        for sid in idle:
+            _streams.pop(sid).close()
+    if idle:
+        logger.info(f"Closed {len(idle)} idle voice streams")
+
+
+def _sweep_periodically():
+    while True:
+        time.sleep(max(1.0, VOICE_STREAM_IDLE_TIMEOUT / 4))
+        try:
+            _sweep_idle_streams()
+        except Exception as e:
+            logger.error(f"Error sweeping idle voice streams: {e}")
+
+
+def _ensure_sweeper():
+    # Started lazily so gunicorn's fork happens before the thread exists
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = threading.Thread(target=_sweep_periodically, name="voice-stream-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def _discard_stream(stream_id: str):
+    with _streams_lock:
+        stream = _streams.pop(stream_id, None)
+    if stream:
+        stream.close()
+
+
+@voice_stream_bp.route('/api/voice-stream/start', methods=['POST'])
+def start_voice_stream():
+    """Open a streaming transcription session."""
+    try:
+        _sweep_idle_streams()
+        with _streams_lock:
+            if len(_streams) >= VOICE_STREAM_MAX:
+                return jsonify({'success': False, 'message': 'Too many active voice streams'}), 503
+            stream = VoiceStream()
+            _streams[stream.stream_id] = stream
+            _ensure_sweeper()
+        return jsonify({'success': True, 'stream_id': stream.stream_id})
+    except Exception as e:
+        logger.error(f"Error starting voice stream: {e}")
+        return jsonify({'success': False, 'message': f'Server error starting voice stream: {str(e)}'}), 500
+
+
+@voice_stream_bp.route('/api/voice-stream/<stream_id>/chunk', methods=['POST'])
+def add_voice_stream_chunk(stream_id):
+    """Append a recorded chunk (raw request body, ?seq=N starting at 0)."""
+    stream = _streams.get(stream_id)
+    if not stream:
+        return jsonify({'success': False, 'message': 'Unknown voice stream'}), 404
+    try:
+        seq = int(request.args.get('seq', ''))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seq is required'}), 400
+    if request.content_length and request.content_length > VOICE_MAX_UPLOAD_BYTES:
+        _discard_stream(stream_id)
+        return jsonify({'success': False, 'message': 'Recording is too large'}), 413
+    try:
+        stream.add_chunk(seq, request.get_data())
+    except UploadLimitError as e:
+        _discard_stream(stream_id)
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except VoiceStreamClosedError as e:
+        # A late or retried chunk; the stream was finished meanwhile
+        return jsonify({'success': False, 'message': str(e)}), 409
+    except (BrokenPipeError, OSError) as e:
+        # The client falls back to a full upload, so the stream is not used again
+        _discard_stream(stream_id)
+        return jsonify({'success': False, 'message': f'Audio decoder stopped: {str(e)}'}), 500
+    return jsonify({'success': True, 'partial_transcript': stream.text})
+
+
+@voice_stream_bp.route('/api/voice-stream/<stream_id>', methods=['DELETE'])
+def close_voice_stream(stream_id):
+    """Abandon a stream (e.g. after a failed chunk upload) and stop its decoder."""
+    _discard_stream(stream_id)
+    return jsonify({'success': True})
+
+
+@voice_stream_bp.route('/api/voice-stream/<stream_id>/finish', methods=['POST'])
+def finish_voice_stream(stream_id):
+    """Finish recording and return the same payload as /api/process-voice."""
+    from voice_processor import build_voice_result
+
+    with _streams_lock:
+        stream = _streams.pop(stream_id, None)
+    if not stream:
+        return jsonify({'success': False, 'message': 'Unknown voice stream'}), 404
+    try:
+        data = request.get_json(silent=True) or {}
+        question = data.get('question', 'Practice question')
+        transcript = stream.finish()
+        return jsonify(build_voice_result(transcript, question))
+    except Exception as e:
+        stream.close()
+        logger.error(f"Error finishing voice stream: {e}")
+        return jsonify({'success': False, 'message': f'Server error during voice processing: {str(e)}'}), 500
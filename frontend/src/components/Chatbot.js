@@ -17,6 +17,7 @@ const Chatbot = ({ currentQuestion, selectedSkill, selectedRole, interviewType,
   const recognitionRef = useRef(null);
   const fileInputRef = useRef(null);
   const lastAssistantRequestRef = useRef(null);
+  const threadIdRef = useRef(null); // Server-side conversation thread
 
   // Initialize with welcome message
   useEffect(() => {
@@ -134,7 +135,7 @@ const Chatbot = ({ currentQuestion, selectedSkill, selectedRole, interviewType,
     }
 
     try {
-      const requestBody = {
+      const buildRequestBody = () => ({
         message: messageToSend,
         file: fileData ? {
           name: fileData.name,
@@ -147,13 +148,11 @@ const Chatbot = ({ currentQuestion, selectedSkill, selectedRole, interviewType,
           role: selectedRole || null,
           interviewType: interviewType || null
         },
-        conversationHistory: messages.slice(-10) // Last 10 messages for context
-      };
-
-      console.log('Sending chatbot request to:', `${API_BASE_URL}/api/chatbot`);
-      console.log('Request body:', requestBody);
-
-      const response = await fetch(`${API_BASE_URL}/api/chatbot`, {
+        threadId: threadIdRef.current,
+        // The server keeps the history once a thread exists; only send it to start one
+        conversationHistory: threadIdRef.current ? undefined : messages.slice(-10).map(({ role, content }) => ({ role, content }))
+      });
+      const postChat = (requestBody) => fetch(`${API_BASE_URL}/api/chatbot`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -162,6 +161,22 @@ const Chatbot = ({ currentQuestion, selectedSkill, selectedRole, interviewType,
         body: JSON.stringify(requestBody)
       });
 
+      let requestBody = buildRequestBody();
+
+      console.log('Sending chatbot request to:', `${API_BASE_URL}/api/chatbot`);
+      console.log('Request body:', requestBody);
+
+      let response = await postChat(requestBody);
+      if (response.status === 409) {
+        // The server no longer has this thread (expired or evicted); start a new one from local history
+        const conflict = await response.json().catch(() => ({}));
+        if (conflict.error === 'thread_expired') {
+          threadIdRef.current = null;
+          requestBody = buildRequestBody();
+          response = await postChat(requestBody);
+        }
+      }
+
       console.log('Response status:', response.status);
       console.log('Response headers:', Object.fromEntries(response.headers.entries()));
 
@@ -175,6 +190,9 @@ const Chatbot = ({ currentQuestion, selectedSkill, selectedRole, interviewType,
       console.log('Response data:', data);
 
       if (data.success) {
+        if (data.threadId) {
+          threadIdRef.current = data.threadId;
+        }
         setMessages(prev => [...prev, {
           role: 'assistant',
           content: data.response
@@ -310,6 +328,7 @@ const Chatbot = ({ currentQuestion, selectedSkill, selectedRole, interviewType,
   };
 
   const clearChat = () => {
+    threadIdRef.current = null;
     setMessages([{
       role: 'assistant',
       content: `Hello! I'm your Interview Preparation Assistant. I can help you with:\n\n• Technical questions\n• Conceptual explanations\n• Behavioral interview tips\n• Problem-solving strategies\n• Interview preparation advice\n\nHow can I assist you today?`
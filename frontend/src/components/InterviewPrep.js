@@ -36,6 +36,7 @@ const InterviewPrep = () => {
   const messagesEndRef = useRef(null);
   const chatContainerRef = useRef(null);
   const timerIntervalRef = useRef(null);
+  const chatThreadIdRef = useRef(null); // Server-side chatbot conversation thread
   const recognitionRef = useRef(null);
   const speechSynthesisRef = useRef(null);
   const fileInputRef = useRef(null);
@@ -202,7 +203,7 @@ const InterviewPrep = () => {
     }
 
     try {
-      const requestBody = {
+      const buildRequestBody = () => ({
         message: messageToSend,
         file: fileData ? {
           name: fileData.name,
@@ -213,10 +214,11 @@ const InterviewPrep = () => {
           currentQuestion: currentQuestion?.question || null,
           category: currentQuestion?.category || null
         },
-        conversationHistory: messages.slice(-10)
-      };
-
-      const response = await fetch(`${API_BASE_URL}/api/chatbot`, {
+        threadId: chatThreadIdRef.current,
+        // The server keeps the history once a thread exists; only send it to start one
+        conversationHistory: chatThreadIdRef.current ? undefined : messages.slice(-10).map(({ role, content }) => ({ role, content }))
+      });
+      const postChat = (requestBody) => fetch(`${API_BASE_URL}/api/chatbot`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -225,6 +227,16 @@ const InterviewPrep = () => {
         body: JSON.stringify(requestBody)
       });
 
+      let response = await postChat(buildRequestBody());
+      if (response.status === 409) {
+        // The server no longer has this thread (expired or evicted); start a new one from local history
+        const conflict = await response.json().catch(() => ({}));
+        if (conflict.error === 'thread_expired') {
+          chatThreadIdRef.current = null;
+          response = await postChat(buildRequestBody());
+        }
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
@@ -232,6 +244,9 @@ const InterviewPrep = () => {
       const data = await response.json();
 
       if (data.success) {
+        if (data.threadId) {
+          chatThreadIdRef.current = data.threadId;
+        }
         const assistantMessage = {
           role: 'assistant',
           content: data.response
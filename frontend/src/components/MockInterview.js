@@ -47,6 +47,7 @@ function MockInterview() {
           <SummaryScreen
             summaryData={summaryData}
             onRestart={handleRestart}
+            apiBaseUrl={API_BASE_URL}
           />
         )}
       </div>
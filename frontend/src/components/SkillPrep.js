@@ -32,7 +32,7 @@ import {
   Bot
 } from 'lucide-react';
 import './SkillPrep.css';
-import { API_BASE_URL } from '../config';
+import { API_BASE_URL, VOICE_STREAMING } from '../config';
 import Chatbot from './Chatbot';
 
 const SkillPrep = () => {
@@ -112,6 +112,7 @@ const SkillPrep = () => {
   // Voice recording refs
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
+  const voiceStreamRef = useRef(null);
   const timerRef = useRef(null);
   const audioRef = useRef(null);
 
@@ -272,8 +273,34 @@ const SkillPrep = () => {
       mediaRecorderRef.current = new MediaRecorder(stream);
       audioChunksRef.current = [];
 
+      // Streaming mode: upload chunks while recording so the backend can transcribe incrementally
+      voiceStreamRef.current = null;
+      if (VOICE_STREAMING) {
+        try {
+          const res = await fetch(`${API_BASE_URL}/api/voice-stream/start`, { method: 'POST' });
+          const data = await res.json();
+          if (data.success) {
+            voiceStreamRef.current = { id: data.stream_id, seq: 0, uploads: [], failed: false };
+          }
+        } catch (e) {
+          console.warn('Voice streaming unavailable, falling back to upload:', e);
+        }
+      }
+
       mediaRecorderRef.current.ondataavailable = (event) => {
         audioChunksRef.current.push(event.data);
+        const voiceStream = voiceStreamRef.current;
+        if (voiceStream && !voiceStream.failed && event.data.size > 0) {
+          const seq = voiceStream.seq++;
+          voiceStream.uploads.push(
+            fetch(`${API_BASE_URL}/api/voice-stream/${voiceStream.id}/chunk?seq=${seq}`, {
+              method: 'POST',
+              body: event.data
+            })
+              .then(res => { if (!res.ok) voiceStream.failed = true; })
+              .catch(() => { voiceStream.failed = true; })
+          );
+        }
       };
 
       mediaRecorderRef.current.onstop = () => {
@@ -284,10 +311,14 @@ const SkillPrep = () => {
         stream.getTracks().forEach(track => track.stop());
         
         // Process the voice recording to get transcript
-        processVoiceRecording(audioBlob);
+        processVoiceRecording(audioBlob, voiceStreamRef.current);
       };
 
-      mediaRecorderRef.current.start();
+      if (voiceStreamRef.current) {
+        mediaRecorderRef.current.start(1000); // emit a chunk every second
+      } else {
+        mediaRecorderRef.current.start();
+      }
       setIsRecording(true);
       setRecordingTime(0);
     } catch (error) {
@@ -332,41 +363,70 @@ const SkillPrep = () => {
     }
   };
 
+  // Finish a streaming session; returns null if the full upload path should be used instead
+  const finishVoiceStream = async (voiceStream) => {
+    try {
+      await Promise.all(voiceStream.uploads);
+      if (voiceStream.failed) {
+        // Let the server stop the stream's decoder now rather than at the idle timeout
+        fetch(`${API_BASE_URL}/api/voice-stream/${voiceStream.id}`, { method: 'DELETE' }).catch(() => {});
+        return null;
+      }
+      const res = await fetch(`${API_BASE_URL}/api/voice-stream/${voiceStream.id}/finish`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ question: apiQuestions[currentPracticeQuestion] || 'Practice question' })
+      });
+      if (!res.ok) return null;
+      return await res.json();
+    } catch (e) {
+      console.warn('Voice stream finish failed, falling back to upload:', e);
+      return null;
+    }
+  };
+
+  // Upload the complete recording to /api/process-voice (with retries)
+  const uploadVoiceRecording = async (audioBlob) => {
+    const formData = new FormData();
+    const filename = audioBlob.type && audioBlob.type.includes('wav') ? 'recording.wav' : 'recording.webm';
+    formData.append('audio', audioBlob, filename);
+    formData.append('question', apiQuestions[currentPracticeQuestion] || 'Practice question');
+    
+    // Add retry logic for connection issues
+    let response;
+    let retries = 3;
+    
+    while (retries > 0) {
+      try {
+        response = await fetch(`${API_BASE_URL}/api/process-voice`, {
+          method: 'POST',
+          body: formData
+        });
+        break; // Success, exit retry loop
+      } catch (fetchError) {
+        retries--;
+        if (retries === 0) throw fetchError;
+        console.log(`🔄 Retrying voice processing... (${3 - retries}/3)`);
+        await new Promise(resolve => setTimeout(resolve, 1000)); // Wait 1 second
+      }
+    }
+    
+    // Oversize recordings are rejected with a message worth showing as-is
+    if (!response.ok && response.status !== 413) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    
+    return await response.json();
+  };
+
   // Process voice recording to get transcript
-  const processVoiceRecording = async (audioBlob) => {
+  const processVoiceRecording = async (audioBlob, voiceStream = null) => {
     try {
       console.log('🎤 Processing voice recording...');
       setIsProcessing(true);
-      
-      const formData = new FormData();
-      const filename = audioBlob.type && audioBlob.type.includes('wav') ? 'recording.wav' : 'recording.webm';
-      formData.append('audio', audioBlob, filename);
-      formData.append('question', apiQuestions[currentPracticeQuestion] || 'Practice question');
-      
-      // Add retry logic for connection issues
-      let response;
-      let retries = 3;
-      
-      while (retries > 0) {
-        try {
-          response = await fetch(`${API_BASE_URL}/api/process-voice`, {
-            method: 'POST',
-            body: formData
-          });
-          break; // Success, exit retry loop
-        } catch (fetchError) {
-          retries--;
-          if (retries === 0) throw fetchError;
-          console.log(`🔄 Retrying voice processing... (${3 - retries}/3)`);
-          await new Promise(resolve => setTimeout(resolve, 1000)); // Wait 1 second
-        }
-      }
-      
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      
-      const data = await response.json();
+
+      const streamed = voiceStream ? await finishVoiceStream(voiceStream) : null;
+      const data = streamed || await uploadVoiceRecording(audioBlob);
       console.log('Voice processing response:', data);
       
       if (data.success && data.transcript) {
@@ -3,6 +3,16 @@ import axios from 'axios';
 import { useSpeech } from '../../hooks/useSpeech';
 import { API_BASE_URL } from '../../config';
 
+// One key per send; reused only when that same send is retried
+const newIdempotencyKey = () => (
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`
+);
+
+// Network failures are retried this many times with the same idempotency key
+const INTERACT_NETWORK_RETRIES = 2;
+
 const InterviewScreen = ({ sessionData, onEndInterview, onRestart, apiBaseUrl }) => {
   const [currentQuestion, setCurrentQuestion] = useState(sessionData.first_question || '');
   const [answer, setAnswer] = useState('');
@@ -76,10 +86,22 @@ const InterviewScreen = ({ sessionData, onEndInterview, onRestart, apiBaseUrl })
 
     const baseUrl = apiBaseUrl || API_BASE_URL;
     try {
-      const response = await axios.post(`${baseUrl}/api/mock-interview/interact`, {
-        session_id: sessionData.session_id,
-        user_input: userInput
-      });
+      // If the request reached the server but the reply was lost, the retry
+      // gets the original response instead of evaluating the answer twice
+      const idempotencyKey = newIdempotencyKey();
+      let response;
+      for (let attempt = 0; ; attempt++) {
+        try {
+          response = await axios.post(`${baseUrl}/api/mock-interview/interact`, {
+            session_id: sessionData.session_id,
+            user_input: userInput,
+            idempotency_key: idempotencyKey
+          });
+          break;
+        } catch (err) {
+          if (err.response || attempt >= INTERACT_NETWORK_RETRIES) throw err;
+        }
+      }
 
       const intent = response.data.intent || 'normal_answer'; // Default to normal_answer if intent not provided
 
@@ -1,6 +1,39 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import axios from 'axios';
+import { API_BASE_URL } from '../../config';
+
+// Polling for a personalized closing message written in the background
+const CLOSING_POLL_INTERVAL_MS = 2000;
+const CLOSING_POLL_ATTEMPTS = 15;
+
+const SummaryScreen = ({ summaryData, onRestart, apiBaseUrl }) => {
+  const [closingMessage, setClosingMessage] = useState(summaryData.closing_message);
+
+  useEffect(() => {
+    setClosingMessage(summaryData.closing_message);
+    if (!summaryData.closing_message_pending) return undefined;
+    const baseUrl = apiBaseUrl || API_BASE_URL;
+    let attempts = 0;
+    const timer = setInterval(async () => {
+      attempts += 1;
+      try {
+        const res = await axios.get(`${baseUrl}/api/mock-interview/progress`, {
+          params: { session_id: summaryData.session_id }
+        });
+        const closing = res.data.messages && res.data.messages.closing;
+        if (closing) {
+          setClosingMessage(closing);
+          clearInterval(timer);
+          return;
+        }
+      } catch (e) {
+        // Keep the templated message
+      }
+      if (attempts >= CLOSING_POLL_ATTEMPTS) clearInterval(timer);
+    }, CLOSING_POLL_INTERVAL_MS);
+    return () => clearInterval(timer);
+  }, [summaryData, apiBaseUrl]);
 
-const SummaryScreen = ({ summaryData, onRestart }) => {
   const renderImprovementList = (text) => {
     if (!text) return null;
     const lines = text
@@ -45,11 +78,11 @@ const SummaryScreen = ({ summaryData, onRestart }) => {
         </div>
       </div>
 
-      {summaryData.closing_message && (
+      {closingMessage && (
         <div className="summary-section">
           <div className="feedback-card" style={{ padding: '20px', marginBottom: '20px' }}>
             <p className="feedback-text" style={{ fontSize: '1.1em', lineHeight: '1.6' }}>
-              {summaryData.closing_message}
+              {closingMessage}
             </p>
           </div>
         </div>
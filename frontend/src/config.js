@@ -2,4 +2,5 @@
 // Prefer environment variable if provided; fallback to localhost:5000
 export const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
-
+// Upload voice answers in chunks while recording (requires backend /api/voice-stream endpoints)
+export const VOICE_STREAMING = process.env.REACT_APP_VOICE_STREAMING === 'true';